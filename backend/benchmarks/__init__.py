@@ -0,0 +1 @@
+# Benchmarks for the research agent, run against a local stub model
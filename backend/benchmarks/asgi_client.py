@@ -0,0 +1,76 @@
+"""Minimal in-process ASGI driver that timestamps every body chunk.
+
+httpx's ASGITransport buffers the whole response before returning, which
+hides time-to-first-byte, so benchmarks call the ASGI app directly.
+"""
+
+import asyncio
+import json
+import time
+from dataclasses import dataclass, field
+from typing import Any, List, Optional, Tuple
+
+
+@dataclass
+class TimedResponse:
+    status: int = 0
+    started: float = 0.0
+    chunks: List[Tuple[float, bytes]] = field(default_factory=list)
+    finished: float = 0.0
+
+    @property
+    def ttfb(self) -> Optional[float]:
+        return self.chunks[0][0] - self.started if self.chunks else None
+
+    @property
+    def total(self) -> float:
+        return self.finished - self.started
+
+    @property
+    def body(self) -> bytes:
+        return b"".join(chunk for _, chunk in self.chunks)
+
+
+async def request(app, method: str, path: str, payload: Any = None) -> TimedResponse:
+    """Send one request to `app` and record when each body chunk arrives"""
+    body = json.dumps(payload).encode() if payload is not None else b""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"content-type", b"application/json")],
+        "client": ("127.0.0.1", 50000),
+        "server": ("testserver", 80),
+    }
+    response = TimedResponse()
+    request_sent = False
+    disconnected = asyncio.Event()
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            response.status = message["status"]
+        elif message["type"] == "http.response.body":
+            if message.get("body"):
+                response.chunks.append((time.perf_counter(), message["body"]))
+
+    response.started = time.perf_counter()
+    try:
+        await app(scope, receive, send)
+    finally:
+        response.finished = time.perf_counter()
+        disconnected.set()
+    return response
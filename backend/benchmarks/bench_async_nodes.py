@@ -0,0 +1,70 @@
+"""Throughput of async graph nodes vs. the sync fallback against a stub model.
+
+Runs 1/10/100 concurrent research jobs through the compiled graph with a
+fake-Gemini stub that sleeps for a fixed latency per call, and reports jobs
+and model requests per second for both execution modes.
+
+    python -m benchmarks.bench_async_nodes --latency 0.05
+"""
+
+import argparse
+import asyncio
+import time
+
+from langchain_core.messages import HumanMessage
+
+from benchmarks import stub_model
+from src.agent.cache import SearchCache, set_search_cache
+
+
+def _job(i: int):
+    state = {
+        "messages": [HumanMessage(content=f"benchmark question {i}")],
+        "search_query": [],
+        "sources_gathered": [],
+        "web_research_result": [],
+        "research_loop_count": 0,
+        "initial_search_query_count": 3,
+        "max_research_loops": 2,
+    }
+    config = {"configurable": {"max_research_loops": 2, "number_of_initial_queries": 3}}
+    return state, config
+
+
+async def _run_async(graph, concurrency: int):
+    await asyncio.gather(*(graph.ainvoke(*_job(i)) for i in range(concurrency)))
+
+
+async def _run_sync(graph, concurrency: int):
+    loop = asyncio.get_running_loop()
+    await asyncio.gather(
+        *(loop.run_in_executor(None, graph.invoke, *_job(i)) for i in range(concurrency))
+    )
+
+
+async def main(latency: float, levels):
+    stub_model.install(latency)
+    # Measure raw node throughput, not search cache hits
+    set_search_cache(SearchCache())
+    from src.agent.graph import graph
+
+    print(f"stub latency {latency * 1000:.0f} ms per model call")
+    print(f"{'mode':<6} {'jobs':>5} {'seconds':>9} {'jobs/s':>9} {'requests/s':>11}")
+    for mode, runner in (("async", _run_async), ("sync", _run_sync)):
+        for concurrency in levels:
+            stub_model.stats.reset()
+            start = time.perf_counter()
+            await runner(graph, concurrency)
+            elapsed = time.perf_counter() - start
+            print(
+                f"{mode:<6} {concurrency:>5} {elapsed:>9.2f} "
+                f"{concurrency / elapsed:>9.1f} {stub_model.stats.calls / elapsed:>11.1f}"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 10, 100])
+    args = parser.parse_args()
+    asyncio.run(main(args.latency, args.levels))
@@ -0,0 +1,73 @@
+"""Throughput of /research/batch vs one /research request at a time.
+
+Sends the same questions one by one through the blocking endpoint, and then
+as a single batch at several concurrency levels. One malformed item is mixed
+into each batch to show that it fails on its own. Reports queries per second,
+time to the first NDJSON result and completed/failed counts.
+
+    python -m benchmarks.bench_batch --queries 64 --latency 0.1
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+
+from benchmarks import stub_model
+from benchmarks.asgi_client import request
+from src.agent.cache import MemorySearchCache, TieredSearchCache, set_search_cache
+
+os.environ["PAGE_STORE_ENABLED"] = "false"
+
+
+def _queries(n: int, tag: str):
+    return [f"batch benchmark question {tag} {i}" for i in range(n)]
+
+
+async def main(queries: int, latency: float, levels):
+    stub_model.install(latency)
+    from src.api.main import app
+
+    params = {"max_research_loops": 2, "initial_search_query_count": 3}
+    print(f"{queries} questions, stub latency {latency * 1000:.0f} ms per model call")
+    print(f"{'mode':<22} {'seconds':>8} {'queries/s':>10} {'first ms':>9} {'ok':>4} {'failed':>7}")
+
+    set_search_cache(TieredSearchCache(MemorySearchCache()))
+    start = time.perf_counter()
+    first = None
+    for query in _queries(queries, "sequential"):
+        response = await request(app, "POST", "/research", {"query": query, **params})
+        assert response.status == 200, response.body[:200]
+        first = first or response.finished - start
+    elapsed = time.perf_counter() - start
+    print(
+        f"{'/research sequential':<22} {elapsed:>8.2f} {queries / elapsed:>10.1f} "
+        f"{first * 1000:>9.0f} {queries:>4} {0:>7}"
+    )
+
+    for concurrency in levels:
+        set_search_cache(TieredSearchCache(MemorySearchCache()))
+        payload = {
+            "queries": _queries(queries, f"c{concurrency}") + [{"query": ""}],
+            "concurrency": concurrency,
+            **params,
+        }
+        response = await request(app, "POST", "/research/batch", payload)
+        assert response.status == 200, response.body[:200]
+        records = [json.loads(line) for line in response.body.splitlines()]
+        failed = sum(r["status"] == "failed" for r in records)
+        print(
+            f"{f'/research/batch c={concurrency}':<22} {response.total:>8.2f} "
+            f"{queries / response.total:>10.1f} {response.ttfb * 1000:>9.0f} "
+            f"{len(records) - failed:>4} {failed:>7}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--queries", type=int, default=64)
+    parser.add_argument("--latency", type=float, default=0.1)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    args = parser.parse_args()
+    asyncio.run(main(args.queries, args.latency, args.concurrency))
@@ -0,0 +1,105 @@
+"""Per-run deadline and token budgets against heavy-tailed search latencies.
+
+Runs the same research jobs without a budget, with deadlines, with a token
+budget and with both. Grounded-search latencies are drawn from a Pareto
+distribution, so unbounded runs have a long tail. Reports p50/p95/max run
+latency, the share of runs finishing within their deadline, and the loops,
+searches and estimated tokens per run. It also reports how often each
+budget stopped research.
+
+    python -m benchmarks.bench_budget --runs 40 --scale 0.05 --alpha 1.3
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import time
+from collections import Counter
+
+from benchmarks import stub_model
+from src.agent.state import initial_state
+from src.agent.cache import MemorySearchCache, TieredSearchCache, set_search_cache
+
+os.environ["PAGE_STORE_ENABLED"] = "false"
+
+MODES = {
+    "unbounded": {},
+    "deadline 2000 ms": {"deadline_ms": 2000},
+    "deadline 1000 ms": {"deadline_ms": 1000},
+    "max_tokens 3000": {"max_tokens": 3000},
+    "1000 ms + 3000 tokens": {"deadline_ms": 1000, "max_tokens": 3000},
+}
+
+
+async def _run(graph, i: int, loops: int, queries: int, limits: dict):
+    state = initial_state(f"budget topic number {i}", loops, queries, **limits)
+    config = {
+        "configurable": {
+            "max_research_loops": loops,
+            "number_of_initial_queries": queries,
+            "stream_answer": False,
+            # Only the budgets end research early
+            "early_stop": False,
+        }
+    }
+    start = time.perf_counter()
+    final = await graph.ainvoke(state, config)
+    return final, time.perf_counter() - start
+
+
+def _percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+async def main(runs: int, loops: int, queries: int, scale: float, alpha: float, seed: int):
+    rng = random.Random(seed)
+    stub_model.install(0.05, search_latency=lambda: scale * rng.paretovariate(alpha))
+    from src.agent.graph import graph
+
+    print(
+        f"{runs} concurrent runs, up to {loops} loops x {queries} searches, "
+        f"search latency {scale * 1000:.0f} ms x Pareto(alpha={alpha})"
+    )
+    print(
+        f"{'mode':<22} {'p50':>6} {'p95':>6} {'max':>6} {'in SLO':>7} "
+        f"{'loops':>6} {'searches':>9} {'tokens':>7}  stop reasons"
+    )
+    for name, limits in MODES.items():
+        rng.seed(seed)
+        set_search_cache(TieredSearchCache(MemorySearchCache()))
+        results = await asyncio.gather(
+            *(_run(graph, i, loops, queries, limits) for i in range(runs))
+        )
+        walls = [wall for _, wall in results]
+        deadline = limits.get("deadline_ms")
+        within = (
+            f"{sum(wall * 1000 <= deadline for wall in walls) / runs:>6.0%}"
+            if deadline else f"{'-':>6}"
+        )
+        stats = [final.get("run_stats") or {} for final, _ in results]
+        reasons = Counter(s.get("stop_reason", "none") for s in stats)
+        print(
+            f"{name:<22} {statistics.median(walls):>5.2f}s {_percentile(walls, 0.95):>5.2f}s "
+            f"{max(walls):>5.2f}s {within:>7} "
+            f"{statistics.mean(final['research_loop_count'] for final, _ in results):>6.2f} "
+            f"{statistics.mean(s.get('search_cache_misses', 0) for s in stats):>9.2f} "
+            f"{statistics.median(s.get('tokens_used', 0) for s in stats):>7.0f}  "
+            + ", ".join(f"{reason} {count}" for reason, count in reasons.most_common())
+        )
+    usage = results[0][0].get("budget_usage")
+    print(f"budget usage reported for the last mode's first run: {usage}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=40)
+    parser.add_argument("--loops", type=int, default=3)
+    parser.add_argument("--queries", type=int, default=5)
+    parser.add_argument("--scale", type=float, default=0.05)
+    parser.add_argument("--alpha", type=float, default=1.3)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    asyncio.run(main(args.runs, args.loops, args.queries, args.scale, args.alpha, args.seed))
@@ -0,0 +1,76 @@
+"""Microbenchmark for insert_citation_markers on long grounded answers.
+
+Compares the single-pass builder against the previous implementation, which
+re-sliced the whole string once per citation, on synthetic ~50 KB texts with
+200 citations (ASCII and mixed UTF-8).
+
+    python -m benchmarks.bench_citations --size 50000 --citations 200
+"""
+
+import argparse
+import random
+import timeit
+
+from src.agent.utils import insert_citation_markers
+
+
+def _legacy_insert_citation_markers(text, citations):
+    sorted_citations = sorted(citations, key=lambda x: x.get('start_index', 0), reverse=True)
+    modified_text = text
+    for citation in sorted_citations:
+        if citation.get('segments'):
+            short_url = citation['segments'][0].get('short_url', '')
+            start_idx = citation.get('start_index', 0)
+            if short_url and start_idx < len(modified_text):
+                modified_text = (
+                    modified_text[:start_idx] + f" {short_url}" + modified_text[start_idx:]
+                )
+    return modified_text
+
+
+def _corpus(size: int, n_citations: int, unicode: bool, seed: int = 0):
+    rng = random.Random(seed)
+    words = ["grounded", "search", "result", "model", "latency", "citation"]
+    if unicode:
+        words += ["naïve", "café", "Zürich", "東京", "→"]
+    parts, length = [], 0
+    while length < size:
+        word = rng.choice(words)
+        parts.append(word)
+        length += len(word) + 1
+    text = " ".join(parts)
+    size_bytes = len(text.encode("utf-8"))
+    citations = [
+        {
+            "segments": [{"value": f"https://example.com/{i}", "short_url": f"[0-{i}]"}],
+            # The legacy implementation inserted at start_index, the current one
+            # after the cited span; use one offset so both do the same work
+            **dict.fromkeys(("start_index", "end_index"), rng.randrange(size_bytes)),
+        }
+        for i in range(n_citations)
+    ]
+    return text, citations
+
+
+def main(size: int, n_citations: int, repeat: int):
+    print(f"{'text':<8} {'impl':<8} {'ms/call':>9}")
+    for unicode in (False, True):
+        text, citations = _corpus(size, n_citations, unicode)
+        label = "utf-8" if unicode else "ascii"
+        for name, fn in (
+            ("legacy", _legacy_insert_citation_markers),
+            ("linear", insert_citation_markers),
+        ):
+            seconds = min(
+                timeit.repeat(lambda: fn(text, citations), number=repeat, repeat=5)
+            )
+            print(f"{label:<8} {name:<8} {seconds / repeat * 1000:>9.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", type=int, default=50_000)
+    parser.add_argument("--citations", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+    main(args.size, args.citations, args.repeat)
@@ -0,0 +1,132 @@
+"""Cold start: API import time, and time until the API is live and ready.
+
+Each scenario runs in a fresh interpreter with `-X importtime`: importing the
+API alone (what a worker does before it can answer probes), importing it and
+compiling the graph (what importing the API used to do), and importing it and
+running the full warm-up (which also imports the model SDKs and creates the
+clients). Reports the median total of top-level imports, the wall time of the
+process and how many LangChain, LangGraph, Google and NumPy modules got loaded.
+Then starts the app lifespan and reports when `/health` and `/ready` first
+answer 200. No model requests are sent.
+
+    python -m benchmarks.bench_cold_start --repeat 5
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+HEAVY = ("langchain", "langgraph", "google", "numpy")
+
+SCENARIOS = {
+    "import API": "import src.api.main",
+    "import API + graph": "import src.api.main\nfrom src.agent.graph import graph",
+    "import API + warm-up": (
+        "import src.api.main\nfrom src.agent.runtime import warm_up\nwarm_up()"
+    ),
+}
+
+REPORT = """
+import json, sys
+heavy = sum(name.startswith({heavy!r}) for name in sys.modules)
+print("RESULT " + json.dumps({{"heavy": heavy}}))
+"""
+
+PROBES = """
+import asyncio, json, os, time
+started = time.perf_counter()
+os.environ["JOBS_ENABLED"] = "false"
+from src.api.main import app
+from benchmarks.asgi_client import request
+imported = time.perf_counter() - started
+
+
+async def main():
+    live = ready = None
+    async with app.router.lifespan_context(app):
+        while ready is None:
+            if live is None and (await request(app, "GET", "/health")).status == 200:
+                live = time.perf_counter() - started
+            if (await request(app, "GET", "/ready")).status == 200:
+                ready = time.perf_counter() - started
+            await asyncio.sleep(0.005)
+    print("RESULT " + json.dumps({"import": imported, "live": live, "ready": ready}))
+
+
+asyncio.run(main())
+"""
+
+
+def _child(code: str, importtime: bool = True):
+    """Run `code` in a fresh interpreter; return (wall seconds, RESULT dict, importtime lines)"""
+    env = dict(os.environ, PYTHONPATH=os.getcwd())
+    env.setdefault("GEMINI_API_KEY", "cold-start-benchmark")
+    env["CHECKPOINT_DB"] = env.get("CHECKPOINT_DB", "/tmp/bench_cold_start.sqlite3")
+    args = [sys.executable] + (["-X", "importtime"] if importtime else []) + ["-c", code]
+    started = time.perf_counter()
+    done = subprocess.run(args, env=env, capture_output=True, text=True, check=True)
+    wall = time.perf_counter() - started
+    result = next(
+        json.loads(line[len("RESULT "):])
+        for line in done.stdout.splitlines()
+        if line.startswith("RESULT ")
+    )
+    imports = [line for line in done.stderr.splitlines() if line.startswith("import time:")]
+    return wall, result, imports
+
+
+def _top_level(imports):
+    """(module, cumulative seconds) for each top-level import, as `-X importtime` reports it"""
+    modules = []
+    for line in imports[1:]:  # the first line is the column header
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # Nested imports are indented by two more spaces per level
+        if not name.startswith("  "):
+            modules.append((name.strip(), int(cumulative) / 1e6))
+    return modules
+
+
+def main(repeat: int, top: int):
+    print(f"{'scenario':<22} {'import':>8} {'wall':>8} {'heavy modules':>14}")
+    slowest = None
+    for name, code in SCENARIOS.items():
+        runs = defaultdict(list)
+        for _ in range(repeat):
+            wall, result, imports = _child(code + REPORT.format(heavy=HEAVY))
+            modules = _top_level(imports)
+            runs["import"].append(sum(seconds for _, seconds in modules))
+            runs["wall"].append(wall)
+            runs["heavy"].append(result["heavy"])
+        slowest = modules
+        print(
+            f"{name:<22} {statistics.median(runs['import']):>7.2f}s "
+            f"{statistics.median(runs['wall']):>7.2f}s {statistics.median(runs['heavy']):>14.0f}"
+        )
+
+    probes = defaultdict(list)
+    for _ in range(repeat):
+        _, result, _ = _child(PROBES, importtime=False)
+        for key, value in result.items():
+            probes[key].append(value)
+    print(
+        f"app lifespan: import {statistics.median(probes['import']):.2f}s, "
+        f"/health 200 after {statistics.median(probes['live']):.2f}s, "
+        f"/ready 200 after {statistics.median(probes['ready']):.2f}s"
+    )
+
+    print("slowest top-level imports of the full warm-up:")
+    for module, seconds in sorted(slowest, key=lambda item: -item[1])[:top]:
+        print(f"  {seconds * 1000:>7.0f} ms  {module}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=8)
+    args = parser.parse_args()
+    main(args.repeat, args.top)
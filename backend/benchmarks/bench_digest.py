@@ -0,0 +1,64 @@
+"""Reflection prompt size per loop with and without the rolling digest.
+
+Runs the graph against the fake-Gemini stub for an increasing number of
+research loops and reports the estimated prompt tokens sent to reflection on
+every loop, their total, and the answer prompt size, once with every summary
+re-sent in full (`digest_token_budget=0`) and once with the rolling digest.
+
+    python -m benchmarks.bench_digest --loops 1 2 4 6 --budget 2000
+"""
+
+import argparse
+import asyncio
+
+from langchain_core.messages import HumanMessage
+
+from benchmarks import stub_model
+from src.agent.cache import SearchCache, set_search_cache
+
+
+async def _run(graph, loops: int, budget: int):
+    state = {
+        "messages": [HumanMessage(content="digest benchmark question")],
+        "search_query": [],
+        "sources_gathered": [],
+        "web_research_result": [],
+        "research_loop_count": 0,
+        "initial_search_query_count": 3,
+        "max_research_loops": loops,
+        "run_stats": {},
+    }
+    config = {
+        "configurable": {
+            "max_research_loops": loops,
+            "digest_token_budget": budget,
+            "stream_answer": False,
+            "early_stop": False,
+        }
+    }
+    final = await graph.ainvoke(state, config)
+    return final["run_stats"]
+
+
+async def main(levels, budget: int):
+    stub_model.install(0.0)
+    set_search_cache(SearchCache())
+    from src.agent.graph import graph
+
+    print(f"{'loops':>5} {'budget':>7} {'total':>8} {'answer':>7}  reflection prompt tokens per loop")
+    for loops in levels:
+        for digest_budget in (0, budget):
+            stats = await _run(graph, loops, digest_budget)
+            per_loop = stats.get("reflection_prompt_tokens", [])
+            print(
+                f"{loops:>5} {digest_budget:>7} {sum(per_loop):>8} "
+                f"{stats.get('answer_prompt_tokens', 0):>7}  {per_loop}"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--loops", type=int, nargs="+", default=[1, 2, 4, 6])
+    parser.add_argument("--budget", type=int, default=2000)
+    args = parser.parse_args()
+    asyncio.run(main(args.loops, args.budget))
@@ -0,0 +1,135 @@
+"""Page fetching in WebSearchTool: pooled concurrent fetches vs. the old sequential loop.
+
+Starts a local mock server (uvicorn) that serves a Custom Search style result
+list and HTML pages with injected lognormal latency plus one straggler page,
+then runs the same searches with the previous implementation (a new client per
+page, pages awaited one at a time) and with the pooled, concurrent tool.
+
+    python -m benchmarks.bench_fetch --searches 5 --results 10 --budget 2
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import socket
+import sys
+import threading
+import time
+from pathlib import Path
+from urllib.parse import parse_qs
+
+import httpx
+import uvicorn
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from utils.search import WebSearchTool  # noqa: E402
+
+PAGE = "<html><head><script>var x = 1;</script></head><body>{}</body></html>".format(
+    "<p>Mock page paragraph with some research content.</p>" * 800
+)
+
+
+def _mock_app(port: int, latency: float, straggler: float):
+    async def app(scope, receive, send):
+        if scope["type"] != "http":
+            return
+        path = scope["path"]
+        if path == "/search":
+            params = parse_qs(scope["query_string"].decode())
+            query, num = params["q"][0], int(params["num"][0])
+            hosts = ("127.0.0.1", "localhost")
+            items = [
+                {
+                    "link": f"http://{hosts[i % 2]}:{port}/page/{query}/{i}",
+                    "title": f"{query} {i}",
+                    "snippet": "mock",
+                }
+                for i in range(num)
+            ]
+            body, content_type = json.dumps({"items": items}).encode(), b"application/json"
+        else:
+            index = int(path.rsplit("/", 1)[-1])
+            delay = straggler if index == 0 else latency * random.lognormvariate(0, 0.5)
+            await asyncio.sleep(delay)
+            body, content_type = PAGE.encode(), b"text/html"
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [(b"content-type", content_type)],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    return app
+
+
+def start_server(make_app) -> int:
+    """Serve `make_app(port)` with uvicorn on a free local port in a daemon thread"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    config = uvicorn.Config(make_app(port), port=port, log_level="error")
+    server = uvicorn.Server(config)
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return port
+
+
+class LegacySearchTool(WebSearchTool):
+    """The previous behaviour: a fresh client per page, pages fetched one by one"""
+
+    async def _fetch_all(self, urls):
+        contents = []
+        for url in urls:
+            async with httpx.AsyncClient() as client:
+                self._client = client
+                contents.append(await self._fetch_content(url))
+        self._client = None
+        return contents
+
+
+async def _run(tool: WebSearchTool, searches: int, results: int):
+    start = time.perf_counter()
+    fetched = 0
+    for i in range(searches):
+        sources = await tool.search(f"q{i}", results)
+        fetched += sum(1 for s in sources if s.content)
+    await tool.aclose()
+    return time.perf_counter() - start, fetched
+
+
+async def main(searches: int, results: int, latency: float, straggler: float, budget: float):
+    random.seed(1)
+    logging.getLogger("utils.search").setLevel(logging.ERROR)
+    # Measure fetching itself, not the page store
+    os.environ["PAGE_STORE_ENABLED"] = "false"
+    port = start_server(lambda port: _mock_app(port, latency, straggler))
+    print(
+        f"{searches} searches x {results} pages, page latency ~{latency * 1000:.0f} ms, "
+        f"one {straggler:.0f}s straggler per search, fetch budget {budget}s"
+    )
+    print(f"{'mode':<8} {'seconds':>8} {'pages with content':>19}")
+    for name, cls in (("legacy", LegacySearchTool), ("pooled", WebSearchTool)):
+        tool = cls()
+        tool.google_api_key, tool.google_cse_id = "mock", "mock"
+        tool.search_url = f"http://127.0.0.1:{port}/search"
+        tool.fetch_budget = budget
+        elapsed, fetched = await _run(tool, searches, results)
+        print(f"{name:<8} {elapsed:>8.2f} {fetched:>12} / {searches * results}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--searches", type=int, default=5)
+    parser.add_argument("--results", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--straggler", type=float, default=5.0)
+    parser.add_argument("--budget", type=float, default=2.0)
+    args = parser.parse_args()
+    asyncio.run(
+        main(args.searches, args.results, args.latency, args.straggler, args.budget)
+    )
@@ -0,0 +1,136 @@
+"""Throughput and peak memory of HTML-to-text extraction: BeautifulSoup vs. streaming.
+
+Runs every page of a corpus through the previous BeautifulSoup `html.parser`
+pipeline and through `HtmlTextExtractor` with each installed backend, both with
+the production cap of 5000 characters and uncapped, and reports MB/s and the
+peak traced allocation per page.
+
+Point `--corpus` at a directory of real pages saved as `*.html` (e.g. with
+`curl -o`); only those numbers say how extraction does on the web. `--synthetic`
+runs on generated page-shaped documents (inline scripts, navigation, long
+articles, tables) instead, which is enough to compare the extractors with each
+other, and labels its output as synthetic.
+
+    python -m benchmarks.bench_html --corpus ./saved_pages
+    python -m benchmarks.bench_html --synthetic
+"""
+
+import argparse
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+from bs4 import BeautifulSoup
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from utils import html_text  # noqa: E402
+from utils.html_text import extract_text  # noqa: E402
+
+_WORDS = (
+    "research model data result network policy market energy system growth "
+    "study report analysis cost risk security design standard survey trend"
+).split()
+
+
+def _synthetic_page(rng: random.Random, paragraphs: int) -> str:
+    def sentence():
+        return " ".join(rng.choice(_WORDS) for _ in range(rng.randint(8, 20))).capitalize() + "."
+
+    script = "var config = {" + ", ".join(f'"k{i}": {i}' for i in range(2000)) + "};"
+    nav = "".join(f'<li><a href="/section/{i}">Section {i}</a></li>' for i in range(60))
+    body = "".join(
+        f"<h2>{sentence()}</h2><p>{' '.join(sentence() for _ in range(6))}</p>"
+        if i % 10 else
+        "<table>" + "".join(
+            f"<tr><td>{rng.choice(_WORDS)}</td><td>{rng.random():.4f}</td></tr>"
+            for _ in range(20)
+        ) + "</table>"
+        for i in range(paragraphs)
+    )
+    return (
+        f"<!DOCTYPE html><html><head><title>{sentence()}</title>"
+        f"<style>body {{ font: 14px sans-serif; }}</style><script>{script}</script></head>"
+        f"<body><header>Site header</header><nav><ul>{nav}</ul></nav>"
+        f"<article>{body}</article><footer>Footer links</footer>"
+        f"<script>{script}</script></body></html>"
+    )
+
+
+def _corpus(directory):
+    if directory:
+        return [p.read_text(errors="replace") for p in sorted(Path(directory).glob("*.html"))]
+    rng = random.Random(0)
+    return [_synthetic_page(rng, n) for n in (20, 50, 100, 200, 400, 800, 1600)]
+
+
+def _corpus_label(directory) -> str:
+    return f"saved pages from {directory}" if directory else "SYNTHETIC generated pages"
+
+
+def _bs4_extract(html: str, max_chars: int) -> str:
+    """The previous `_fetch_content` pipeline"""
+    soup = BeautifulSoup(html, "html.parser")
+    for script in soup(["script", "style", "nav", "header", "footer"]):
+        script.decompose()
+    text = soup.get_text()
+    lines = (line.strip() for line in text.splitlines())
+    chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
+    text = " ".join(chunk for chunk in chunks if chunk)
+    return text[:max_chars] if len(text) > max_chars else text
+
+
+def _measure(fn, pages, max_chars):
+    total_bytes = sum(len(page.encode()) for page in pages)
+    start = time.perf_counter()
+    for page in pages:
+        fn(page, max_chars)
+    elapsed = time.perf_counter() - start
+
+    peak = 0
+    for page in pages:
+        tracemalloc.start()
+        fn(page, max_chars)
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return total_bytes / elapsed / 1e6, peak / 1e6
+
+
+def main(corpus, repeat: int):
+    pages = _corpus(corpus) * repeat
+    if not pages:
+        sys.exit(f"No *.html pages in {corpus}")
+    size = sum(len(page.encode()) for page in pages) / 1e6
+    print(f"corpus: {_corpus_label(corpus)}, {len(pages)} pages, {size:.1f} MB")
+
+    extractors = [("bs4 html.parser", _bs4_extract)]
+    backends = ["python"]
+    if html_text.etree is not None:
+        backends.append("lxml")
+    if html_text.LexborHTMLParser is not None:
+        backends.append("selectolax")
+    for backend in backends:
+        extractors.append(
+            (f"stream {backend}", lambda html, n, b=backend: extract_text(html, n, b))
+        )
+
+    print(f"{'extractor':<20} {'max_chars':>9} {'MB/s':>8} {'peak MB':>8}")
+    for max_chars in (5000, 10 ** 9):
+        for name, fn in extractors:
+            mb_per_s, peak = _measure(fn, pages, max_chars)
+            label = max_chars if max_chars < 10 ** 9 else "none"
+            print(f"{name:<20} {label:>9} {mb_per_s:>8.1f} {peak:>8.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    corpus = parser.add_mutually_exclusive_group(required=True)
+    corpus.add_argument("--corpus", help="directory of saved *.html pages")
+    corpus.add_argument(
+        "--synthetic", action="store_true", help="run on generated pages instead"
+    )
+    parser.add_argument("--repeat", type=int, default=1)
+    args = parser.parse_args()
+    main(args.corpus, args.repeat)
@@ -0,0 +1,104 @@
+"""Job queue mode: submit latency, backpressure, queue latency and restart recovery.
+
+Submits a burst of research jobs to `POST /jobs` against the stub. Submits
+return at once, and those beyond the queue limit get a 429. The accepted jobs
+are then polled to completion. Halfway through, the app is shut down and
+started again, to show that queued and interrupted jobs survive in SQLite and
+finish after the restart. Reports submit latency next to how long a
+blocking `/research` call holds its connection, plus the queue-latency
+metrics from `/stats`.
+
+    python -m benchmarks.bench_jobs --jobs 40 --workers 4 --queue-max 24
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import tempfile
+import time
+
+from benchmarks import stub_model
+from benchmarks.asgi_client import request
+
+os.environ["PAGE_STORE_ENABLED"] = "false"
+
+
+async def _wait_all(app, ids, timeout: float = 300):
+    deadline = time.perf_counter() + timeout
+    pending = set(ids)
+    statuses = {}
+    while pending and time.perf_counter() < deadline:
+        for job_id in list(pending):
+            response = await request(app, "GET", f"/jobs/{job_id}")
+            job = json.loads(response.body)
+            if job["status"] in ("completed", "failed"):
+                statuses[job_id] = job["status"]
+                pending.discard(job_id)
+        await asyncio.sleep(0.1)
+    return statuses
+
+
+async def main(jobs: int, workers: int, queue_max: int, latency: float):
+    tmp = tempfile.mkdtemp()
+    os.environ.update(
+        JOBS_DB=os.path.join(tmp, "jobs.sqlite3"),
+        CHECKPOINT_DB=os.path.join(tmp, "checkpoints.sqlite3"),
+        JOB_WORKERS=str(workers),
+        JOB_QUEUE_MAX=str(queue_max),
+    )
+    stub_model.install(latency)
+    from src.api.main import app, lifespan
+
+    payload = {"max_research_loops": 2, "initial_search_query_count": 3}
+    print(f"{jobs} jobs burst, {workers} workers, queue limit {queue_max}, stub latency {latency * 1000:.0f} ms")
+
+    async with lifespan(app):
+        blocking = await request(app, "POST", "/research", {"query": "blocking baseline", **payload})
+        submit_ms, accepted, rejected, retry_after = [], [], 0, None
+        for i in range(jobs):
+            response = await request(app, "POST", "/jobs", {"query": f"queued question {i}", **payload})
+            submit_ms.append(response.total * 1000)
+            if response.status == 202:
+                accepted.append(json.loads(response.body)["job_id"])
+            elif response.status == 429:
+                rejected += 1
+        print(f"/research holds its connection {blocking.total:.2f} s")
+        print(
+            f"/jobs submit p50 {statistics.median(submit_ms):.1f} ms, "
+            f"max {max(submit_ms):.1f} ms; {len(accepted)} accepted, {rejected} rejected with 429"
+        )
+        await asyncio.sleep(blocking.total)
+        stats = json.loads((await request(app, "GET", "/stats")).body)["jobs"]
+        print(f"before restart: {stats['by_status']}")
+
+    # Simulated restart: workers are gone, state lives on in SQLite
+    async with lifespan(app):
+        stats = json.loads((await request(app, "GET", "/stats")).body)["jobs"]
+        print(f"after restart: {stats['recovered']} jobs recovered")
+        start = time.perf_counter()
+        statuses = await _wait_all(app, accepted)
+        drained = time.perf_counter() - start
+        stats = json.loads((await request(app, "GET", "/stats")).body)["jobs"]
+        print(
+            f"drained in {drained:.2f} s: "
+            f"{sum(s == 'completed' for s in statuses.values())} completed, "
+            f"{sum(s == 'failed' for s in statuses.values())} failed, "
+            f"{len(accepted) - len(statuses)} unfinished"
+        )
+        queue, run = stats["queue_seconds"], stats["run_seconds"]
+        print(
+            f"queue latency (since restart) p50 {queue['p50']:.2f} s, p95 {queue['p95']:.2f} s; "
+            f"run time p50 {run['p50']:.2f} s"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--jobs", type=int, default=40)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--queue-max", type=int, default=24)
+    parser.add_argument("--latency", type=float, default=0.1)
+    args = parser.parse_args()
+    asyncio.run(main(args.jobs, args.workers, args.queue_max, args.latency))
@@ -0,0 +1,108 @@
+"""Repeated page fetches across research jobs with and without the page store.
+
+Serves pages from a local mock server that honours If-None-Match with 304s.
+A sequence of research jobs fetches URLs drawn from a Zipf-like popularity
+distribution, first without a store, then with a `PageStore` whose entries go
+stale after `--max-age` seconds (forcing conditional revalidation). Reports
+wall time, bytes received, hit ratio and bytes saved.
+
+    python -m benchmarks.bench_page_store --jobs 20 --pages-per-job 10
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.bench_fetch import PAGE, start_server
+from utils.page_store import PageStore
+from utils.search import WebSearchTool
+
+
+def _mock_app(port: int, latency: float):
+    counters = {"bytes": 0}
+
+    async def app(scope, receive, send):
+        if scope["type"] != "http":
+            return
+        etag = f'"{scope["path"]}"'.encode()
+        headers = dict(scope["headers"])
+        await asyncio.sleep(latency)
+        if headers.get(b"if-none-match") == etag:
+            await send({"type": "http.response.start", "status": 304, "headers": []})
+            await send({"type": "http.response.body", "body": b""})
+            return
+        body = PAGE.encode()
+        counters["bytes"] += len(body)
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [(b"content-type", b"text/html"), (b"etag", etag)],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    app.counters = counters
+    return app
+
+
+async def _jobs(tool, port, jobs, per_job, popular, delay):
+    rng = random.Random(3)
+    weights = [1 / (rank + 1) for rank in range(popular)]
+    start = time.perf_counter()
+    for _ in range(jobs):
+        pages = rng.choices(range(popular), weights, k=per_job)
+        await tool._fetch_all([f"http://127.0.0.1:{port}/page/{i}" for i in pages])
+        await asyncio.sleep(delay)
+    await tool.aclose()
+    return time.perf_counter() - start
+
+
+async def main(jobs, per_job, popular, latency, max_age):
+    logging.getLogger("utils.search").setLevel(logging.ERROR)
+    apps = []
+
+    def make_app(port):
+        apps.append(_mock_app(port, latency))
+        return apps[-1]
+
+    port = start_server(make_app)
+    counters = apps[0].counters
+    print(
+        f"{jobs} jobs x {per_job} pages over {popular} popular urls, "
+        f"{latency * 1000:.0f} ms latency, entries stale after {max_age}s"
+    )
+    delay = max_age / jobs * 2
+    print(f"jobs start {delay * 1000:.0f} ms apart")
+    print(f"{'mode':<9} {'seconds':>8} {'MB received':>12} {'hit ratio':>10} {'MB saved':>9}")
+
+    os.environ["PAGE_STORE_ENABLED"] = "false"
+    counters["bytes"] = 0
+    elapsed = await _jobs(WebSearchTool(), port, jobs, per_job, popular, delay)
+    print(f"{'no store':<9} {elapsed:>8.2f} {counters['bytes'] / 1e6:>12.2f} {'-':>10} {'-':>9}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = PageStore(str(Path(tmp) / "pages.sqlite3"), max_age=max_age)
+        tool = WebSearchTool(page_store=store)
+        counters["bytes"] = 0
+        elapsed = await _jobs(tool, port, jobs, per_job, popular, delay)
+        stats = store.stats()
+        print(
+            f"{'store':<9} {elapsed:>8.2f} {counters['bytes'] / 1e6:>12.2f} "
+            f"{stats['hit_ratio']:>10.2f} {stats['bytes_saved'] / 1e6:>9.2f}"
+        )
+        print(f"store stats: {stats}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--jobs", type=int, default=20)
+    parser.add_argument("--pages-per-job", type=int, default=10)
+    parser.add_argument("--popular", type=int, default=30)
+    parser.add_argument("--latency", type=float, default=0.1)
+    parser.add_argument("--max-age", type=float, default=1.0)
+    args = parser.parse_args()
+    asyncio.run(main(args.jobs, args.pages_per_job, args.popular, args.latency, args.max_age))
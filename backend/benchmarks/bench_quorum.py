@@ -0,0 +1,124 @@
+"""Loop latency with heavy-tailed search latencies: wait-for-all vs quorum/deadline.
+
+Grounded-search latencies are drawn from a Pareto distribution, so most
+searches are fast and a few are very slow. By default reflection waits for
+the slowest branch of each loop; in quorum mode it starts once a fraction of
+the branches has finished or a deadline has passed, and late results are
+folded into the next loop or the answer. Reports p50/p95 loop latency
+(fan-out to end of reflection), wall time per run and how many late results
+were folded or dropped.
+
+    python -m benchmarks.bench_quorum --runs 40 --scale 0.05 --alpha 1.3
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import time
+
+from langchain_core.messages import HumanMessage
+
+from benchmarks import stub_model
+from src.agent.cache import MemorySearchCache, TieredSearchCache, set_search_cache
+
+os.environ["PAGE_STORE_ENABLED"] = "false"
+
+MODES = {
+    "wait for all": {},
+    "quorum 60%": {"quorum_fraction": 0.6},
+    "deadline 0.3 s": {"quorum_deadline_seconds": 0.3},
+    "quorum 60% + 0.3 s": {"quorum_fraction": 0.6, "quorum_deadline_seconds": 0.3},
+}
+
+
+def _job(i: int, loops: int, queries: int, mode: dict):
+    state = {
+        "messages": [HumanMessage(content=f"benchmark topic number {i}")],
+        "search_query": [],
+        "sources_gathered": [],
+        "web_research_result": [],
+        "research_loop_count": 0,
+        "initial_search_query_count": queries,
+        "max_research_loops": loops,
+        "run_stats": {},
+    }
+    config = {
+        "configurable": {
+            "max_research_loops": loops,
+            "stream_answer": False,
+            "early_stop": False,
+            **mode,
+        }
+    }
+    return state, config
+
+
+async def _run(graph, job):
+    """Run one research job; returns (loop latencies, late search counts, wall seconds)"""
+    loops = []
+    late = {"searches_late": 0, "late_results_folded": 0, "late_searches_dropped": 0}
+    start = mark = time.perf_counter()
+    async for update in graph.astream(*job, stream_mode="updates"):
+        now = time.perf_counter()
+        for node, output in update.items():
+            if node == "generate_query":
+                mark = now
+            elif node == "reflection":
+                loops.append(now - mark)
+                mark = now
+            run_stats = (output or {}).get("run_stats") or {}
+            for key in late:
+                late[key] += run_stats.get(key, 0)
+    return loops, late, time.perf_counter() - start
+
+
+def _percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+async def main(runs: int, loops: int, queries: int, scale: float, alpha: float, seed: int):
+    rng = random.Random(seed)
+    # Pareto draws have a minimum of `scale` and a heavy right tail
+    stub_model.install(0.02, search_latency=lambda: scale * rng.paretovariate(alpha))
+    from src.agent.graph import graph
+
+    print(
+        f"{runs} concurrent runs x {loops} loops, {queries} initial searches, "
+        f"search latency {scale * 1000:.0f} ms x Pareto(alpha={alpha})"
+    )
+    print(
+        f"{'mode':<20} {'loop p50':>9} {'loop p95':>9} {'run mean':>9} "
+        f"{'late':>5} {'folded':>7} {'dropped':>8}"
+    )
+    for name, mode in MODES.items():
+        rng.seed(seed)
+        set_search_cache(TieredSearchCache(MemorySearchCache()))
+        results = await asyncio.gather(
+            *(_run(graph, _job(i, loops, queries, mode)) for i in range(runs))
+        )
+        loop_latencies = [latency for loops_, _, _ in results for latency in loops_]
+        late = {key: sum(r[1][key] for r in results) for key in results[0][1]}
+        print(
+            f"{name:<20} {statistics.median(loop_latencies):>8.2f}s "
+            f"{_percentile(loop_latencies, 0.95):>8.2f}s "
+            f"{statistics.mean(wall for _, _, wall in results):>8.2f}s "
+            f"{late['searches_late']:>5} {late['late_results_folded']:>7} "
+            f"{late['late_searches_dropped']:>8}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=40)
+    parser.add_argument("--loops", type=int, default=3)
+    parser.add_argument("--queries", type=int, default=5)
+    parser.add_argument("--scale", type=float, default=0.05)
+    parser.add_argument("--alpha", type=float, default=1.3)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    asyncio.run(
+        main(args.runs, args.loops, args.queries, args.scale, args.alpha, args.seed)
+    )
@@ -0,0 +1,104 @@
+"""Resume cost of checkpointed research runs vs. their total cost.
+
+For growing `max_research_loops`, each run is crashed either in its final
+answer or in its last reflection, then resumed from the SQLite checkpoint.
+Resume cost (model calls and wall time) should track the remaining work and
+stay flat as the total work grows.
+
+    python -m benchmarks.bench_resume --latency 0.05
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from uuid import uuid4
+
+from langchain_core.messages import HumanMessage
+
+from benchmarks import stub_model
+from benchmarks.stub_model import StubCrash
+from src.agent.cache import SearchCache, set_search_cache
+
+
+def _state(loops: int):
+    return {
+        "messages": [HumanMessage(content=f"resume benchmark {uuid4().hex[:6]}")],
+        "search_query": [],
+        "sources_gathered": [],
+        "web_research_result": [],
+        "research_loop_count": 0,
+        "initial_search_query_count": 3,
+        "max_research_loops": loops,
+        "run_stats": {},
+    }
+
+
+def _config(loops: int):
+    return {
+        "configurable": {
+            "thread_id": uuid4().hex,
+            "max_research_loops": loops,
+            "early_stop": False,
+        }
+    }
+
+
+async def _crash_and_resume(graph, loops: int, kind: str, after: int):
+    config = _config(loops)
+    stub_model.stats.reset()
+    stub_model.stats.arm_crash(kind, after)
+    try:
+        await graph.ainvoke(_state(loops), config)
+        raise AssertionError("stub did not crash")
+    except StubCrash:
+        pass
+    stub_model.stats.reset()
+    started = time.perf_counter()
+    await graph.ainvoke(None, config)
+    return stub_model.stats.calls, time.perf_counter() - started
+
+
+async def main(latency: float, max_loops: int):
+    stub_model.install(latency)
+    # Resume must not be helped by cached searches from the crashed attempt
+    set_search_cache(SearchCache())
+    from src.agent.checkpoint import open_checkpointer
+    from src.agent.graph import build_graph
+
+    with tempfile.TemporaryDirectory() as tmp:
+        async with open_checkpointer(os.path.join(tmp, "checkpoints.sqlite3")) as saver:
+            graph = build_graph(saver)
+            print(f"stub latency {latency * 1000:.0f} ms per model call")
+            print(
+                f"{'loops':>5} {'full calls':>10} {'full s':>7} | "
+                f"{'resume@answer calls':>19} {'s':>6} | "
+                f"{'resume@last reflection calls':>28} {'s':>6}"
+            )
+            for loops in range(1, max_loops + 1):
+                stub_model.stats.reset()
+                started = time.perf_counter()
+                await graph.ainvoke(_state(loops), _config(loops))
+                full_seconds = time.perf_counter() - started
+                full_calls = stub_model.stats.calls
+
+                answer_calls, answer_seconds = await _crash_and_resume(
+                    graph, loops, "answer", 0
+                )
+                reflection_calls, reflection_seconds = await _crash_and_resume(
+                    graph, loops, "reflection", loops - 1
+                )
+                print(
+                    f"{loops:>5} {full_calls:>10} {full_seconds:>7.2f} | "
+                    f"{answer_calls:>19} {answer_seconds:>6.2f} | "
+                    f"{reflection_calls:>28} {reflection_seconds:>6.2f}"
+                )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--max-loops", type=int, default=4)
+    args = parser.parse_args()
+    asyncio.run(main(args.latency, args.max_loops))
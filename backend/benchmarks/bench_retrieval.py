@@ -0,0 +1,86 @@
+"""Retrieval latency of the in-process passage index at 10k and 100k passages.
+
+Builds a `PassageIndex` over synthetic passages drawn from a Zipf-distributed
+vocabulary and reports indexing time, BM25 query latency and, with hashed
+vectors enabled, the blended BM25 + NumPy cosine query latency.
+
+    python -m benchmarks.bench_retrieval --sizes 10000 100000 --queries 50
+"""
+
+import argparse
+import random
+import statistics
+import time
+
+from src.agent.passages import PassageIndex
+
+
+def _vocabulary(size: int, rng: random.Random):
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    return list({"".join(rng.choices(letters, k=rng.randint(4, 10))) for _ in range(size)})
+
+
+def _percentiles(samples):
+    samples = sorted(samples)
+    return (
+        statistics.median(samples) * 1000,
+        samples[int(len(samples) * 0.95) - 1] * 1000,
+    )
+
+
+def main(sizes, queries: int, words: int, dims: int):
+    rng = random.Random(0)
+    vocabulary = _vocabulary(20000, rng)
+    weights = [1 / (rank + 1) for rank in range(len(vocabulary))]
+    query_set = [
+        " ".join(rng.choices(vocabulary[:3000], k=rng.randint(3, 8)))
+        for _ in range(queries)
+    ]
+
+    print(
+        f"{'passages':>9} {'index s':>8} {'bm25 p50 ms':>12} {'bm25 p95 ms':>12} "
+        f"{'vectors s':>10} {'hybrid p50 ms':>14} {'hybrid p95 ms':>14}"
+    )
+    for size in sizes:
+        passages = [
+            " ".join(rng.choices(vocabulary, weights, k=words)) + "."
+            for _ in range(size)
+        ]
+        index = PassageIndex(vector_dims=dims)
+        start = time.perf_counter()
+        for passage in passages:
+            index.add_passage(passage)
+        index.bm25("warm up")
+        indexed = time.perf_counter() - start
+
+        bm25 = []
+        for query in query_set:
+            t0 = time.perf_counter()
+            index.search(query, 10)
+            bm25.append(time.perf_counter() - t0)
+
+        start = time.perf_counter()
+        index.cosine("warm up")
+        vectors = time.perf_counter() - start
+
+        hybrid = []
+        for query in query_set:
+            t0 = time.perf_counter()
+            index.search(query, 10, vector_weight=0.3)
+            hybrid.append(time.perf_counter() - t0)
+
+        print(
+            f"{size:>9} {indexed:>8.2f} {_percentiles(bm25)[0]:>12.2f} "
+            f"{_percentiles(bm25)[1]:>12.2f} {vectors:>10.2f} "
+            f"{_percentiles(hybrid)[0]:>14.2f} {_percentiles(hybrid)[1]:>14.2f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--words", type=int, default=100)
+    parser.add_argument("--dims", type=int, default=256)
+    args = parser.parse_args()
+    main(args.sizes, args.queries, args.words, args.dims)
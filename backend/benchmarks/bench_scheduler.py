@@ -0,0 +1,123 @@
+"""Tail latency and fairness of scheduled vs. unscheduled model calls under a quota.
+
+A simulated provider enforces a requests-per-second quota and answers calls
+over it with a 429. One large research run (a wide fan-out) and several small
+runs issue calls at the same time, either directly with per-call retries (the
+old `max_retries` behaviour) or through the shared `ModelScheduler`. Reports
+call latency percentiles, 429s received and when the small runs finished.
+
+    python -m benchmarks.bench_scheduler --quota 20 --big 120 --small 5
+"""
+
+import argparse
+import asyncio
+import random
+import time
+
+from src.agent.scheduler import ModelScheduler, TokenBucket
+
+MODEL = "stub-model"
+
+
+class QuotaExceeded(Exception):
+    code = 429
+
+
+class Provider:
+    """Fake endpoint with a per-second quota and a heavy-ish latency tail"""
+
+    def __init__(self, quota_per_second: float, latency: float):
+        self.bucket = TokenBucket(quota_per_second * 60, quota_per_second)
+        self.latency = latency
+        self.rejected = 0
+
+    async def call(self):
+        if self.bucket.take() > 0:
+            self.rejected += 1
+            await asyncio.sleep(0.005)
+            raise QuotaExceeded("429 RESOURCE_EXHAUSTED")
+        await asyncio.sleep(self.latency * random.lognormvariate(0, 0.4))
+
+
+async def _direct(provider: Provider, attempts: int = 3):
+    """Per-call retries with exponential backoff, like the SDK's max_retries"""
+    for attempt in range(attempts):
+        try:
+            return await provider.call()
+        except QuotaExceeded:
+            if attempt == attempts - 1:
+                raise
+            await asyncio.sleep(min(1.0 * 2 ** attempt, 8) * random.uniform(0.5, 1.0))
+
+
+async def _scenario(mode: str, quota: float, latency: float, big: int, small: int):
+    random.seed(7)
+    provider = Provider(quota, latency)
+    scheduler = ModelScheduler(
+        limits={MODEL: (quota * 60 * 0.9, max(int(quota * latency * 2), 1))},
+        max_attempts=4,
+        base_backoff=0.25,
+    )
+    latencies, failures = [], 0
+    started = time.perf_counter()
+
+    async def one(run: str):
+        nonlocal failures
+        t0 = time.perf_counter()
+        try:
+            if mode == "scheduled":
+                await scheduler.arun(MODEL, run, provider.call)
+            else:
+                await _direct(provider)
+            latencies.append(time.perf_counter() - t0)
+        except QuotaExceeded:
+            failures += 1
+
+    async def run(name: str, calls: int):
+        await asyncio.gather(*(one(name) for _ in range(calls)))
+        return time.perf_counter() - started
+
+    small_runs = [run(f"small-{i}", 3) for i in range(small)]
+    results = await asyncio.gather(run("big", big), *small_runs)
+    latencies.sort()
+
+    def pct(p):
+        return latencies[min(int(len(latencies) * p), len(latencies) - 1)] if latencies else 0.0
+
+    return {
+        "mode": mode,
+        "p50": pct(0.50),
+        "p95": pct(0.95),
+        "p99": pct(0.99),
+        "rejected": provider.rejected,
+        "failed": failures,
+        "small_done": max(results[1:]) if small else 0.0,
+        "total": results[0],
+    }
+
+
+async def main(quota: float, latency: float, big: int, small: int):
+    print(
+        f"quota {quota:.0f} req/s, latency {latency * 1000:.0f} ms, "
+        f"1 run x {big} calls + {small} runs x 3 calls"
+    )
+    print(
+        f"{'mode':<11} {'p50':>7} {'p95':>7} {'p99':>7} {'429s':>6} "
+        f"{'failed':>7} {'small done':>11} {'total':>7}"
+    )
+    for mode in ("direct", "scheduled"):
+        r = await _scenario(mode, quota, latency, big, small)
+        print(
+            f"{r['mode']:<11} {r['p50']:>7.2f} {r['p95']:>7.2f} {r['p99']:>7.2f} "
+            f"{r['rejected']:>6} {r['failed']:>7} {r['small_done']:>11.2f} {r['total']:>7.2f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--quota", type=float, default=20)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--big", type=int, default=120)
+    parser.add_argument("--small", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(main(args.quota, args.latency, args.big, args.small))
@@ -0,0 +1,74 @@
+"""Load test: 50 concurrent identical research requests with and without single-flight.
+
+Every request asks the same question, so all runs generate the same queries
+at the same moment and miss the search cache together. Without coalescing each
+run issues its own grounded search; with it, one call per distinct query is
+issued and the others wait for it. Reports grounded-search calls issued,
+coalesced searches and wall time, for async (`ainvoke`) and sync (`invoke` on
+threads) runs.
+
+    python -m benchmarks.bench_single_flight --requests 50 --latency 0.2
+"""
+
+import argparse
+import asyncio
+import time
+
+from langchain_core.messages import HumanMessage
+
+from benchmarks import stub_model
+from src.agent.cache import MemorySearchCache, TieredSearchCache, set_search_cache
+from src.agent.singleflight import SingleFlight, set_single_flight
+
+
+def _job():
+    state = {
+        "messages": [HumanMessage(content="trending topic everyone asks about")],
+        "search_query": [],
+        "sources_gathered": [],
+        "web_research_result": [],
+        "research_loop_count": 0,
+        "initial_search_query_count": 3,
+        "max_research_loops": 1,
+        "run_stats": {},
+    }
+    config = {"configurable": {"max_research_loops": 1, "stream_answer": False}}
+    return state, config
+
+
+async def _run(graph, mode: str, requests: int):
+    if mode == "async":
+        return await asyncio.gather(*(graph.ainvoke(*_job()) for _ in range(requests)))
+    loop = asyncio.get_running_loop()
+    return await asyncio.gather(
+        *(loop.run_in_executor(None, graph.invoke, *_job()) for _ in range(requests))
+    )
+
+
+async def main(requests: int, latency: float):
+    stub_model.install(latency)
+    from src.agent.graph import graph
+
+    print(f"{requests} concurrent identical requests, stub latency {latency * 1000:.0f} ms")
+    print(f"{'mode':<6} {'single-flight':<14} {'searches issued':>16} {'coalesced':>10} {'seconds':>8}")
+    for mode in ("async", "sync"):
+        for enabled in (False, True):
+            set_search_cache(TieredSearchCache(MemorySearchCache()))
+            group = set_single_flight(SingleFlight(enabled=enabled))
+            stub_model.stats.reset()
+            start = time.perf_counter()
+            finals = await _run(graph, mode, requests)
+            elapsed = time.perf_counter() - start
+            coalesced = sum(f["run_stats"].get("searches_coalesced", 0) for f in finals)
+            print(
+                f"{mode:<6} {'on' if enabled else 'off':<14} "
+                f"{group.stats()['issued']:>16} {coalesced:>10} {elapsed:>8.2f}"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.2)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.latency))
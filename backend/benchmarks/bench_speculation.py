@@ -0,0 +1,91 @@
+"""Speculative prefetch of follow-up searches, on vs off.
+
+Runs the research loop against the stub with a slow reflection call. With
+speculation on, the query model predicts the next follow-ups while the
+reasoning model reflects and their searches start right away; follow-ups that
+match a prediction are then served from the cache or join the search still in
+flight. Reports the per-loop hit rate and head start, and the wall time of a
+whole run with and without speculation.
+
+    python -m benchmarks.bench_speculation --loops 4 --latency 0.3 --reflection-latency 1.0
+"""
+
+import argparse
+import asyncio
+import os
+import time
+
+from langchain_core.messages import HumanMessage
+
+from benchmarks import stub_model
+from src.agent.cache import MemorySearchCache, TieredSearchCache, set_search_cache
+
+os.environ["PAGE_STORE_ENABLED"] = "false"
+
+
+def _job(loops: int, speculative: bool):
+    state = {
+        "messages": [HumanMessage(content="state of grid scale battery storage")],
+        "search_query": [],
+        "sources_gathered": [],
+        "web_research_result": [],
+        "research_loop_count": 0,
+        "initial_search_query_count": 3,
+        "max_research_loops": loops,
+        "run_stats": {},
+    }
+    config = {
+        "configurable": {
+            "max_research_loops": loops,
+            "stream_answer": False,
+            "early_stop": False,
+            "digest_token_budget": 0,
+            "evidence_top_k": 0,
+            "speculative_prefetch": speculative,
+        }
+    }
+    return state, config
+
+
+async def main(loops: int, latency: float, reflection_latency: float, runs: int):
+    stub_model.install(latency, reflection_latency=reflection_latency)
+    from src.agent.graph import graph
+
+    print(
+        f"{loops} loops, search latency {latency * 1000:.0f} ms, "
+        f"reflection latency {reflection_latency * 1000:.0f} ms, {runs} runs each"
+    )
+    timings = {}
+    for speculative in (False, True):
+        elapsed, calls = [], 0
+        for _ in range(runs):
+            set_search_cache(TieredSearchCache(MemorySearchCache()))
+            stub_model.stats.reset()
+            start = time.perf_counter()
+            final = await graph.ainvoke(*_job(loops, speculative))
+            elapsed.append(time.perf_counter() - start)
+            calls += stub_model.stats.calls
+        timings[speculative] = sum(elapsed) / runs
+        if speculative:
+            print(f"{'loop':>4} {'predicted':>10} {'matched':>8} {'hit rate':>9} {'saved s':>8}")
+            for entry in final["run_stats"].get("speculation", []):
+                print(
+                    f"{entry['loop']:>4} {entry['predicted']:>10} {entry['matched']:>8} "
+                    f"{entry['hit_rate']:>9.0%} {entry['saved_seconds']:>8.2f}"
+                )
+        print(
+            f"speculation {'on ' if speculative else 'off'}: "
+            f"{timings[speculative]:.2f} s per run, {calls / runs:.0f} model calls per run"
+        )
+    saved = timings[False] - timings[True]
+    print(f"wall time saved: {saved:.2f} s per run ({saved / loops:.2f} s per loop)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--loops", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.3)
+    parser.add_argument("--reflection-latency", type=float, default=1.0)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+    asyncio.run(main(args.loops, args.latency, args.reflection_latency, args.runs))
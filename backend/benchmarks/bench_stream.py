@@ -0,0 +1,46 @@
+"""Time-to-first-byte of /research/stream vs. the blocking /research endpoint.
+
+Both endpoints run the full graph against the fake-Gemini stub; the blocking
+endpoint only responds once the whole multi-loop run is finished.
+
+    python -m benchmarks.bench_stream --latency 0.2 --runs 5
+"""
+
+import argparse
+import asyncio
+import statistics
+
+from benchmarks import stub_model
+from benchmarks.asgi_client import request
+from src.agent.cache import SearchCache, set_search_cache
+
+
+async def main(latency: float, runs: int):
+    stub_model.install(latency)
+    set_search_cache(SearchCache())
+    from src.api.main import app
+
+    payload = {"query": "", "max_research_loops": 2, "initial_search_query_count": 3}
+    print(f"stub latency {latency * 1000:.0f} ms per model call, {runs} runs")
+    print(f"{'endpoint':<18} {'ttfb p50 ms':>12} {'total p50 ms':>13} {'events':>7}")
+    for path in ("/research", "/research/stream"):
+        ttfbs, totals, events = [], [], []
+        for i in range(runs):
+            payload["query"] = f"streaming benchmark {path} {i}"
+            response = await request(app, "POST", path, payload)
+            assert response.status == 200, response.body[:200]
+            ttfbs.append(response.ttfb * 1000)
+            totals.append(response.total * 1000)
+            events.append(response.body.count(b"event: "))
+        print(
+            f"{path:<18} {statistics.median(ttfbs):>12.1f} "
+            f"{statistics.median(totals):>13.1f} {statistics.median(events):>7.0f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(main(args.latency, args.runs))
@@ -0,0 +1,134 @@
+"""Tracing overhead: research runs with tracing off, sampled, and fully sampled.
+
+Runs the graph against a zero-latency stub, so the measured time is almost all
+CPU spent in the graph and the worst case for relative tracing overhead (real
+runs spend seconds waiting on the model). Rounds of each mode are
+interleaved to even out noise, and the median CPU time per run is compared to
+the run with tracing disabled. Sampled spans go to the OpenTelemetry hook when
+`opentelemetry-api` is installed, else to a hook that keeps them in memory.
+
+    python -m benchmarks.bench_tracing --runs 40 --rounds 7
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+from langchain_core.messages import HumanMessage
+
+from benchmarks import stub_model
+from src.agent import tracing
+from src.agent.cache import MemorySearchCache, TieredSearchCache, set_search_cache
+
+os.environ["PAGE_STORE_ENABLED"] = "false"
+
+
+class _KeepSpans(tracing.SpanHook):
+    def __init__(self):
+        self.spans = []
+
+    def on_end(self, span):
+        self.spans.append(span.to_dict())
+
+
+def _hook():
+    try:
+        return tracing.OpenTelemetryHook()
+    except ImportError:
+        return _KeepSpans()
+
+
+def _job(i: int):
+    state = {
+        "messages": [HumanMessage(content=f"tracing question {i}")],
+        "search_query": [],
+        "sources_gathered": [],
+        "web_research_result": [],
+        "research_loop_count": 0,
+        "initial_search_query_count": 3,
+        "max_research_loops": 2,
+        "run_stats": {},
+    }
+    return state, {"configurable": {"max_research_loops": 2, "early_stop": False}}
+
+
+async def _round(graph, runs: int, concurrency: int) -> float:
+    """CPU seconds per research run, each run under a root span like the API's"""
+    set_search_cache(TieredSearchCache(MemorySearchCache()))
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(i):
+        async with semaphore:
+            with tracing.span("research", tracing.RUN_SECONDS, endpoint="bench"):
+                await graph.ainvoke(*_job(i))
+
+    started = time.process_time()
+    await asyncio.gather(*(run(i) for i in range(runs)))
+    return (time.process_time() - started) / runs
+
+
+async def main(runs: int, rounds: int, concurrency: int, sample_rate: float):
+    stub_model.install(0.0)
+    from src.agent.graph import graph
+
+    modes = {
+        "disabled": tracing.Tracer(enabled=False),
+        f"sampled {sample_rate:.0%}": tracing.Tracer(sample_rate=sample_rate, hooks=[_hook()]),
+        "sampled 100%": tracing.Tracer(sample_rate=1.0, hooks=[_hook()]),
+    }
+    print(f"{runs} runs x {rounds} rounds per mode, concurrency {concurrency}, zero-latency stub")
+    print(f"hook: {type(_hook()).__name__}")
+
+    tracing.set_tracer(modes["disabled"])
+    await _round(graph, runs, concurrency)  # warm up
+    samples = {name: [] for name in modes}
+    for _ in range(rounds):
+        for name, tracer in modes.items():
+            tracing.set_tracer(tracer)
+            samples[name].append(await _round(graph, runs, concurrency))
+
+    baseline = statistics.median(samples["disabled"])
+    for name, values in samples.items():
+        per_run = statistics.median(values)
+        print(
+            f"{name:<14} {per_run * 1000:>7.2f} ms CPU/run  "
+            f"overhead {(per_run - baseline) / baseline:>+6.1%}  "
+            f"({(per_run - baseline) * 1000:+.2f} ms/run)"
+        )
+
+    # End-to-end differences are near the noise floor, so also time spans directly
+    counter = _KeepSpans()
+    tracing.set_tracer(tracing.Tracer(sample_rate=1.0, hooks=[counter]))
+    await _round(graph, 1, 1)
+    spans_per_run = len(counter.spans)
+    print(f"{spans_per_run} spans per run")
+    for name, tracer in modes.items():
+        cost = _span_cost(tracer)
+        print(
+            f"{name:<14} {cost * 1e6:>7.2f} us/span  "
+            f"x {spans_per_run} = {cost * spans_per_run / baseline:.2%} of a run's CPU"
+        )
+
+
+def _span_cost(tracer: tracing.Tracer, n: int = 20000) -> float:
+    """Seconds per node span with one nested model call span, as the graph records them"""
+    tracing.set_tracer(tracer)
+    started = time.process_time()
+    for _ in range(n):
+        with tracing.span("research", tracing.RUN_SECONDS, endpoint="bench"):
+            with tracing.span("web_research", tracing.NODE_SECONDS, node="web_research"):
+                with tracing.model_span("stub", "chat", "prompt text") as span:
+                    tracing.record_response(span, "stub", "response text")
+    return (time.process_time() - started) / (3 * n)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=40)
+    parser.add_argument("--rounds", type=int, default=7)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--sample-rate", type=float, default=0.05)
+    args = parser.parse_args()
+    asyncio.run(main(args.runs, args.rounds, args.concurrency, args.sample_rate))
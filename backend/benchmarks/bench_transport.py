@@ -0,0 +1,99 @@
+"""Record, replay and synthetic model transports against the stub.
+
+Records a set of research runs made against the stub model into a cassette,
+then replays them with the recorded latency and with no latency, replays a
+different set of questions from the same cassette, and finally runs a
+synthetic transport with lognormal latencies. Reports the cassette size, wall
+time per phase, how replayed calls were matched, and whether replayed answers
+match the recorded ones.
+
+    python -m benchmarks.bench_transport --runs 8 --latency 0.2
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from langchain_core.messages import HumanMessage
+
+from benchmarks import stub_model
+from src.agent.cache import MemorySearchCache, TieredSearchCache, set_search_cache
+from src.agent.clients import ClientRegistry, set_registry
+from src.agent.transport import Synthetic, transport_factories
+
+os.environ["PAGE_STORE_ENABLED"] = "false"
+
+
+def _job(question: str):
+    state = {
+        "messages": [HumanMessage(content=question)],
+        "search_query": [],
+        "sources_gathered": [],
+        "web_research_result": [],
+        "research_loop_count": 0,
+        "initial_search_query_count": 3,
+        "max_research_loops": 2,
+        "run_stats": {},
+    }
+    config = {"configurable": {"max_research_loops": 2, "stream_answer": False}}
+    return state, config
+
+
+async def _phase(graph, name: str, questions, factories):
+    registry = set_registry(ClientRegistry(*factories))
+    set_search_cache(TieredSearchCache(MemorySearchCache()))
+    start = time.perf_counter()
+    finals = await asyncio.gather(*(graph.ainvoke(*_job(q)) for q in questions))
+    elapsed = time.perf_counter() - start
+    print(f"{name:<28} {elapsed:>8.2f} s", end="")
+    # The genai client of a record or replay transport holds the shared cassette
+    return [final["messages"][-1].content for final in finals], registry.genai_client
+
+
+async def main(runs: int, latency: float):
+    from src.agent.graph import graph
+
+    path = os.path.join(tempfile.mkdtemp(), "cassette.jsonl.gz")
+    questions = [f"recorded question number {i}" for i in range(runs)]
+    others = [f"unrecorded question number {i}" for i in range(runs)]
+    print(f"{runs} concurrent runs, stub latency {latency * 1000:.0f} ms")
+
+    factories = transport_factories(
+        "record",
+        path,
+        chat_model_factory=lambda model, temperature: stub_model.StubChatModel(
+            model=model, temperature=temperature, latency=latency
+        ),
+        genai_client_factory=lambda: stub_model.StubGenaiClient(latency),
+    )
+    recorded, client = await _phase(graph, "record (stub)", questions, factories)
+    client.cassette.close()
+    print(f"   cassette {os.path.getsize(path) / 1024:.1f} KiB")
+
+    for name, scale, batch in (
+        ("replay, recorded latency", 1.0, questions),
+        ("replay, no latency", 0.0, questions),
+        ("replay, other questions", 0.0, others),
+    ):
+        factories = transport_factories("replay", path, latency_scale=scale)
+        answers, client = await _phase(graph, name, batch, factories)
+        cassette = client.cassette.stats()
+        same = sum(a == b for a, b in zip(answers, recorded)) if batch is questions else "-"
+        print(
+            f"   exact {cassette['replayed_exact']}, fallback {cassette['replayed_fallback']}, "
+            f"answers identical {same}"
+        )
+
+    synthetic = Synthetic(latency=f"lognormal:{latency}:0.5", search_chars=3000, sources=5)
+    await _phase(graph, "synthetic, lognormal", questions, transport_factories("synthetic", synthetic=synthetic))
+    print()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.2)
+    args = parser.parse_args()
+    asyncio.run(main(args.runs, args.latency))
@@ -0,0 +1,299 @@
+"""Local fake-Gemini stub with injected latency for offline benchmarks.
+
+`install()` swaps the process-wide client registry for one backed by the stub,
+so the compiled graph runs end to end without network access or API quota.
+"""
+
+import asyncio
+import os
+import random
+import re
+import time
+from collections import Counter
+from types import SimpleNamespace
+from typing import Optional
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+os.environ.setdefault("GEMINI_API_KEY", "stub-key")
+
+from src.agent.tools_and_schemas import Reflection, SearchQueryList
+from src.agent.transport import truncate_output
+
+
+class StubCrash(RuntimeError):
+    """Raised by an armed stub to simulate a process crash mid-run."""
+
+
+class StubStats:
+    def __init__(self):
+        self.calls = 0
+        self.by_kind = Counter()
+        self._crash = None
+
+    def reset(self):
+        self.calls = 0
+        self.by_kind = Counter()
+        self._crash = None
+
+    def arm_crash(self, kind: str, after: int = 0):
+        """Fail the (after + 1)-th upcoming "queries", "reflection" or "answer" call."""
+        self._crash = [kind, after]
+
+    def record(self, kind: str):
+        self.calls += 1
+        self.by_kind[kind] += 1
+        if self._crash and self._crash[0] == kind:
+            if self._crash[1] == 0:
+                self._crash = None
+                raise StubCrash(f"stub crashed during {kind}")
+            self._crash[1] -= 1
+
+
+stats = StubStats()
+
+
+_VOCABULARY = (
+    "adoption budget capacity cloud compliance cost deployment efficiency energy "
+    "funding growth hardware incident latency market model network outage patent "
+    "performance pilot policy pricing privacy protocol research revenue risk "
+    "safety scale security standard startup supply survey throughput trial "
+    "upgrade usage vendor workload"
+).split()
+
+
+def _findings(query: str, sentences: int = 12) -> str:
+    """Deterministic, varied research text so summaries do not trivially dedupe."""
+    rng = random.Random(query)
+    return " ".join(
+        f"Sources on {query} report that "
+        + " ".join(rng.choice(_VOCABULARY) for _ in range(12))
+        + f" changed by {rng.randint(2, 90)} percent."
+        for _ in range(sentences)
+    )
+
+
+def _grounded_response(prompt: str, n_chunks: int = 3):
+    query = prompt.split("Research Query:", 1)[-1].strip().splitlines()[0]
+    slug = re.sub(r"[^a-z0-9]+", "-", query.lower()).strip("-")[:40] or "query"
+    chunks = [
+        SimpleNamespace(
+            web=SimpleNamespace(
+                uri=f"https://example.com/{slug}/{i}", title=f"{query} ({i})"
+            )
+        )
+        for i in range(n_chunks)
+    ]
+    text = _findings(query)
+    # Like Gemini: each sentence is a supported segment, with UTF-8 byte offsets
+    supports = [
+        SimpleNamespace(
+            segment=SimpleNamespace(start_index=match.start(), end_index=match.end()),
+            grounding_chunk_indices=[k % n_chunks],
+        )
+        for k, match in enumerate(re.finditer(rb"[^\s.][^.]*\.", text.encode("utf-8")))
+    ]
+    return SimpleNamespace(
+        text=text,
+        candidates=[
+            SimpleNamespace(
+                grounding_metadata=SimpleNamespace(
+                    grounding_chunks=chunks, grounding_supports=supports
+                )
+            )
+        ],
+    )
+
+
+_ANGLES = [
+    "history", "current state", "economics", "criticism", "future outlook",
+    "key players", "regulation", "technical details", "case studies", "statistics",
+]
+_FOLLOW_UPS = [
+    "open problems in", "adoption barriers for", "recent benchmarks of",
+    "expert opinions on", "cost analysis of", "security risks of",
+    "industry standards for", "alternatives to",
+]
+
+
+def _topic(prompt: str) -> str:
+    match = re.search(r"Research (?:Topic|Question): (.*)", prompt)
+    return match.group(1).strip() if match else "topic"
+
+
+def _structured(schema, prompt: str):
+    topic = _topic(prompt)
+    if schema is SearchQueryList and "Queries already run:" in prompt:
+        # Predict the reflection's follow-ups for the queries run so far
+        offset = len(re.findall(r"^- ", prompt, re.MULTILINE)) + 1
+        match = re.search(r"predict the (\d+)", prompt)
+        count = int(match.group(1)) if match else 3
+        return SearchQueryList(
+            query=[
+                f"{_FOLLOW_UPS[(offset + i) % len(_FOLLOW_UPS)]} {topic}"
+                for i in range(count)
+            ]
+        )
+    if schema is SearchQueryList:
+        match = re.search(r"generate (\d+)", prompt)
+        count = int(match.group(1)) if match else 3
+        return SearchQueryList(
+            query=[f"{_ANGLES[i % len(_ANGLES)]} of {topic}" for i in range(count)]
+        )
+    if schema is Reflection:
+        # Vary the follow-ups with the amount of research done so far
+        offset = len(set(re.findall(r"Sources on (.*?) report", prompt))) + 1
+        return Reflection(
+            is_sufficient=False,
+            knowledge_gap="stub gap",
+            follow_up_queries=[
+                f"{_FOLLOW_UPS[(offset + i) % len(_FOLLOW_UPS)]} {topic}"
+                for i in range(2)
+            ],
+        )
+    raise TypeError(f"Unsupported schema {schema!r}")
+
+
+def _answer(prompt: str) -> AIMessage:
+    ids = re.findall(r"\[\d+-\d+\]", prompt)
+    return AIMessage(content="Stub answer citing " + " ".join(ids[:5]))
+
+
+def _delay(latency) -> float:
+    """Seconds to wait for one call; `latency` may be a sampler such as a Pareto draw"""
+    return latency() if callable(latency) else latency
+
+
+class _StubModels:
+    def __init__(self, latency):
+        self.latency = latency
+
+    def generate_content(self, model, contents, config=None):
+        time.sleep(_delay(self.latency))
+        stats.record("search")
+        return _grounded_response(contents)
+
+
+class _StubAsyncModels:
+    def __init__(self, latency):
+        self.latency = latency
+
+    async def generate_content(self, model, contents, config=None):
+        await asyncio.sleep(_delay(self.latency))
+        stats.record("search")
+        return _grounded_response(contents)
+
+
+class StubGenaiClient:
+    """Stand-in for `google.genai.Client` exposing `models` and `aio.models`."""
+
+    def __init__(self, latency=0.05):
+        self.models = _StubModels(latency)
+        self.aio = SimpleNamespace(models=_StubAsyncModels(latency))
+
+
+class _StubStructured:
+    def __init__(self, latency: float, schema, reflection_latency=None):
+        self.schema = schema
+        self.latency = (
+            reflection_latency
+            if reflection_latency is not None and self._kind() == "reflection"
+            else latency
+        )
+
+    def _kind(self) -> str:
+        return "queries" if self.schema is SearchQueryList else "reflection"
+
+    def invoke(self, prompt, config=None, **kwargs):
+        time.sleep(self.latency)
+        stats.record(self._kind())
+        return _structured(self.schema, prompt)
+
+    async def ainvoke(self, prompt, config=None, **kwargs):
+        await asyncio.sleep(self.latency)
+        stats.record(self._kind())
+        return _structured(self.schema, prompt)
+
+
+class StubChatModel(BaseChatModel):
+    """Stand-in for a pooled `ChatGoogleGenerativeAI` instance.
+
+    It is a real chat model, so callbacks and `astream_events` see the same
+    start/stream/end events as they would for Gemini.
+    """
+
+    model: str
+    temperature: float = 0.0
+    latency: float = 0.05
+    reflection_latency: Optional[float] = None
+
+    @property
+    def _llm_type(self) -> str:
+        return "stub-gemini"
+
+    def with_structured_output(self, schema, **kwargs):
+        return _StubStructured(self.latency, schema, self.reflection_latency)
+
+    def _text(self, messages, kwargs) -> str:
+        return truncate_output(_answer(messages[-1].content).content, kwargs)
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        time.sleep(self.latency)
+        stats.record("answer")
+        message = AIMessage(content=self._text(messages, kwargs))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        await asyncio.sleep(self.latency)
+        stats.record("answer")
+        message = AIMessage(content=self._text(messages, kwargs))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        time.sleep(self.latency)
+        stats.record("answer")
+        for token in re.findall(r"\S+\s*", self._text(messages, kwargs)):
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        await asyncio.sleep(self.latency)
+        stats.record("answer")
+        for token in re.findall(r"\S+\s*", self._text(messages, kwargs)):
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                await run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+
+
+def install(
+    latency: float = 0.05,
+    reflection_latency: Optional[float] = None,
+    search_latency=None,
+):
+    """Route every model call made through the client registry to the stub.
+
+    `reflection_latency` overrides `latency` for reflection calls, which are
+    the slowest calls against a real reasoning model. `search_latency`
+    overrides it for grounded searches and may be a callable drawing a new
+    latency per call.
+    """
+    from src.agent.clients import ClientRegistry, set_registry
+
+    return set_registry(
+        ClientRegistry(
+            chat_model_factory=lambda model, temperature: StubChatModel(
+                model=model,
+                temperature=temperature,
+                latency=latency,
+                reflection_latency=reflection_latency,
+            ),
+            genai_client_factory=lambda: StubGenaiClient(
+                latency if search_latency is None else search_latency
+            ),
+        )
+    )
@@ -0,0 +1,270 @@
+"""End-to-end benchmark suite for the research graph and the API, against the stub.
+
+Runs the compiled graph and the FastAPI app (through the in-process ASGI
+client) and reports:
+
+- per-node latency percentiles
+- end-to-end latency and throughput at several concurrency levels
+- model calls per run, by kind
+- peak RSS
+- a sweep over `number_of_initial_queries` x `max_research_loops`
+
+Results are written as JSON. With `--baseline`, each metric is compared to a
+stored run, and the exit status is 1 when any metric regresses by more than
+`--tolerance`.
+
+    python -m benchmarks.suite --output results.json --baseline benchmarks/baseline.json
+    python -m benchmarks.suite --output benchmarks/baseline.json   # refresh the baseline
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import sys
+import time
+from collections import defaultdict
+from typing import Any, Dict, List
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import HumanMessage
+
+from benchmarks import stub_model
+from benchmarks.asgi_client import request
+from src.agent.cache import MemorySearchCache, TieredSearchCache, set_search_cache
+
+os.environ["PAGE_STORE_ENABLED"] = "false"
+os.environ["CHECKPOINT_ENABLED"] = "false"
+
+_NODES = {"generate_query", "web_research", "reflection", "finalize_answer"}
+
+
+class NodeTimer(BaseCallbackHandler):
+    """Callback handler collecting the wall time of every graph node run"""
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+        self._started: Dict[Any, tuple] = {}
+
+    def on_chain_start(self, serialized, inputs, *, run_id, tags=None, metadata=None, **kwargs):
+        node = (metadata or {}).get("langgraph_node")
+        # Only the node run itself carries a graph:step tag, not the runnables inside it
+        if node in _NODES and kwargs.get("name") == node and \
+                any(tag.startswith("graph:step:") for tag in tags or []):
+            self._started[run_id] = (node, time.perf_counter())
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        started = self._started.pop(run_id, None)
+        if started is not None:
+            self.samples[started[0]].append(time.perf_counter() - started[1])
+
+    on_chain_error = on_chain_end
+
+
+def percentiles(samples: List[float]) -> Dict[str, float]:
+    if not samples:
+        return {}
+    ordered = sorted(samples)
+
+    def at(q: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 2)
+
+    return {"p50_ms": at(0.5), "p95_ms": at(0.95), "p99_ms": at(0.99), "count": len(ordered)}
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def _job(tag: str, initial_queries: int, loops: int):
+    state = {
+        "messages": [HumanMessage(content=f"suite question {tag}")],
+        "search_query": [],
+        "sources_gathered": [],
+        "web_research_result": [],
+        "research_loop_count": 0,
+        "initial_search_query_count": initial_queries,
+        "max_research_loops": loops,
+        "run_stats": {},
+    }
+    config = {
+        "configurable": {
+            "number_of_initial_queries": initial_queries,
+            "max_research_loops": loops,
+            # Fixed loop counts, so the sweep measures what it says
+            "early_stop": False,
+        }
+    }
+    return state, config
+
+
+async def _bounded(concurrency: int, jobs):
+    """Run coroutine factories at most `concurrency` at a time; returns each job's seconds"""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def timed(job):
+        async with semaphore:
+            started = time.perf_counter()
+            await job()
+            return time.perf_counter() - started
+
+    return await asyncio.gather(*(timed(job) for job in jobs))
+
+
+def _reset():
+    set_search_cache(TieredSearchCache(MemorySearchCache()))
+    stub_model.stats.reset()
+
+
+async def _scenario(name: str, concurrency: int, runs: int, make_job) -> Dict[str, Any]:
+    _reset()
+    started = time.perf_counter()
+    latencies = await _bounded(concurrency, [make_job(i) for i in range(runs)])
+    elapsed = time.perf_counter() - started
+    result = {
+        "runs": runs,
+        "concurrency": concurrency,
+        "e2e": percentiles(latencies),
+        "runs_per_second": round(runs / elapsed, 2),
+        "model_calls_per_run": round(stub_model.stats.calls / runs, 2),
+        "model_calls_by_kind": {k: round(v / runs, 2) for k, v in stub_model.stats.by_kind.items()},
+        "peak_rss_mb": peak_rss_mb(),
+    }
+    print(
+        f"{name:<8} c={concurrency:<3} {result['runs_per_second']:>7.2f} runs/s  "
+        f"e2e p50 {result['e2e']['p50_ms']:>8.1f} ms  p95 {result['e2e']['p95_ms']:>8.1f} ms  "
+        f"{result['model_calls_per_run']:>5.1f} calls/run  rss {result['peak_rss_mb']} MB"
+    )
+    return result
+
+
+async def run_suite(args) -> Dict[str, Any]:
+    stub_model.install(args.latency)
+    from src.agent.graph import graph
+    from src.api.main import app
+
+    timer = NodeTimer()
+    results: Dict[str, Any] = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "stub_latency_s": args.latency,
+            "runs": args.runs,
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "graph": {},
+        "api": {},
+    }
+
+    for concurrency in args.concurrency:
+        def graph_job(i, c=concurrency):
+            state, config = _job(f"graph c{c} {i}", 3, 2)
+            config["callbacks"] = [timer]
+            return lambda: graph.ainvoke(state, config)
+
+        results["graph"][str(concurrency)] = await _scenario(
+            "graph", concurrency, args.runs, graph_job
+        )
+    results["nodes"] = {node: percentiles(samples) for node, samples in sorted(timer.samples.items())}
+    for node, stats in results["nodes"].items():
+        print(f"node {node:<16} p50 {stats['p50_ms']:>8.1f} ms  p95 {stats['p95_ms']:>8.1f} ms  n={stats['count']}")
+
+    for concurrency in args.concurrency:
+        def api_job(i, c=concurrency):
+            payload = {"query": f"suite api c{c} {i}", "max_research_loops": 2,
+                       "initial_search_query_count": 3}
+
+            async def call():
+                response = await request(app, "POST", "/research", payload)
+                assert response.status == 200, response.body[:200]
+            return call
+
+        results["api"][str(concurrency)] = await _scenario(
+            "api", concurrency, args.runs, api_job
+        )
+
+    results["sweep"] = []
+    for initial_queries in args.sweep_queries:
+        for loops in args.sweep_loops:
+            def sweep_job(i, q=initial_queries, n=loops):
+                return lambda: graph.ainvoke(*_job(f"sweep q{q} l{n} {i}", q, n))
+
+            entry = await _scenario(
+                f"q={initial_queries} l={loops}", args.sweep_concurrency, args.sweep_runs, sweep_job
+            )
+            results["sweep"].append(
+                {"initial_queries": initial_queries, "max_research_loops": loops, **entry}
+            )
+    results["peak_rss_mb"] = peak_rss_mb()
+    return results
+
+
+def _flatten(value: Any, prefix: str = "") -> Dict[str, float]:
+    if isinstance(value, dict):
+        flat = {}
+        for key, item in value.items():
+            flat.update(_flatten(item, f"{prefix}.{key}" if prefix else str(key)))
+        return flat
+    if isinstance(value, list):
+        flat = {}
+        for item in value:
+            label = f"q{item.get('initial_queries')}_l{item.get('max_research_loops')}"
+            flat.update(_flatten(item, f"{prefix}.{label}"))
+        return flat
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return {prefix: float(value)}
+    return {}
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Metrics that got worse than the baseline by more than `tolerance` (a fraction)"""
+    current, previous = _flatten(results), _flatten(baseline)
+    regressions = []
+    for key, old in sorted(previous.items()):
+        if key.startswith("meta.") or key.endswith(".count") or key.endswith(".runs") \
+                or key.endswith(".concurrency") or key not in current or old == 0:
+            continue
+        new = current[key]
+        higher_is_better = key.endswith("per_second")
+        change = (old - new) / old if higher_is_better else (new - old) / old
+        if change > tolerance:
+            regressions.append(f"{key}: {old:g} -> {new:g} ({change:+.0%} worse)")
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--latency", type=float, default=0.05, help="stub seconds per model call")
+    parser.add_argument("--runs", type=int, default=32, help="runs per concurrency level")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--sweep-queries", type=int, nargs="+", default=[1, 3, 5])
+    parser.add_argument("--sweep-loops", type=int, nargs="+", default=[1, 2, 3])
+    parser.add_argument("--sweep-runs", type=int, default=8)
+    parser.add_argument("--sweep-concurrency", type=int, default=8)
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--baseline", help="compare against results stored in this file")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed relative regression before failing")
+    args = parser.parse_args()
+
+    results = asyncio.run(run_suite(args))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"results written to {args.output}")
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        print(f"{len(regressions)} regressions against {args.baseline}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -17,6 +17,7 @@ def check_dependencies():
         ("google.genai", "Google AI client"),
         ("dotenv", "Environment variable loading"),
         ("pydantic", "Data validation"),
+        ("h2", "HTTP/2 for page fetches"),
     ]
     
     missing_packages = []
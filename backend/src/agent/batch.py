@@ -0,0 +1,170 @@
+"""Run many research questions through the graph in one process.
+
+    python -m src.agent.batch questions.jsonl --concurrency 16 > answers.ndjson
+
+Each input line is a JSON string or an object with a "query" and optionally
+"id", "max_research_loops", "initial_search_query_count", "deadline_ms",
+"max_tokens" and "thread_id".
+Results are written as NDJSON in completion order. All items share the
+process-wide client pools, search cache, single-flight group and scheduler.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Optional
+from uuid import uuid4
+
+# Items run at the same time when the caller does not say otherwise
+DEFAULT_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", 8))
+# Upper bound on the concurrency a caller may ask for
+MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", 64))
+
+
+def parse_item(value: Any) -> Dict[str, Any]:
+    """Normalize a batch item given as a query string or an object with a query"""
+    if isinstance(value, str):
+        value = {"query": value}
+    if not isinstance(value, dict) or not str(value.get("query") or "").strip():
+        raise ValueError(f"Batch item needs a non-empty query: {value!r}")
+    return value
+
+
+def parse_jsonl(lines: Iterable[str]) -> List[Dict[str, Any]]:
+    """Batch items from JSONL text, skipping blank lines"""
+    items = []
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            items.append(parse_item(json.loads(line)))
+        except ValueError as e:
+            raise ValueError(f"Line {number}: {e}") from None
+    return items
+
+
+def _answer(final_state: Dict[str, Any]) -> str:
+    messages = final_state.get("messages") or []
+    return getattr(messages[-1], "content", "") if messages else ""
+
+
+async def research(
+    graph, item: Dict[str, Any], configurable: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """Run one batch item through `graph` and return its result record"""
+    from src.agent.state import initial_state
+
+    max_research_loops = item.get("max_research_loops", 2)
+    initial_queries = item.get("initial_search_query_count", 3)
+    # A thread id per item gives each one its own fair share of model capacity;
+    # an item's id doubles as its thread id, so sending it again resumes it
+    thread_id = str(item.get("thread_id") or item.get("id") or uuid4())
+    config = {
+        "configurable": {
+            **(configurable or {}),
+            "max_research_loops": max_research_loops,
+            "number_of_initial_queries": initial_queries,
+            "thread_id": thread_id,
+        }
+    }
+    state = initial_state(
+        item["query"],
+        max_research_loops,
+        initial_queries,
+        item.get("deadline_ms"),
+        item.get("max_tokens"),
+    )
+    final_state = await graph.ainvoke(state, config)
+    return {
+        "answer": _answer(final_state),
+        "sources": final_state.get("sources_gathered", []),
+        "iterations": final_state.get("research_loop_count", 0),
+        "stats": final_state.get("run_stats") or {},
+        "budget": final_state.get("budget_usage"),
+        "thread_id": thread_id,
+    }
+
+
+async def run_batch(
+    items: Iterable[Dict[str, Any]],
+    run: Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]],
+    concurrency: int = DEFAULT_CONCURRENCY,
+) -> AsyncIterator[Dict[str, Any]]:
+    """Run `run` over `items`, at most `concurrency` at a time, yielding records as they finish.
+
+    Each record carries the item's position, id and query, a status of
+    "completed" or "failed", and either the fields returned by `run` or the
+    error. A failing item never stops the rest of the batch. Closing the
+    generator early cancels the items still running.
+    """
+    concurrency = max(1, min(concurrency, MAX_CONCURRENCY))
+    pending = iter(enumerate(items))
+    done: asyncio.Queue = asyncio.Queue()
+
+    async def worker():
+        for index, item in pending:
+            record = {"index": index, "id": item.get("id"), "query": item.get("query")}
+            started = time.perf_counter()
+            try:
+                record.update({**await run(item), "status": "completed"})
+            except Exception as e:
+                record.update(status="failed", error=f"{type(e).__name__}: {e}")
+            record["seconds"] = time.perf_counter() - started
+            await done.put(record)
+        await done.put(None)
+
+    workers = [asyncio.ensure_future(worker()) for _ in range(concurrency)]
+    try:
+        remaining = len(workers)
+        while remaining:
+            record = await done.get()
+            if record is None:
+                remaining -= 1
+            else:
+                yield record
+    finally:
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+
+async def research_batch(
+    items: Iterable[Any],
+    concurrency: int = DEFAULT_CONCURRENCY,
+    graph=None,
+    configurable: Optional[Dict[str, Any]] = None,
+) -> AsyncIterator[Dict[str, Any]]:
+    """Research a list of queries (strings or item objects), yielding results as they finish"""
+    if graph is None:
+        from src.agent.graph import graph
+    items = [parse_item(item) for item in items]
+    async for record in run_batch(
+        items, lambda item: research(graph, item, configurable), concurrency
+    ):
+        yield record
+
+
+async def _main(args) -> int:
+    source = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8")
+    with source:
+        items = parse_jsonl(source)
+    output = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    failed = 0
+    with output:
+        async for record in research_batch(items, args.concurrency):
+            failed += record["status"] == "failed"
+            output.write(json.dumps(record, default=str) + "\n")
+            output.flush()
+    print(f"{len(items) - failed} completed, {failed} failed", file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Research a JSONL file of questions")
+    parser.add_argument("input", help="JSONL file of queries, or - for stdin")
+    parser.add_argument("-o", "--output", default="-", help="NDJSON output file")
+    parser.add_argument("-c", "--concurrency", type=int, default=DEFAULT_CONCURRENCY)
+    sys.exit(asyncio.run(_main(parser.parse_args())))
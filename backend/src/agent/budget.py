@@ -0,0 +1,188 @@
+"""Per-run latency and token budgets carried in the graph state.
+
+A budget is set when a run starts and stored under the `budget` state key as
+plain data, so it survives checkpoints:
+
+    {"deadline_ms": 20000, "max_tokens": 50000, "started_at": <unix seconds>}
+
+Token spend is the `tokens_used` run statistic that every node adds, estimated
+from prompt and response text because structured outputs carry no usage
+metadata. A share of each budget (`budget_answer_reserve`) is held back for
+`finalize_answer`; the rest is what query generation, searches and reflection
+may spend, and the share of it left decides how wide the next fan-out is.
+"""
+
+import math
+import time
+from typing import Any, Dict, Optional
+
+from src.agent.digest import estimate_tokens
+
+# Share of the tokens left at the end that the answer prompt may use; the rest
+# is left for the answer itself
+_ANSWER_OUTPUT_SHARE = 0.25
+_MIN_ANSWER_PROMPT_TOKENS = 256
+# Smallest output cap given to the answer, so a spent budget still gets an answer
+_MIN_ANSWER_OUTPUT_TOKENS = 64
+# Tokens a grounded search is assumed to cost before the run has measured any
+_SEARCH_TOKENS_GUESS = 1000
+
+
+def new_budget(
+    deadline_ms: Optional[int] = None,
+    max_tokens: Optional[int] = None,
+    now: Optional[float] = None,
+) -> Optional[Dict[str, Any]]:
+    """Budget state for a new run, or None when neither limit is set"""
+    if not deadline_ms and not max_tokens:
+        return None
+    return {
+        "deadline_ms": deadline_ms or None,
+        "max_tokens": max_tokens or None,
+        "started_at": time.time() if now is None else now,
+    }
+
+
+def count_tokens(*texts: str) -> int:
+    """Estimated tokens of the prompts and responses of a model call"""
+    return sum(estimate_tokens(text or "") for text in texts)
+
+
+def tokens_used(state: Dict[str, Any]) -> int:
+    return int((state.get("run_stats") or {}).get("tokens_used", 0))
+
+
+def _research_shares(
+    state: Dict[str, Any], reserve: float, spent: int = 0, now: Optional[float] = None
+):
+    """(limit name, unspent share of the research part of that limit) for each limit set.
+
+    `spent` counts tokens used by the calling node that are not in the state yet.
+    """
+    budget = state.get("budget")
+    if not budget:
+        return []
+    shares = []
+    if budget.get("deadline_ms"):
+        elapsed = (time.time() if now is None else now) - budget["started_at"]
+        total = budget["deadline_ms"] / 1000 * (1 - reserve)
+        shares.append(("deadline", 1 - elapsed / total if total > 0 else 0.0))
+    if budget.get("max_tokens"):
+        total = budget["max_tokens"] * (1 - reserve)
+        used = tokens_used(state) + spent
+        shares.append(("token_budget", 1 - used / total if total > 0 else 0.0))
+    return shares
+
+
+def research_left(
+    state: Dict[str, Any], reserve: float, spent: int = 0, now: Optional[float] = None
+) -> float:
+    """Share (0 to 1) of the tightest budget that research may still spend; 1.0 without one"""
+    shares = _research_shares(state, reserve, spent, now)
+    return max(0.0, min(share for _, share in shares)) if shares else 1.0
+
+
+def exhausted(
+    state: Dict[str, Any], reserve: float, spent: int = 0, now: Optional[float] = None
+) -> Optional[str]:
+    """Name of the budget whose research share is used up ("deadline" or "token_budget").
+
+    A token budget also counts as used up once what is left of its research
+    share would not pay for one more search.
+    """
+    for name, share in _research_shares(state, reserve, spent, now):
+        if share <= 0:
+            return name
+    tokens_left = _research_tokens_left(state, reserve, spent)
+    if tokens_left is not None and tokens_left < _search_tokens(state):
+        return "token_budget"
+    return None
+
+
+def _research_tokens_left(state: Dict[str, Any], reserve: float, spent: int = 0) -> Optional[float]:
+    budget = state.get("budget") or {}
+    if not budget.get("max_tokens"):
+        return None
+    return budget["max_tokens"] * (1 - reserve) - tokens_used(state) - spent
+
+
+def _search_tokens(state: Dict[str, Any]) -> float:
+    """Average tokens of this run's searches so far, or a guess before the first one"""
+    run_stats = state.get("run_stats") or {}
+    searches = run_stats.get("search_cache_misses", 0)
+    return run_stats.get("search_tokens_used", 0) / searches if searches else _SEARCH_TOKENS_GUESS
+
+
+def seconds_left(state: Dict[str, Any], reserve: float, now: Optional[float] = None) -> Optional[float]:
+    """Seconds research may still take before the answer reserve; None without a deadline"""
+    budget = state.get("budget")
+    if not budget or not budget.get("deadline_ms"):
+        return None
+    elapsed = (time.time() if now is None else now) - budget["started_at"]
+    return max(0.0, budget["deadline_ms"] / 1000 * (1 - reserve) - elapsed)
+
+
+def fan_out_width(
+    state: Dict[str, Any], wanted: int, reserve: float, spent: int = 0
+) -> int:
+    """How many of `wanted` searches to run next (at least one).
+
+    The width shrinks with the share of the budget left, and is further capped
+    by how many searches the research share of a token budget can still pay
+    for, at this run's average tokens per search.
+    """
+    if wanted <= 0:
+        return 0
+    width = math.ceil(wanted * research_left(state, reserve, spent))
+    tokens_left = _research_tokens_left(state, reserve, spent)
+    if tokens_left is not None:
+        width = min(width, int(tokens_left // max(_search_tokens(state), 1)))
+    return max(1, min(wanted, width))
+
+
+def answer_prompt_tokens(state: Dict[str, Any], configured: int) -> int:
+    """Token budget of the answer prompt: `configured`, or less when few tokens are left"""
+    budget = state.get("budget")
+    if not budget or not budget.get("max_tokens"):
+        return configured
+    left = max(budget["max_tokens"] - tokens_used(state), 0)
+    allowed = max(int(left * (1 - _ANSWER_OUTPUT_SHARE)), _MIN_ANSWER_PROMPT_TOKENS)
+    return min(configured, allowed) if configured > 0 else allowed
+
+
+def answer_output_tokens(state: Dict[str, Any], prompt_tokens: int) -> Optional[int]:
+    """Output token cap of the answer call: what the token budget has left after its prompt"""
+    budget = state.get("budget")
+    if not budget or not budget.get("max_tokens"):
+        return None
+    left = budget["max_tokens"] - tokens_used(state) - prompt_tokens
+    return max(left, _MIN_ANSWER_OUTPUT_TOKENS)
+
+
+def usage(
+    budget: Optional[Dict[str, Any]], tokens: int, now: Optional[float] = None
+) -> Optional[Dict[str, Any]]:
+    """How much of each limit a finished run used, for the API response.
+
+    The limits are soft: research stops early to leave room for the answer
+    and the answer's output is capped, but the answer call itself is not
+    interrupted at the deadline, and token counts are estimates.
+    """
+    if not budget:
+        return None
+    elapsed_ms = round(((time.time() if now is None else now) - budget["started_at"]) * 1000)
+    report: Dict[str, Any] = {
+        "elapsed_ms": elapsed_ms,
+        "tokens_used": tokens,
+        "enforcement": "soft",
+    }
+    if budget.get("deadline_ms"):
+        report["deadline_ms"] = budget["deadline_ms"]
+        report["deadline_used"] = round(elapsed_ms / budget["deadline_ms"], 3)
+    if budget.get("max_tokens"):
+        report["max_tokens"] = budget["max_tokens"]
+        report["tokens_used_ratio"] = round(tokens / budget["max_tokens"], 3)
+    report["within_budget"] = all(
+        report.get(key, 0) <= 1.0 for key in ("deadline_used", "tokens_used_ratio")
+    )
+    return report
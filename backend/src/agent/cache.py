@@ -0,0 +1,330 @@
+import asyncio
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+
+def normalize_query(query: str) -> str:
+    """Aggressively normalize text for similarity: lowercase, punctuation dropped.
+
+    Only for comparing queries and sentences; "C++" and "C#" both become "c",
+    so it must never be used to build a cache key.
+    """
+    query = re.sub(r"[^\w\s]", " ", query.lower())
+    return " ".join(query.split())
+
+
+def canonical_query(query: str) -> str:
+    """A search query with case and whitespace normalized and punctuation kept"""
+    return " ".join(query.casefold().split())
+
+
+def search_cache_key(query: str, model: str, date_bucket: Optional[str] = None) -> str:
+    """Content-addressed key for a grounded search result.
+
+    The date bucket matches the date injected into the search prompt, so cached
+    answers never outlive the day they were grounded on.
+    """
+    date_bucket = date_bucket or datetime.now().strftime("%Y-%m-%d")
+    raw = "\x1f".join([canonical_query(query), model, date_bucket])
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+class SearchCache:
+    """Interface for search result caches. The base class never stores anything."""
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        return None
+
+    def set(self, key: str, value: Dict[str, Any], ttl: Optional[float] = None) -> None:
+        pass
+
+    async def aget(self, key: str) -> Optional[Dict[str, Any]]:
+        return self.get(key)
+
+    async def aset(
+        self, key: str, value: Dict[str, Any], ttl: Optional[float] = None
+    ) -> None:
+        self.set(key, value, ttl)
+
+    def clear(self) -> None:
+        pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {}
+
+
+class MemorySearchCache(SearchCache):
+    """In-memory LRU tier with per-entry TTL and entry/byte capacity limits"""
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        max_bytes: int = 64 * 1024 * 1024,
+        default_ttl: float = 6 * 3600,
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self._entries: "OrderedDict[str, Tuple[float, int, Dict[str, Any]]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.time():
+                if entry is not None:
+                    self._drop(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[2]
+
+    def set(self, key: str, value: Dict[str, Any], ttl: Optional[float] = None) -> None:
+        size = len(json.dumps(value))
+        if size > self.max_bytes:
+            return
+        expires_at = time.time() + (self.default_ttl if ttl is None else ttl)
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (expires_at, size, value)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _drop(self, key: str) -> None:
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+class SqliteSearchCache(SearchCache):
+    """On-disk SQLite tier that survives restarts and is shared between workers"""
+
+    def __init__(
+        self,
+        path: str,
+        max_bytes: int = 512 * 1024 * 1024,
+        default_ttl: float = 6 * 3600,
+    ):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS search_cache ("
+            " key TEXT PRIMARY KEY,"
+            " value TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " expires_at REAL NOT NULL,"
+            " accessed_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self.get_entry(key)
+        return None if entry is None else entry[0]
+
+    def get_entry(self, key: str) -> Optional[Tuple[Dict[str, Any], float]]:
+        """The cached value and the unix time it expires at, or None"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM search_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or row[1] < now:
+                if row is not None:
+                    self._conn.execute("DELETE FROM search_cache WHERE key = ?", (key,))
+                    self._conn.commit()
+                self.misses += 1
+                return None
+            self._conn.execute(
+                "UPDATE search_cache SET accessed_at = ? WHERE key = ?", (now, key)
+            )
+            self._conn.commit()
+            self.hits += 1
+        return json.loads(row[0]), row[1]
+
+    def set(self, key: str, value: Dict[str, Any], ttl: Optional[float] = None) -> None:
+        payload = json.dumps(value)
+        now = time.time()
+        expires_at = now + (self.default_ttl if ttl is None else ttl)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO search_cache VALUES (?, ?, ?, ?, ?)",
+                (key, payload, len(payload), expires_at, now),
+            )
+            self._evict(now)
+            self._conn.commit()
+
+    def _evict(self, now: float) -> None:
+        self._conn.execute("DELETE FROM search_cache WHERE expires_at < ?", (now,))
+        (total,) = self._conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM search_cache"
+        ).fetchone()
+        if total <= self.max_bytes:
+            return
+        rows = self._conn.execute(
+            "SELECT key, size FROM search_cache ORDER BY accessed_at"
+        ).fetchall()
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM search_cache WHERE key = ?", (key,))
+            total -= size
+            self.evictions += 1
+
+    async def aget(self, key: str) -> Optional[Dict[str, Any]]:
+        return await asyncio.to_thread(self.get, key)
+
+    async def aget_entry(self, key: str) -> Optional[Tuple[Dict[str, Any], float]]:
+        return await asyncio.to_thread(self.get_entry, key)
+
+    async def aset(
+        self, key: str, value: Dict[str, Any], ttl: Optional[float] = None
+    ) -> None:
+        await asyncio.to_thread(self.set, key, value, ttl)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM search_cache")
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM search_cache"
+            ).fetchone()
+        return {
+            "entries": entries,
+            "bytes": size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+class TieredSearchCache(SearchCache):
+    """Memory LRU in front of an optional SQLite tier; disk hits are promoted"""
+
+    def __init__(self, memory: MemorySearchCache, disk: Optional[SqliteSearchCache] = None):
+        self.memory = memory
+        self.disk = disk
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        value = self.memory.get(key)
+        if value is None and self.disk is not None:
+            value = self._promote(key, self.disk.get_entry(key))
+        return value
+
+    def _promote(
+        self, key: str, entry: Optional[Tuple[Dict[str, Any], float]]
+    ) -> Optional[Dict[str, Any]]:
+        """Copy a disk hit into memory for the rest of its disk TTL, not a fresh one"""
+        if entry is None:
+            return None
+        value, expires_at = entry
+        self.memory.set(key, value, expires_at - time.time())
+        return value
+
+    def set(self, key: str, value: Dict[str, Any], ttl: Optional[float] = None) -> None:
+        self.memory.set(key, value, ttl)
+        if self.disk is not None:
+            self.disk.set(key, value, ttl)
+
+    async def aget(self, key: str) -> Optional[Dict[str, Any]]:
+        value = self.memory.get(key)
+        if value is None and self.disk is not None:
+            value = self._promote(key, await self.disk.aget_entry(key))
+        return value
+
+    async def aset(
+        self, key: str, value: Dict[str, Any], ttl: Optional[float] = None
+    ) -> None:
+        self.memory.set(key, value, ttl)
+        if self.disk is not None:
+            await self.disk.aset(key, value, ttl)
+
+    def clear(self) -> None:
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        stats = {"memory": self.memory.stats()}
+        if self.disk is not None:
+            stats["disk"] = self.disk.stats()
+        return stats
+
+
+def _cache_from_env() -> SearchCache:
+    if os.getenv("SEARCH_CACHE_ENABLED", "true").lower() != "true":
+        return SearchCache()
+    ttl = float(os.getenv("SEARCH_CACHE_TTL_SECONDS", 6 * 3600))
+    memory = MemorySearchCache(
+        max_entries=int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", 1024)),
+        max_bytes=int(os.getenv("SEARCH_CACHE_MAX_BYTES", 64 * 1024 * 1024)),
+        default_ttl=ttl,
+    )
+    disk = None
+    if os.getenv("SEARCH_CACHE_DB"):
+        disk = SqliteSearchCache(
+            os.getenv("SEARCH_CACHE_DB"),
+            max_bytes=int(os.getenv("SEARCH_CACHE_DB_MAX_BYTES", 512 * 1024 * 1024)),
+            default_ttl=ttl,
+        )
+    return TieredSearchCache(memory, disk)
+
+
+_search_cache: Optional[SearchCache] = None
+_search_cache_lock = threading.Lock()
+
+
+def get_search_cache() -> SearchCache:
+    """Return the process-wide search cache, configured from the environment"""
+    global _search_cache
+    with _search_cache_lock:
+        if _search_cache is None:
+            _search_cache = _cache_from_env()
+        return _search_cache
+
+
+def set_search_cache(cache: SearchCache) -> SearchCache:
+    """Install a custom cache implementation (or `SearchCache()` to disable caching)"""
+    global _search_cache
+    with _search_cache_lock:
+        _search_cache = cache
+    return cache
@@ -0,0 +1,118 @@
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+
+def checkpoint_db_path() -> str:
+    """Location of the SQLite checkpoint database"""
+    return os.getenv("CHECKPOINT_DB", "checkpoints.sqlite3")
+
+
+@asynccontextmanager
+async def open_checkpointer(path: Optional[str] = None) -> AsyncIterator[Any]:
+    """Open the SQLite checkpointer used to make research runs resumable"""
+    from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+    async with AsyncSqliteSaver.from_conn_string(path or checkpoint_db_path()) as saver:
+        await saver.setup()
+        yield saver
+
+
+def checkpoint_retention_seconds() -> float:
+    """How long a run's checkpoints are kept after its last step"""
+    return float(os.getenv("CHECKPOINT_RETENTION_SECONDS", 7 * 24 * 3600))
+
+
+# 100-ns intervals between the UUID epoch (1582-10-15) and the Unix epoch
+_UUID_EPOCH_OFFSET = 0x01B21DD213814000
+
+
+def _checkpoint_time(checkpoint_id: str) -> float:
+    """Unix time a checkpoint was written, read from its time-ordered UUIDv6 id"""
+    from langgraph.checkpoint.base.id import UUID
+
+    return (UUID(checkpoint_id).time - _UUID_EPOCH_OFFSET) / 1e7
+
+
+async def latest_checkpoints(
+    checkpointer, limit: Optional[int] = None
+) -> List[Tuple[str, float]]:
+    """(thread id, unix time of its latest checkpoint) for each run, newest first.
+
+    One grouped query over the saver's `checkpoints` table; checkpoint ids are
+    UUIDv6, so the greatest id of a thread is its latest checkpoint and no
+    checkpoint has to be loaded.
+    """
+    await checkpointer.setup()
+    query = (
+        "SELECT thread_id, MAX(checkpoint_id) AS latest FROM checkpoints"
+        " WHERE checkpoint_ns = '' GROUP BY thread_id ORDER BY latest DESC"
+    )
+    params: Tuple[Any, ...] = ()
+    if limit is not None:
+        query += " LIMIT ?"
+        params = (limit,)
+    async with checkpointer.lock, checkpointer.conn.execute(query, params) as cursor:
+        rows = await cursor.fetchall()
+    return [(thread_id, _checkpoint_time(latest)) for thread_id, latest in rows]
+
+
+async def prune_runs(checkpointer, max_age: float) -> int:
+    """Delete every run whose latest checkpoint is older than `max_age` seconds.
+
+    Returns the number of runs deleted.
+    """
+    cutoff = time.time() - max_age
+    stale = [
+        thread_id
+        for thread_id, updated in await latest_checkpoints(checkpointer)
+        if updated < cutoff
+    ]
+    for thread_id in stale:
+        await checkpointer.adelete_thread(thread_id)
+    return len(stale)
+
+
+def thread_config(thread_id: str) -> Dict[str, Any]:
+    """Runnable config addressing a checkpointed research run"""
+    return {"configurable": {"thread_id": thread_id}}
+
+
+async def run_status(graph, thread_id: str) -> Optional[Dict[str, Any]]:
+    """Summarize the checkpointed state of one research run.
+
+    Returns None when the thread has no checkpoints. A run is "completed" once
+    the graph has no pending nodes, otherwise it is "interrupted" and can be
+    resumed from its last completed step.
+    """
+    from langchain_core.messages import HumanMessage
+
+    snapshot = await graph.aget_state(thread_config(thread_id))
+    if not snapshot.values:
+        return None
+
+    values = snapshot.values
+    query = next(
+        (m.content for m in values.get("messages", []) if isinstance(m, HumanMessage)),
+        "",
+    )
+    return {
+        "thread_id": thread_id,
+        "query": query,
+        "status": "interrupted" if snapshot.next else "completed",
+        "next": list(snapshot.next),
+        "research_loop_count": values.get("research_loop_count", 0),
+        "searches_completed": len(values.get("web_research_result", [])),
+        "updated_at": snapshot.created_at,
+    }
+
+
+async def list_runs(graph, limit: int = 50) -> List[Dict[str, Any]]:
+    """List the most recently updated research runs, newest first"""
+    runs = []
+    for thread_id, _ in await latest_checkpoints(graph.checkpointer, limit):
+        status = await run_status(graph, thread_id)
+        if status is not None:
+            runs.append(status)
+    return runs
@@ -0,0 +1,311 @@
+import os
+import threading
+from collections import Counter
+from contextlib import asynccontextmanager, contextmanager
+from typing import (
+    TYPE_CHECKING, Any, AsyncIterator, Callable, Dict, Iterator, Optional, Tuple, Type,
+)
+
+from pydantic import BaseModel
+
+from src.agent import tracing
+from src.agent.scheduler import DEFAULT_REQUEST_KEY, get_scheduler, request_key_from_config
+
+if TYPE_CHECKING:
+    from langchain_core.runnables import RunnableConfig
+
+
+def _default_chat_model_factory(model: str, temperature: float):
+    from langchain_google_genai import ChatGoogleGenerativeAI
+
+    return ChatGoogleGenerativeAI(
+        model=model,
+        temperature=temperature,
+        # 429s are retried by the scheduler with shared, adaptive backoff
+        max_retries=1,
+        api_key=os.getenv("GEMINI_API_KEY"),
+    )
+
+
+def _default_genai_client_factory():
+    from google.genai import Client
+
+    return Client(api_key=os.getenv("GEMINI_API_KEY"))
+
+
+def _limit_output(runnable, max_output_tokens: Optional[int]):
+    """Bind a Gemini output token cap to a chat model call, when there is one"""
+    if not max_output_tokens:
+        return runnable
+    return runnable.bind(generation_config={"max_output_tokens": max_output_tokens})
+
+
+def _kind(schema: Optional[Type[BaseModel]]) -> str:
+    """Span and metric label for an invoke call"""
+    return "structured" if schema is not None else "chat"
+
+
+class ClientRegistry:
+    """Process-wide pool of model clients shared by every graph node.
+
+    Chat models are pooled per (model, temperature) so their HTTP connection
+    pools and TLS sessions are reused across calls, and structured-output
+    runnables are cached per (model, temperature, schema) so the schema is only
+    compiled once. Every call is admitted through the process-wide
+    `ModelScheduler`, which applies per-model rate and concurrency limits.
+    Each call is traced as a `model_call` span with its prompt and response
+    size and the token usage the provider reports. The registry is thread-safe
+    and can be used from both sync and async nodes.
+    """
+
+    def __init__(
+        self,
+        chat_model_factory: Optional[Callable[[str, float], Any]] = None,
+        genai_client_factory: Optional[Callable[[], Any]] = None,
+    ):
+        self._chat_model_factory = chat_model_factory or _default_chat_model_factory
+        self._genai_client_factory = genai_client_factory or _default_genai_client_factory
+        self._lock = threading.Lock()
+        self._chat_models: Dict[Tuple[str, float], Any] = {}
+        self._runnables: Dict[Tuple[str, float, Optional[Type[BaseModel]]], Any] = {}
+        self._genai_client = None
+        self._hits = 0
+        self._misses = 0
+        self._in_flight: Counter = Counter()
+        self._peak_in_flight: Counter = Counter()
+
+    def chat_model(self, model: str, temperature: float):
+        """Return the pooled chat model for (model, temperature)."""
+        key = (model, temperature)
+        with self._lock:
+            llm = self._chat_models.get(key)
+            if llm is None:
+                llm = self._chat_model_factory(model, temperature)
+                self._chat_models[key] = llm
+            return llm
+
+    def runnable(
+        self,
+        model: str,
+        temperature: float,
+        schema: Optional[Type[BaseModel]] = None,
+    ):
+        """Return the cached runnable for a model, optionally with structured output."""
+        key = (model, temperature, schema)
+        with self._lock:
+            runnable = self._runnables.get(key)
+            if runnable is not None:
+                self._hits += 1
+                return runnable
+            self._misses += 1
+        llm = self.chat_model(model, temperature)
+        runnable = llm if schema is None else llm.with_structured_output(schema)
+        with self._lock:
+            return self._runnables.setdefault(key, runnable)
+
+    @property
+    def genai_client(self):
+        """The shared `google.genai.Client` used for grounded search calls."""
+        with self._lock:
+            if self._genai_client is None:
+                self._genai_client = self._genai_client_factory()
+            return self._genai_client
+
+    def _enter(self, model: str) -> None:
+        with self._lock:
+            self._in_flight[model] += 1
+            if self._in_flight[model] > self._peak_in_flight[model]:
+                self._peak_in_flight[model] = self._in_flight[model]
+
+    def _exit(self, model: str) -> None:
+        with self._lock:
+            self._in_flight[model] -= 1
+
+    @contextmanager
+    def _track(self, model: str):
+        self._enter(model)
+        try:
+            yield
+        finally:
+            self._exit(model)
+
+    @asynccontextmanager
+    async def _atrack(self, model: str):
+        self._enter(model)
+        try:
+            yield
+        finally:
+            self._exit(model)
+
+    def invoke(
+        self,
+        model: str,
+        prompt: Any,
+        *,
+        temperature: float,
+        schema: Optional[Type[BaseModel]] = None,
+        config: Optional["RunnableConfig"] = None,
+        max_output_tokens: Optional[int] = None,
+    ):
+        """Invoke a pooled model, returning a message or a `schema` instance.
+
+        `max_output_tokens` caps the response of a chat call (no `schema`).
+        """
+        runnable = self.runnable(model, temperature, schema)
+        if schema is None:
+            runnable = _limit_output(runnable, max_output_tokens)
+
+        def call():
+            with self._track(model):
+                return runnable.invoke(prompt, config)
+
+        with tracing.model_span(model, _kind(schema), prompt) as span:
+            result = get_scheduler().run(model, request_key_from_config(config), call)
+            tracing.record_response(span, model, result)
+            return result
+
+    async def ainvoke(
+        self,
+        model: str,
+        prompt: Any,
+        *,
+        temperature: float,
+        schema: Optional[Type[BaseModel]] = None,
+        config: Optional["RunnableConfig"] = None,
+        max_output_tokens: Optional[int] = None,
+    ):
+        """Async counterpart of `invoke`."""
+        runnable = self.runnable(model, temperature, schema)
+        if schema is None:
+            runnable = _limit_output(runnable, max_output_tokens)
+
+        async def call():
+            async with self._atrack(model):
+                return await runnable.ainvoke(prompt, config)
+
+        with tracing.model_span(model, _kind(schema), prompt) as span:
+            result = await get_scheduler().arun(model, request_key_from_config(config), call)
+            tracing.record_response(span, model, result)
+            return result
+
+    def stream(
+        self,
+        model: str,
+        prompt: Any,
+        *,
+        temperature: float,
+        config: Optional["RunnableConfig"] = None,
+        max_output_tokens: Optional[int] = None,
+    ) -> Iterator[Any]:
+        """Stream message chunks from a pooled chat model."""
+        llm = _limit_output(self.runnable(model, temperature), max_output_tokens)
+        chunks = []
+        with tracing.model_span(model, "stream", prompt) as span:
+            with get_scheduler().slot(model, request_key_from_config(config)):
+                with self._track(model):
+                    for chunk in llm.stream(prompt, config):
+                        chunks.append(chunk)
+                        yield chunk
+            tracing.record_response(span, model, chunks)
+
+    async def astream(
+        self,
+        model: str,
+        prompt: Any,
+        *,
+        temperature: float,
+        config: Optional["RunnableConfig"] = None,
+        max_output_tokens: Optional[int] = None,
+    ) -> AsyncIterator[Any]:
+        """Async counterpart of `stream`."""
+        llm = _limit_output(self.runnable(model, temperature), max_output_tokens)
+        chunks = []
+        with tracing.model_span(model, "stream", prompt) as span:
+            async with get_scheduler().aslot(model, request_key_from_config(config)):
+                async with self._atrack(model):
+                    async for chunk in llm.astream(prompt, config):
+                        chunks.append(chunk)
+                        yield chunk
+            tracing.record_response(span, model, chunks)
+
+    def generate_content(
+        self,
+        model: str,
+        contents: Any,
+        config: Dict[str, Any],
+        *,
+        request_key: str = DEFAULT_REQUEST_KEY,
+    ):
+        """Run a native Gemini `generate_content` call on the shared client."""
+        client = self.genai_client
+
+        def call():
+            with self._track(model):
+                return client.models.generate_content(
+                    model=model, contents=contents, config=config
+                )
+
+        with tracing.model_span(model, "generate_content", contents) as span:
+            response = get_scheduler().run(model, request_key, call)
+            tracing.record_response(span, model, response)
+            return response
+
+    async def agenerate_content(
+        self,
+        model: str,
+        contents: Any,
+        config: Dict[str, Any],
+        *,
+        request_key: str = DEFAULT_REQUEST_KEY,
+    ):
+        """Async counterpart of `generate_content` using `client.aio`."""
+        client = self.genai_client
+
+        async def call():
+            async with self._atrack(model):
+                return await client.aio.models.generate_content(
+                    model=model, contents=contents, config=config
+                )
+
+        with tracing.model_span(model, "generate_content", contents) as span:
+            response = await get_scheduler().arun(model, request_key, call)
+            tracing.record_response(span, model, response)
+            return response
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and pool occupancy for monitoring."""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": self._hits / lookups if lookups else 0.0,
+                "pooled_chat_models": len(self._chat_models),
+                "cached_runnables": len(self._runnables),
+                "genai_client_ready": self._genai_client is not None,
+                "in_flight": {k: v for k, v in self._in_flight.items() if v},
+                "peak_in_flight": dict(self._peak_in_flight),
+            }
+
+
+_registry: Optional[ClientRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_registry() -> ClientRegistry:
+    """Return the process-wide client registry, using the transport set by MODEL_TRANSPORT."""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            from src.agent.transport import transport_factories_from_env
+
+            _registry = ClientRegistry(*transport_factories_from_env())
+        return _registry
+
+
+def set_registry(registry: ClientRegistry) -> ClientRegistry:
+    """Replace the process-wide registry (e.g. to point nodes at a stub model)."""
+    global _registry
+    with _registry_lock:
+        _registry = registry
+    return registry
@@ -12,6 +12,46 @@ class Configuration:
     answer_model: str = "gemini-2.0-flash-exp"
     number_of_initial_queries: int = 3
     max_research_loops: int = 2
+    # Cosine similarity above which a new query counts as a near-duplicate of one
+    # already run; values above 1.0 disable deduplication
+    query_dedup_threshold: float = 0.8
+    # Stream the final answer token by token, rewriting short urls as chunks arrive
+    stream_answer: bool = True
+    # Token budget of the rolling digest of earlier findings sent to reflection;
+    # 0 sends every summary in full on every loop
+    digest_token_budget: int = 2000
+    # Above this many tokens of findings the answer prompt uses the digest too
+    answer_token_budget: int = 32000
+    # Passages of the gathered findings, ranked by BM25 against the topic and the
+    # open knowledge gap, that reflection and the answer see; 0 sends everything
+    evidence_top_k: int = 32
+    # Weight of hashed-vector cosine similarity blended into the BM25 ranking
+    evidence_vector_weight: float = 0.0
+    # Stop the research loop once a loop adds little new information, measured
+    # locally from the results of the loop against everything gathered before
+    early_stop: bool = True
+    # Stop when fewer than this share of the loop's source urls are new
+    min_new_url_ratio: float = 0.2
+    # Stop when fewer than this share of the loop's distinct terms are new
+    min_token_novelty: float = 0.15
+    # Stop when more than this share of the follow-up query terms were already searched
+    max_follow_up_overlap: float = 0.8
+    # While reflection runs, predict follow-up queries with the query model and
+    # start their searches in the background (async runs only)
+    speculative_prefetch: bool = False
+    # Number of follow-up queries to predict and prefetch per loop
+    speculative_queries: int = 3
+    # Cosine similarity at which a follow-up reuses a prefetched search
+    speculation_match_threshold: float = 0.8
+    # Quorum mode (async runs only): reflect once this fraction of a loop's
+    # searches has finished instead of waiting for the slowest one
+    quorum_fraction: float = 1.0
+    # Quorum mode: also reflect once this many seconds have passed and at least
+    # one search has finished (0 disables the deadline)
+    quorum_deadline_seconds: float = 0.0
+    # Share of a run's deadline and token budget (deadline_ms / max_tokens)
+    # held back for the final answer; research may spend the rest
+    budget_answer_reserve: float = 0.25
     
     @classmethod
     def from_runnable_config(cls, config: Optional[RunnableConfig] = None) -> "Configuration":
@@ -26,4 +66,25 @@ class Configuration:
             answer_model=configurable.get("answer_model", cls.answer_model),
             number_of_initial_queries=configurable.get("number_of_initial_queries", cls.number_of_initial_queries),
             max_research_loops=configurable.get("max_research_loops", cls.max_research_loops),
-        )
\ No newline at end of file
+            query_dedup_threshold=configurable.get("query_dedup_threshold", cls.query_dedup_threshold),
+            stream_answer=configurable.get("stream_answer", cls.stream_answer),
+            digest_token_budget=configurable.get("digest_token_budget", cls.digest_token_budget),
+            answer_token_budget=configurable.get("answer_token_budget", cls.answer_token_budget),
+            evidence_top_k=configurable.get("evidence_top_k", cls.evidence_top_k),
+            evidence_vector_weight=configurable.get("evidence_vector_weight", cls.evidence_vector_weight),
+            early_stop=configurable.get("early_stop", cls.early_stop),
+            min_new_url_ratio=configurable.get("min_new_url_ratio", cls.min_new_url_ratio),
+            min_token_novelty=configurable.get("min_token_novelty", cls.min_token_novelty),
+            max_follow_up_overlap=configurable.get("max_follow_up_overlap", cls.max_follow_up_overlap),
+            speculative_prefetch=configurable.get("speculative_prefetch", cls.speculative_prefetch),
+            speculative_queries=configurable.get("speculative_queries", cls.speculative_queries),
+            speculation_match_threshold=configurable.get("speculation_match_threshold", cls.speculation_match_threshold),
+            quorum_fraction=configurable.get("quorum_fraction", cls.quorum_fraction),
+            quorum_deadline_seconds=configurable.get("quorum_deadline_seconds", cls.quorum_deadline_seconds),
+            budget_answer_reserve=configurable.get("budget_answer_reserve", cls.budget_answer_reserve),
+        )
+
+    @property
+    def quorum_enabled(self) -> bool:
+        """Whether a loop's searches may be released before all of them finish"""
+        return self.quorum_fraction < 1.0 or self.quorum_deadline_seconds > 0
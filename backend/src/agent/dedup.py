@@ -0,0 +1,67 @@
+from collections import Counter
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+from src.agent.cache import normalize_query
+
+
+def _char_ngrams(text: str, n: int = 3) -> List[str]:
+    """Character n-grams of each normalized word, padded at the word boundaries"""
+    grams = []
+    for word in normalize_query(text).split():
+        padded = f" {word} "
+        grams.extend(padded[i:i + n] for i in range(max(1, len(padded) - n + 1)))
+    return grams
+
+
+def tfidf_vectors(texts: Sequence[str]) -> np.ndarray:
+    """L2-normalized TF-IDF vectors over character trigrams, one row per text"""
+    counts = [Counter(_char_ngrams(text)) for text in texts]
+    vocabulary = {}
+    for row in counts:
+        for gram in row:
+            vocabulary.setdefault(gram, len(vocabulary))
+
+    tf = np.zeros((len(texts), max(len(vocabulary), 1)), dtype=np.float32)
+    for i, row in enumerate(counts):
+        for gram, count in row.items():
+            tf[i, vocabulary[gram]] = count
+
+    df = np.count_nonzero(tf, axis=0)
+    idf = np.log((1 + len(texts)) / (1 + df)) + 1.0
+    vectors = tf * idf
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def dedupe_queries(
+    candidates: Sequence[str],
+    existing: Sequence[str],
+    threshold: float,
+) -> Tuple[List[str], List[str]]:
+    """Drop candidate queries that are near-duplicates of queries already run.
+
+    Each candidate is compared, by cosine similarity of TF-IDF trigram vectors,
+    against the existing queries and the candidates kept so far. Candidates
+    scoring at or above `threshold` are dropped.
+
+    Returns:
+        Tuple of (kept queries, dropped queries), both in their original order
+    """
+    if not candidates or threshold > 1.0:
+        return list(candidates), []
+
+    vectors = tfidf_vectors(list(existing) + list(candidates))
+    similarities = vectors[len(existing):] @ vectors.T
+
+    reference = list(range(len(existing)))
+    kept, dropped = [], []
+    for i, query in enumerate(candidates):
+        if reference and similarities[i, reference].max() >= threshold:
+            dropped.append(query)
+        else:
+            kept.append(query)
+            reference.append(len(existing) + i)
+    return kept, dropped
@@ -0,0 +1,81 @@
+import re
+from typing import List, Sequence
+
+from src.agent.cache import normalize_query
+
+_SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?\]])\s+(?=[A-Z0-9\"'(*#-])|\n+")
+
+# Very common words that carry no information about coverage
+_STOPWORDS = frozenset(
+    "the a an and or of to in on for with by from at as is are was were be been "
+    "this that these those it its their there which who what when where how than "
+    "also has have had not but can will would may more most such into about".split()
+)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count used for prompt budgeting (about four characters per token)"""
+    return (len(text) + 3) // 4
+
+
+def split_sentences(text: str) -> List[str]:
+    """Split research text into sentences, keeping citation markers attached"""
+    return [s.strip() for s in _SENTENCE_BOUNDARY.split(text) if s and s.strip()]
+
+
+def tokenize(text: str) -> List[str]:
+    """Normalized content words of a text, in order and with repeats"""
+    return [
+        word for word in normalize_query(text).split()
+        if len(word) > 2 and word not in _STOPWORDS
+    ]
+
+
+def _terms(text: str) -> set:
+    return set(tokenize(text))
+
+
+def compress(texts: Sequence[str], budget_tokens: int, topic: str = "") -> str:
+    """Extractively compress research text into at most `budget_tokens` tokens.
+
+    Sentences are deduplicated, then picked greedily by how many terms they add
+    that the digest does not cover yet, per token, with topic terms counting
+    double. Sentences that add nothing new are dropped even when they would
+    fit. The kept sentences are returned in their original order, one per line,
+    so citation markers stay next to the claims they support.
+    """
+    sentences, seen = [], set()
+    for text in texts:
+        for sentence in split_sentences(text):
+            key = normalize_query(sentence)
+            if key and key not in seen:
+                seen.add(key)
+                sentences.append(sentence)
+
+    topic_terms = _terms(topic)
+    candidates = [
+        (i, _terms(sentence), estimate_tokens(sentence))
+        for i, sentence in enumerate(sentences)
+    ]
+    covered: set = set()
+    kept: List[int] = []
+    remaining = budget_tokens
+    while candidates:
+        best, best_score, survivors = None, 0.0, []
+        for candidate in candidates:
+            _, terms, tokens = candidate
+            new_terms = terms - covered
+            if tokens > remaining or not new_terms:
+                continue
+            survivors.append(candidate)
+            score = (len(new_terms) + len(new_terms & topic_terms)) / tokens
+            if score > best_score:
+                best, best_score = candidate, score
+        if best is None:
+            break
+        survivors.remove(best)
+        candidates = survivors
+        kept.append(best[0])
+        covered |= best[1]
+        remaining -= best[2]
+    return "\n".join(sentences[i] for i in sorted(kept))
@@ -1,15 +1,20 @@
-import os
+import asyncio
+import threading
+import time
+from typing import Any, Dict
 from src.agent.tools_and_schemas import SearchQueryList, Reflection
-from dotenv import load_dotenv
+from langchain_core.callbacks import adispatch_custom_event, dispatch_custom_event
 from langchain_core.messages import AIMessage
 from langgraph.types import Send
 from langgraph.graph import StateGraph
 from langgraph.graph import START, END
-from langchain_core.runnables import RunnableConfig
-from google.genai import Client
+from langchain_core.runnables import RunnableConfig, RunnableLambda
 
 from src.agent.state import (
     OverallState,
+    add_results,
+    add_sources,
+    merge_stats,
     QueryGenerationState,
     ReflectionState,
     WebSearchState,
@@ -20,26 +25,68 @@ from src.agent.prompts import (
     query_writer_instructions,
     web_searcher_instructions,
     reflection_instructions,
+    follow_up_prediction_instructions,
     answer_instructions,
 )
-from langchain_google_genai import ChatGoogleGenerativeAI
+from src.agent.cache import get_search_cache, search_cache_key
+from src.agent.clients import get_registry
+from src.agent.dedup import dedupe_queries
+from src.agent.digest import compress, estimate_tokens, tokenize
+from src.agent.passages import select_evidence
+from src.agent import budget, quorum, tracing
+from src.agent.runtime import check_api_key
+from src.agent.scheduler import request_key_from_config
+from src.agent.singleflight import get_single_flight
+from src.agent.speculation import Speculation
 from src.agent.utils import (
-    get_citations,
+    citations_from_grounding,
+    extract_grounding,
     get_research_topic,
     insert_citation_markers,
-    resolve_urls,
+    rewrite_short_urls,
+    ShortUrlRewriter,
 )
 
-load_dotenv()
 
-if os.getenv("GEMINI_API_KEY") is None:
-    raise ValueError("GEMINI_API_KEY is not set")
+# Nodes
+def _query_prompt(state: OverallState, configurable: Configuration) -> str:
+    """Format the query writer prompt, filling in the initial query count."""
+    # check for custom initial search query count
+    if state.get("initial_search_query_count") is None:
+        state["initial_search_query_count"] = configurable.number_of_initial_queries
+
+    current_date = get_current_date()
+    return query_writer_instructions.format(
+        current_date=current_date,
+        research_topic=get_research_topic(state["messages"]),
+        number_queries=budget.fan_out_width(
+            state, state["initial_search_query_count"], configurable.budget_answer_reserve
+        ),
+    )
 
-# Used for Google Search API
-genai_client = Client(api_key=os.getenv("GEMINI_API_KEY"))
+
+def _query_result(
+    state: OverallState, configurable: Configuration, prompt: str, result: SearchQueryList
+) -> QueryGenerationState:
+    # Collapse near-duplicate queries before they fan out into separate searches
+    queries, dropped = dedupe_queries(
+        result.query, state.get("search_query") or [], configurable.query_dedup_threshold
+    )
+    tokens = budget.count_tokens(prompt, result.model_dump_json())
+    # Fewer searches when the run's budget is partly spent
+    width = budget.fan_out_width(
+        state, len(queries), configurable.budget_answer_reserve, tokens
+    )
+    return {
+        "search_query": queries[:width],
+        "run_stats": {
+            "searches_deduplicated": len(dropped),
+            "searches_cut_by_budget": len(queries) - width,
+            "tokens_used": tokens,
+        },
+    }
 
 
-# Nodes
 def generate_query(state: OverallState, config: RunnableConfig) -> QueryGenerationState:
     """LangGraph node that generates search queries based on the User's question.
 
@@ -54,47 +101,200 @@ def generate_query(state: OverallState, config: RunnableConfig) -> QueryGenerati
         Dictionary with state update, including search_query key containing the generated queries
     """
     configurable = Configuration.from_runnable_config(config)
+    formatted_prompt = _query_prompt(state, configurable)
+    # Generate the search queries
+    result = get_registry().invoke(
+        configurable.query_generator_model,
+        formatted_prompt,
+        temperature=1.0,
+        schema=SearchQueryList,
+        config=config,
+    )
+    return _query_result(state, configurable, formatted_prompt, result)
 
-    # check for custom initial search query count
-    if state.get("initial_search_query_count") is None:
-        state["initial_search_query_count"] = configurable.number_of_initial_queries
 
-    # init Gemini 2.0 Flash
-    llm = ChatGoogleGenerativeAI(
-        model=configurable.query_generator_model,
+async def agenerate_query(
+    state: OverallState, config: RunnableConfig
+) -> QueryGenerationState:
+    """Async variant of `generate_query` used when the graph runs via `ainvoke`."""
+    configurable = Configuration.from_runnable_config(config)
+    formatted_prompt = _query_prompt(state, configurable)
+    result = await get_registry().ainvoke(
+        configurable.query_generator_model,
+        formatted_prompt,
         temperature=1.0,
-        max_retries=2,
-        api_key=os.getenv("GEMINI_API_KEY"),
+        schema=SearchQueryList,
+        config=config,
     )
-    structured_llm = llm.with_structured_output(SearchQueryList)
+    return _query_result(state, configurable, formatted_prompt, result)
 
-    # Format the prompt
-    current_date = get_current_date()
-    formatted_prompt = query_writer_instructions.format(
-        current_date=current_date,
-        research_topic=get_research_topic(state["messages"]),
-        number_queries=state["initial_search_query_count"],
-    )
-    # Generate the search queries
-    result = structured_llm.invoke(formatted_prompt)
-    return {"search_query": result.query}
 
+def _web_research_sends(queries, first_id: int, config: RunnableConfig, run_budget=None):
+    """One `web_research` Send per query, tied together for quorum mode.
 
-def continue_to_web_research(state: QueryGenerationState):
+    The run's budget, if any, goes along so each branch can check the deadline.
+    """
+    configurable = Configuration.from_runnable_config(config)
+    fan_out = quorum.new_fan_out(len(queries)) if configurable.quorum_enabled else None
+    sends = []
+    for idx, query in enumerate(queries):
+        payload = {"search_query": query, "id": first_id + int(idx)}
+        if fan_out is not None:
+            payload["fan_out"] = fan_out
+        if run_budget:
+            payload["budget"] = run_budget
+        sends.append(Send("web_research", payload))
+    return sends
+
+
+def continue_to_web_research(state: QueryGenerationState, config: RunnableConfig):
     """LangGraph node that sends the search queries to the web research node.
 
     This is used to spawn n number of web research nodes, one for each search query.
     """
-    return [
-        Send("web_research", {"search_query": search_query, "id": int(idx)})
-        for idx, search_query in enumerate(state["search_query"])
-    ]
+    return _web_research_sends(state["search_query"], 0, config, state.get("budget"))
+
+
+def _web_search_prompt(query: str) -> str:
+    return web_searcher_instructions.format(
+        current_date=get_current_date(),
+        research_topic=query,
+    )
+
+
+# Uses the google genai client as the langchain client doesn't return grounding metadata
+_WEB_SEARCH_CONFIG = {
+    "tools": [{"google_search": {}}],
+    "temperature": 0,
+}
+
+
+def _web_research_result(
+    state: WebSearchState, entry: Dict[str, Any], cache_hit: bool, coalesced: bool = False
+) -> OverallState:
+    """Turn a cached, shared or fresh search entry into the web_research state update."""
+    grounding = entry["grounding"]
+    if grounding["grounded"]:
+        # resolve the urls to short urls for saving tokens and time, then add
+        # the citations to the generated text
+        citations = citations_from_grounding(grounding, state["id"])
+        modified_text = insert_citation_markers(grounding["text"], citations)
+        sources_gathered = [item for citation in citations for item in citation["segments"]]
+    else:
+        # Fallback when no grounding metadata is available
+        modified_text = grounding["text"] or "No search results available."
+        sources_gathered = []
+    # Cached and shared searches cost this run nothing
+    tokens = 0 if cache_hit or coalesced else budget.count_tokens(
+        _web_search_prompt(state["search_query"]), grounding["text"]
+    )
+
+    return {
+        "sources_gathered": sources_gathered,
+        "search_query": [state["search_query"]],
+        "web_research_result": [modified_text],
+        "run_stats": {
+            "search_cache_hits": int(cache_hit),
+            "search_cache_misses": int(not cache_hit),
+            "search_cache_saved_seconds": entry["latency"] if cache_hit else 0.0,
+            "searches_coalesced": int(coalesced),
+            "tokens_used": tokens,
+            "search_tokens_used": tokens,
+        },
+    }
+
+
+def _web_research_skipped(state: WebSearchState, stat: str) -> OverallState:
+    """State update for a search dropped because the run's deadline was reached."""
+    return {"search_query": [state["search_query"]], "run_stats": {stat: 1}}
+
+
+def _web_research_error(state: WebSearchState, e: Exception) -> OverallState:
+    # Fallback for any search errors
+    error_msg = f"Search failed for query '{state['search_query']}': {str(e)}"
+    return {
+        "sources_gathered": [],
+        "search_query": [state["search_query"]],
+        "web_research_result": [error_msg],
+    }
+
+
+def _grounded_search(query: str, config: RunnableConfig):
+    """Grounded search for one query through the search cache and single-flight group.
+
+    Returns:
+        Tuple of (search entry, served from cache, shared with an in-flight call)
+    """
+    configurable = Configuration.from_runnable_config(config)
+    model = configurable.query_generator_model
+    cache = get_search_cache()
+    cache_key = search_cache_key(query, model)
+
+    def search():
+        started = time.perf_counter()
+        response = get_registry().generate_content(
+            model,
+            _web_search_prompt(query),
+            _WEB_SEARCH_CONFIG,
+            request_key=request_key_from_config(config),
+        )
+        entry = {
+            "grounding": extract_grounding(response),
+            "latency": time.perf_counter() - started,
+        }
+        cache.set(cache_key, entry)
+        return entry
+
+    with tracing.span("grounded_search", query=query):
+        entry = cache.get(cache_key)
+        if entry is not None:
+            tracing.note_search_cache("hit")
+            return entry, True, False
+        # Identical searches already in flight in other runs share one call
+        entry, coalesced = get_single_flight().do(cache_key, search)
+        tracing.note_search_cache("coalesced" if coalesced else "miss")
+        return entry, False, coalesced
+
+
+async def _agrounded_search(query: str, config: RunnableConfig):
+    """Async counterpart of `_grounded_search` built on `client.aio`."""
+    configurable = Configuration.from_runnable_config(config)
+    model = configurable.query_generator_model
+    cache = get_search_cache()
+    cache_key = search_cache_key(query, model)
+
+    async def search():
+        started = time.perf_counter()
+        response = await get_registry().agenerate_content(
+            model,
+            _web_search_prompt(query),
+            _WEB_SEARCH_CONFIG,
+            request_key=request_key_from_config(config),
+        )
+        entry = {
+            "grounding": extract_grounding(response),
+            "latency": time.perf_counter() - started,
+        }
+        await cache.aset(cache_key, entry)
+        return entry
+
+    with tracing.span("grounded_search", query=query):
+        entry = await cache.aget(cache_key)
+        if entry is not None:
+            tracing.note_search_cache("hit")
+            return entry, True, False
+        entry, coalesced = await get_single_flight().ado(cache_key, search)
+        tracing.note_search_cache("coalesced" if coalesced else "miss")
+        return entry, False, coalesced
 
 
 def web_research(state: WebSearchState, config: RunnableConfig) -> OverallState:
     """LangGraph node that performs web research using the native Google Search API tool.
 
     Executes a web search using the native Google Search API tool in combination with Gemini 2.0 Flash.
+    Results are served from the search cache when the same normalized query was
+    already grounded today, and shared with any identical search already in
+    flight. Once the run's deadline is spent the search is skipped.
 
     Args:
         state: Current graph state containing the search query and research loop count
@@ -103,101 +303,422 @@ def web_research(state: WebSearchState, config: RunnableConfig) -> OverallState:
     Returns:
         Dictionary with state update, including sources_gathered, research_loop_count, and web_research_results
     """
-    # Configure
-    configurable = Configuration.from_runnable_config(config)
-    formatted_prompt = web_searcher_instructions.format(
-        current_date=get_current_date(),
-        research_topic=state["search_query"],
-    )
+    reserve = Configuration.from_runnable_config(config).budget_answer_reserve
+    if budget.exhausted(state, reserve):
+        return _web_research_skipped(state, "searches_skipped_budget")
+    try:
+        entry, cache_hit, coalesced = _grounded_search(state["search_query"], config)
+        return _web_research_result(state, entry, cache_hit, coalesced)
+    except Exception as e:
+        return _web_research_error(state, e)
+
 
+async def _aweb_research_update(state: WebSearchState, config: RunnableConfig) -> OverallState:
+    reserve = Configuration.from_runnable_config(config).budget_answer_reserve
+    if budget.exhausted(state, reserve):
+        return _web_research_skipped(state, "searches_skipped_budget")
     try:
-        # Uses the google genai client as the langchain client doesn't return grounding metadata
-        response = genai_client.models.generate_content(
-            model=configurable.query_generator_model,
-            contents=formatted_prompt,
-            config={
-                "tools": [{"google_search": {}}],
-                "temperature": 0,
-            },
+        # A search still running when the deadline's research share is up is dropped
+        entry, cache_hit, coalesced = await asyncio.wait_for(
+            _agrounded_search(state["search_query"], config),
+            budget.seconds_left(state, reserve),
         )
-        
-        # Check if response has grounding metadata
-        if (response.candidates and 
-            len(response.candidates) > 0 and 
-            hasattr(response.candidates[0], 'grounding_metadata') and
-            response.candidates[0].grounding_metadata and
-            hasattr(response.candidates[0].grounding_metadata, 'grounding_chunks')):
-            
-            # resolve the urls to short urls for saving tokens and time
-            resolved_urls = resolve_urls(
-                response.candidates[0].grounding_metadata.grounding_chunks, state["id"]
-            )
-            # Gets the citations and adds them to the generated text
-            citations = get_citations(response, resolved_urls)
-            modified_text = insert_citation_markers(response.text, citations)
-            sources_gathered = [item for citation in citations for item in citation["segments"]]
-        else:
-            # Fallback when no grounding metadata is available
-            modified_text = response.text if response.text else "No search results available."
-            sources_gathered = []
-            citations = []
-
-        return {
-            "sources_gathered": sources_gathered,
-            "search_query": [state["search_query"]],
-            "web_research_result": [modified_text],
-        }
+        return _web_research_result(state, entry, cache_hit, coalesced)
+    except asyncio.TimeoutError:
+        return _web_research_skipped(state, "searches_timed_out_budget")
     except Exception as e:
-        # Fallback for any search errors
-        error_msg = f"Search failed for query '{state['search_query']}': {str(e)}"
-        return {
-            "sources_gathered": [],
-            "search_query": [state["search_query"]],
-            "web_research_result": [error_msg],
-        }
+        return _web_research_error(state, e)
 
 
-def reflection(state: OverallState, config: RunnableConfig) -> ReflectionState:
-    """LangGraph node that identifies knowledge gaps and generates potential follow-up queries.
+async def aweb_research(state: WebSearchState, config: RunnableConfig) -> OverallState:
+    """Async variant of `web_research` built on the non-blocking `client.aio` API.
 
-    Analyzes the current summary to identify areas for further research and generates
-    potential follow-up queries. Uses structured output to extract
-    the follow-up query in JSON format.
+    Each fan-out branch awaits the grounded search on the event loop instead of
+    holding a worker thread, so wide fan-outs and many concurrent research runs
+    are not capped by the default executor size. In quorum mode a branch whose
+    search is still running when its loop is released returns without a
+    result; the search is parked and folded in by the next reflection or by
+    `finalize_answer`. With a deadline, a search is dropped once the research
+    share of the deadline runs out.
+    """
+    if not state.get("fan_out"):
+        return await _aweb_research_update(state, config)
 
-    Args:
-        state: Current graph state containing the running summary and research topic
-        config: Configuration for the runnable, including LLM provider settings
+    configurable = Configuration.from_runnable_config(config)
+    task = asyncio.ensure_future(_aweb_research_update(state, config))
+    late_key = await quorum.join(
+        state["fan_out"],
+        task,
+        configurable.quorum_fraction,
+        configurable.quorum_deadline_seconds,
+    )
+    if late_key is None:
+        return task.result()
+    return {
+        # Recorded right away so follow-ups are deduplicated against it
+        "search_query": [state["search_query"]],
+        "late_searches": [late_key],
+        "run_stats": {"searches_late": 1},
+    }
+
+
+def _fold_late_results(state: OverallState, cancel: bool = False):
+    """Merge parked searches that finished since their loop was released.
 
     Returns:
-        Dictionary with state update, including search_query key containing the generated follow-up query
+        Tuple of (state including the late results, state update recording them)
+    """
+    folded = set(state.get("folded_late_searches") or [])
+    pending = [key for key in state.get("late_searches") or [] if key not in folded]
+    if not pending:
+        return state, {}
+    results, settled, _ = quorum.collect(pending, cancel=cancel)
+    sources, texts = [], []
+    run_stats = {
+        "late_results_folded": len(results),
+        "late_searches_dropped": len(settled) - len(results),
+    }
+    for result in results:
+        sources = add_sources(sources, result["sources_gathered"])
+        texts = add_results(texts, result["web_research_result"])
+        run_stats = merge_stats(run_stats, result.get("run_stats") or {})
+    state = {
+        **state,
+        "sources_gathered": add_sources(state["sources_gathered"], sources),
+        "web_research_result": add_results(state["web_research_result"], texts),
+        "run_stats": merge_stats(state.get("run_stats"), run_stats),
+    }
+    return state, {
+        "sources_gathered": sources,
+        "web_research_result": texts,
+        "folded_late_searches": settled,
+        "run_stats": run_stats,
+    }
+
+
+def _reflection_inputs(state: OverallState, configurable: Configuration):
+    """Increment the loop count and return the reasoning model and reflection prompt.
+
+    With a digest budget, results already reflected on are represented by the
+    rolling digest and only the results gathered since are sent; those are cut
+    down to the top evidence passages when there are more than `evidence_top_k`.
     """
-    configurable = Configuration.from_runnable_config(config)
     # Increment the research loop count and get the reasoning model
     state["research_loop_count"] = state.get("research_loop_count", 0) + 1
     reasoning_model = state.get("reasoning_model", configurable.reflection_model)
 
+    results = state["web_research_result"]
+    full_summaries = "\n\n---\n\n".join(results)
+    digest = state.get("research_digest") or ""
+    use_digest = configurable.digest_token_budget > 0 and digest
+    new_results = results[state.get("digested_result_count") or 0:] if use_digest else results
+    evidence = _evidence(state, configurable, new_results)
+    if evidence is not None:
+        new_results = ["\n\n".join(evidence)]
+    if use_digest:
+        summaries = "\n\n---\n\n".join(
+            [f"Digest of earlier findings:\n{digest}"] + new_results
+        )
+    else:
+        summaries = "\n\n---\n\n".join(new_results)
+
     # Format the prompt
     current_date = get_current_date()
     formatted_prompt = reflection_instructions.format(
         current_date=current_date,
         research_topic=get_research_topic(state["messages"]),
-        summaries="\n\n---\n\n".join(state["web_research_result"]),
+        summaries=summaries,
     )
-    # init Reasoning Model
-    llm = ChatGoogleGenerativeAI(
-        model=reasoning_model,
-        temperature=1.0,
-        max_retries=2,
-        api_key=os.getenv("GEMINI_API_KEY"),
+    prompt_stats = {
+        "reflection_prompt_tokens": [estimate_tokens(formatted_prompt)],
+        "reflection_prompt_tokens_uncompressed": [
+            estimate_tokens(formatted_prompt)
+            + estimate_tokens(full_summaries)
+            - estimate_tokens(summaries)
+        ],
+    }
+    return reasoning_model, formatted_prompt, prompt_stats
+
+
+def _evidence(state: OverallState, configurable: Configuration, texts):
+    """Top passages of `texts` for the topic and open knowledge gap, or None to keep all."""
+    if configurable.evidence_top_k <= 0:
+        return None
+    query = f"{get_research_topic(state['messages'])} {state.get('knowledge_gap') or ''}"
+    return select_evidence(
+        texts, query, configurable.evidence_top_k, configurable.evidence_vector_weight
     )
-    result = llm.with_structured_output(Reflection).invoke(formatted_prompt)
 
+
+def _digest_update(state: OverallState, configurable: Configuration) -> Dict[str, Any]:
+    """Fold the results reflected on this loop into the rolling digest."""
+    if configurable.digest_token_budget <= 0:
+        return {}
+    results = state["web_research_result"]
+    new_results = results[state.get("digested_result_count") or 0:]
+    digest = compress(
+        [state.get("research_digest") or ""] + new_results,
+        configurable.digest_token_budget,
+        topic=get_research_topic(state["messages"]),
+    )
+    return {"research_digest": digest, "digested_result_count": len(results)}
+
+
+def _information_gain(state: OverallState, result: Reflection) -> Dict[str, Any]:
+    """Marginal information the latest loop added over everything gathered before.
+
+    new_url_ratio is the share of the loop's source urls not seen before,
+    token_novelty the share of its distinct terms not in earlier results, and
+    follow_up_overlap the share of the proposed follow-up query terms already
+    covered by queries that were run.
+    """
+    results = state["web_research_result"]
+    sources = state["sources_gathered"]
+    split_results = state.get("reflected_result_count") or 0
+    split_sources = state.get("reflected_source_count") or 0
+
+    new_urls = {s["value"] for s in sources[split_sources:]}
+    seen_urls = {s["value"] for s in sources[:split_sources]}
+    new_terms = set(tokenize(" ".join(results[split_results:])))
+    seen_terms = set(tokenize(" ".join(results[:split_results])))
+    follow_up_terms = set(tokenize(" ".join(result.follow_up_queries)))
+    query_terms = set(tokenize(" ".join(state["search_query"])))
+    return {
+        "loop": state["research_loop_count"],
+        "new_url_ratio": len(new_urls - seen_urls) / len(new_urls) if new_urls else 0.0,
+        "token_novelty": len(new_terms - seen_terms) / len(new_terms) if new_terms else 0.0,
+        "follow_up_overlap": (
+            len(follow_up_terms & query_terms) / len(follow_up_terms)
+            if follow_up_terms else 1.0
+        ),
+    }
+
+
+def _stop_reason(
+    state: OverallState,
+    configurable: Configuration,
+    result: Reflection,
+    follow_up_queries,
+    gain: Dict[str, Any],
+    tokens: int = 0,
+):
+    """Name of the rule that ends the research loop after this reflection, if any.
+
+    `tokens` are those the reflection itself used, not yet counted in the state.
+    """
+    max_research_loops = (
+        state.get("max_research_loops")
+        if state.get("max_research_loops") is not None
+        else configurable.max_research_loops
+    )
+    if result.is_sufficient:
+        return "sufficient"
+    if state["research_loop_count"] >= max_research_loops:
+        return "max_research_loops"
+    exhausted = budget.exhausted(state, configurable.budget_answer_reserve, tokens)
+    if exhausted:
+        return exhausted
+    if not follow_up_queries:
+        return "no_follow_up_queries"
+    # The first loop has nothing earlier to be compared against
+    if not configurable.early_stop or not state.get("reflected_result_count"):
+        return None
+    if gain["new_url_ratio"] < configurable.min_new_url_ratio:
+        return "new_url_ratio"
+    if gain["token_novelty"] < configurable.min_token_novelty:
+        return "token_novelty"
+    if gain["follow_up_overlap"] > configurable.max_follow_up_overlap:
+        return "follow_up_overlap"
+    return None
+
+
+def _reflection_result(
+    state: OverallState,
+    configurable: Configuration,
+    result: Reflection,
+    prompt_stats: Dict[str, Any],
+) -> ReflectionState:
+    # Drop follow-ups that paraphrase a query we already searched
+    follow_up_queries, dropped = dedupe_queries(
+        result.follow_up_queries,
+        state["search_query"],
+        configurable.query_dedup_threshold,
+    )
+    gain = _information_gain(state, result)
+    tokens = prompt_stats["reflection_prompt_tokens"][0] + budget.count_tokens(
+        result.model_dump_json()
+    )
+    stop_reason = _stop_reason(state, configurable, result, follow_up_queries, gain, tokens)
+    # The next loop fans out to fewer searches as the run's budget runs down
+    width = budget.fan_out_width(
+        state, len(follow_up_queries), configurable.budget_answer_reserve, tokens
+    )
+    run_stats = {
+        "searches_deduplicated": len(dropped),
+        "searches_cut_by_budget": 0 if stop_reason else len(follow_up_queries) - width,
+        "information_gain": [gain],
+        "tokens_used": tokens,
+        **prompt_stats,
+    }
+    if not stop_reason:
+        follow_up_queries = follow_up_queries[:width]
+    if stop_reason:
+        run_stats["stop_reason"] = stop_reason
     return {
         "is_sufficient": result.is_sufficient,
         "knowledge_gap": result.knowledge_gap,
-        "follow_up_queries": result.follow_up_queries,
+        "follow_up_queries": follow_up_queries,
         "research_loop_count": state["research_loop_count"],
         "number_of_ran_queries": len(state["search_query"]),
+        "stop_reason": stop_reason,
+        "reflected_result_count": len(state["web_research_result"]),
+        "reflected_source_count": len(state["sources_gathered"]),
+        "run_stats": run_stats,
+        **_digest_update(state, configurable),
+    }
+
+
+def _reflection_skipped(state: OverallState, stop_reason: str) -> ReflectionState:
+    """Reflection update that ends research without a model call once the budget is spent."""
+    return {
+        "is_sufficient": False,
+        "knowledge_gap": state.get("knowledge_gap") or "",
+        "follow_up_queries": [],
+        "research_loop_count": state.get("research_loop_count", 0) + 1,
+        "number_of_ran_queries": len(state["search_query"]),
+        "stop_reason": stop_reason,
+        "reflected_result_count": len(state["web_research_result"]),
+        "reflected_source_count": len(state["sources_gathered"]),
+        "run_stats": {"stop_reason": stop_reason, "reflections_skipped_budget": 1},
+    }
+
+
+def reflection(state: OverallState, config: RunnableConfig) -> ReflectionState:
+    """LangGraph node that identifies knowledge gaps and generates potential follow-up queries.
+
+    Analyzes the current summary to identify areas for further research and generates
+    potential follow-up queries. Uses structured output to extract
+    the follow-up query in JSON format.
+
+    Args:
+        state: Current graph state containing the running summary and research topic
+        config: Configuration for the runnable, including LLM provider settings
+
+    Returns:
+        Dictionary with state update, including search_query key containing the generated follow-up query
+    """
+    configurable = Configuration.from_runnable_config(config)
+    exhausted = budget.exhausted(state, configurable.budget_answer_reserve)
+    if exhausted:
+        return _reflection_skipped(state, exhausted)
+    reasoning_model, formatted_prompt, prompt_stats = _reflection_inputs(
+        state, configurable
+    )
+    result = get_registry().invoke(
+        reasoning_model,
+        formatted_prompt,
+        temperature=1.0,
+        schema=Reflection,
+        config=config,
+    )
+    return _reflection_result(state, configurable, result, prompt_stats)
+
+
+def _speculate(state: OverallState, configurable: Configuration, config: RunnableConfig):
+    """Start predicting and prefetching follow-up searches in the background."""
+    prompt = follow_up_prediction_instructions.format(
+        current_date=get_current_date(),
+        research_topic=get_research_topic(state["messages"]),
+        queries="\n".join(f"- {query}" for query in dict.fromkeys(state["search_query"])),
+        knowledge_gap=state.get("knowledge_gap") or "None identified yet.",
+        number_queries=configurable.speculative_queries,
+    )
+
+    async def predict():
+        result = await get_registry().ainvoke(
+            configurable.query_generator_model,
+            prompt,
+            temperature=1.0,
+            schema=SearchQueryList,
+            config=config,
+        )
+        return result.query[:configurable.speculative_queries]
+
+    return Speculation.start(predict, lambda query: _agrounded_search(query, config))
+
+
+async def _resolve_speculation(
+    state: OverallState,
+    configurable: Configuration,
+    speculation: Speculation,
+    update: ReflectionState,
+) -> ReflectionState:
+    """Point follow-ups at matching prefetched searches and record the hit rate."""
+    follow_ups = [] if update["stop_reason"] else update["follow_up_queries"]
+    rewritten, stats = await speculation.resolve(
+        follow_ups, configurable.speculation_match_threshold
+    )
+    if follow_ups:
+        update["follow_up_queries"] = rewritten
+    update["run_stats"].update(
+        speculation=[{"loop": state["research_loop_count"], **stats}],
+        speculative_searches=stats["predicted"],
+        speculative_hits=stats["matched"],
+        speculation_saved_seconds=stats["saved_seconds"],
+    )
+    return update
+
+
+async def areflection(state: OverallState, config: RunnableConfig) -> ReflectionState:
+    """Async variant of `reflection` used when the graph runs via `ainvoke`.
+
+    With `speculative_prefetch`, likely follow-up searches start while the
+    reasoning model reflects, so matching `web_research` branches of the next
+    loop find their results cached or already in flight. In quorum mode, late
+    searches that have finished since the last loop are reflected on too.
+    """
+    configurable = Configuration.from_runnable_config(config)
+    state, late = _fold_late_results(state)
+    exhausted = budget.exhausted(state, configurable.budget_answer_reserve)
+    if exhausted:
+        return _with_late_results(_reflection_skipped(state, exhausted), late)
+    reasoning_model, formatted_prompt, prompt_stats = _reflection_inputs(
+        state, configurable
+    )
+    # Prefetched searches that go unused would spend a token budget for nothing
+    speculation = (
+        _speculate(state, configurable, config)
+        if configurable.speculative_prefetch
+        and not (state.get("budget") or {}).get("max_tokens")
+        else None
+    )
+    try:
+        result = await get_registry().ainvoke(
+            reasoning_model,
+            formatted_prompt,
+            temperature=1.0,
+            schema=Reflection,
+            config=config,
+        )
+    except BaseException:
+        if speculation is not None:
+            await speculation.resolve([], configurable.speculation_match_threshold)
+        raise
+    update = _reflection_result(state, configurable, result, prompt_stats)
+    if speculation is not None:
+        update = await _resolve_speculation(state, configurable, speculation, update)
+    return _with_late_results(update, late)
+
+
+def _with_late_results(update: Dict[str, Any], late: Dict[str, Any]) -> Dict[str, Any]:
+    """Add the state update of `_fold_late_results` to a node's own update."""
+    if not late:
+        return update
+    return {
+        **update,
+        **late,
+        "sources_gathered": add_sources(update.get("sources_gathered"), late["sources_gathered"]),
+        "run_stats": merge_stats(update.get("run_stats"), late["run_stats"]),
     }
 
 
@@ -208,7 +729,9 @@ def evaluate_research(
     """LangGraph routing function that determines the next step in the research flow.
 
     Controls the research loop by deciding whether to continue gathering information
-    or to finalize the summary based on the configured maximum number of research loops.
+    or to finalize the summary based on the configured maximum number of research loops,
+    or on the stop rule that `reflection` found to fire (e.g. too little new information),
+    or on the run's deadline or token budget running out.
 
     Args:
         state: Current graph state containing the research loop count
@@ -223,19 +746,76 @@ def evaluate_research(
         if state.get("max_research_loops") is not None
         else configurable.max_research_loops
     )
-    if state["is_sufficient"] or state["research_loop_count"] >= max_research_loops:
+    if (
+        state.get("stop_reason")
+        or state["is_sufficient"]
+        or state["research_loop_count"] >= max_research_loops
+        or not state["follow_up_queries"]
+        or budget.exhausted(state, configurable.budget_answer_reserve)
+    ):
         return "finalize_answer"
     else:
-        return [
-            Send(
-                "web_research",
-                {
-                    "search_query": follow_up_query,
-                    "id": state["number_of_ran_queries"] + int(idx),
-                },
-            )
-            for idx, follow_up_query in enumerate(state["follow_up_queries"])
-        ]
+        return _web_research_sends(
+            state["follow_up_queries"],
+            state["number_of_ran_queries"],
+            config,
+            state.get("budget"),
+        )
+
+
+def _answer_inputs(state: OverallState, configurable: Configuration):
+    """Return the answer model and the formatted answer prompt."""
+    reasoning_model = state.get("reasoning_model") or configurable.answer_model
+    research_topic = get_research_topic(state["messages"])
+
+    # Keep the best evidence passages, and compress the findings only when
+    # they still do not fit the answer budget
+    evidence = _evidence(state, configurable, state["web_research_result"])
+    findings = evidence if evidence is not None else state["web_research_result"]
+    summaries = "\n---\n\n".join(findings)
+    # A token budget nearly spent shrinks the answer prompt further
+    token_budget = budget.answer_prompt_tokens(state, configurable.answer_token_budget)
+    if token_budget > 0 and estimate_tokens(summaries) > token_budget:
+        summaries = compress(findings, token_budget, topic=research_topic)
+
+    # Format the prompt
+    current_date = get_current_date()
+    formatted_prompt = answer_instructions.format(
+        current_date=current_date,
+        research_topic=research_topic,
+        summaries=summaries,
+    )
+    return reasoning_model, formatted_prompt
+
+
+def _answer_call(state: OverallState, configurable: Configuration, config: RunnableConfig):
+    """Model, prompt and keyword arguments of the answer call, its output capped by the budget"""
+    reasoning_model, formatted_prompt = _answer_inputs(state, configurable)
+    kwargs = {
+        "temperature": 0,
+        "config": config,
+        "max_output_tokens": budget.answer_output_tokens(state, estimate_tokens(formatted_prompt)),
+    }
+    return reasoning_model, formatted_prompt, kwargs
+
+
+def _answer_result(state: OverallState, prompt: str, content: str, used_sources):
+    tokens = budget.count_tokens(prompt, content)
+    return {
+        "messages": [AIMessage(content=content)],
+        "sources_gathered": used_sources,
+        "run_stats": {"answer_prompt_tokens": estimate_tokens(prompt), "tokens_used": tokens},
+        "budget_usage": budget.usage(state.get("budget"), budget.tokens_used(state) + tokens),
+    }
+
+
+def _chunk_text(chunk) -> str:
+    content = chunk.content
+    if isinstance(content, str):
+        return content
+    return "".join(
+        part.get("text", "") for part in content if isinstance(part, dict)
+    )
 
 
 def finalize_answer(state: OverallState, config: RunnableConfig):
@@ -243,7 +823,9 @@ def finalize_answer(state: OverallState, config: RunnableConfig):
 
     Prepares the final output by deduplicating and formatting sources, then
     combining them with the running summary to create a well-structured
-    research report with proper citations.
+    research report with proper citations. When `stream_answer` is enabled the
+    answer is streamed and each rewritten chunk is dispatched as an
+    `answer_chunk` custom event.
 
     Args:
         state: Current graph state containing the running summary and sources gathered
@@ -252,48 +834,88 @@ def finalize_answer(state: OverallState, config: RunnableConfig):
         Dictionary with state update, including running_summary key containing the formatted final summary with sources
     """
     configurable = Configuration.from_runnable_config(config)
-    reasoning_model = state.get("reasoning_model") or configurable.answer_model
+    reasoning_model, formatted_prompt, kwargs = _answer_call(state, configurable, config)
+
+    # Replace the short urls with the original urls and collect the used sources
+    if not configurable.stream_answer:
+        result = get_registry().invoke(reasoning_model, formatted_prompt, **kwargs)
+        return _answer_result(
+            state,
+            formatted_prompt,
+            *rewrite_short_urls(_chunk_text(result), state["sources_gathered"])
+        )
 
-    # Format the prompt
-    current_date = get_current_date()
-    formatted_prompt = answer_instructions.format(
-        current_date=current_date,
-        research_topic=get_research_topic(state["messages"]),
-        summaries="\n---\n\n".join(state["web_research_result"]),
+    rewriter = ShortUrlRewriter(state["sources_gathered"])
+    parts = []
+    for chunk in get_registry().stream(reasoning_model, formatted_prompt, **kwargs):
+        text = rewriter.feed(_chunk_text(chunk))
+        if text:
+            parts.append(text)
+            dispatch_custom_event("answer_chunk", {"text": text}, config=config)
+    text = rewriter.flush()
+    if text:
+        parts.append(text)
+        dispatch_custom_event("answer_chunk", {"text": text}, config=config)
+    return _answer_result(
+        state, formatted_prompt, "".join(parts), rewriter.used_sources
     )
 
-    # init Reasoning Model, default to Gemini 2.5 Flash
-    llm = ChatGoogleGenerativeAI(
-        model=reasoning_model,
-        temperature=0,
-        max_retries=2,
-        api_key=os.getenv("GEMINI_API_KEY"),
+
+async def afinalize_answer(state: OverallState, config: RunnableConfig):
+    """Async variant of `finalize_answer` used when the graph runs via `ainvoke`.
+
+    In quorum mode, late searches that have finished are added to the findings
+    and those still running are cancelled rather than waited for.
+    """
+    configurable = Configuration.from_runnable_config(config)
+    state, late = _fold_late_results(state, cancel=True)
+    reasoning_model, formatted_prompt, kwargs = _answer_call(state, configurable, config)
+
+    if not configurable.stream_answer:
+        result = await get_registry().ainvoke(reasoning_model, formatted_prompt, **kwargs)
+        return _with_late_results(
+            _answer_result(
+                state,
+                formatted_prompt,
+                *rewrite_short_urls(_chunk_text(result), state["sources_gathered"])
+            ),
+            late,
+        )
+
+    rewriter = ShortUrlRewriter(state["sources_gathered"])
+    parts = []
+    async for chunk in get_registry().astream(reasoning_model, formatted_prompt, **kwargs):
+        text = rewriter.feed(_chunk_text(chunk))
+        if text:
+            parts.append(text)
+            await adispatch_custom_event("answer_chunk", {"text": text}, config=config)
+    text = rewriter.flush()
+    if text:
+        parts.append(text)
+        await adispatch_custom_event("answer_chunk", {"text": text}, config=config)
+    return _with_late_results(
+        _answer_result(state, formatted_prompt, "".join(parts), rewriter.used_sources),
+        late,
     )
-    result = llm.invoke(formatted_prompt)
 
-    # Replace the short urls with the original urls and add all used urls to the sources_gathered
-    unique_sources = []
-    for source in state["sources_gathered"]:
-        if source["short_url"] in result.content:
-            result.content = result.content.replace(
-                source["short_url"], source["value"]
-            )
-            unique_sources.append(source)
 
-    return {
-        "messages": [AIMessage(content=result.content)],
-        "sources_gathered": unique_sources,
-    }
+def _node(name: str, func, afunc) -> RunnableLambda:
+    """A graph node with sync and async implementations, each run traced as a span."""
+    return RunnableLambda(tracing.node(name, func), afunc=tracing.node(name, afunc))
 
 
 # Create our Agent Graph
 builder = StateGraph(OverallState, config_schema=Configuration)
 
-# Define the nodes we will cycle between
-builder.add_node("generate_query", generate_query)
-builder.add_node("web_research", web_research)
-builder.add_node("reflection", reflection)
-builder.add_node("finalize_answer", finalize_answer)
+# Define the nodes we will cycle between. Each node carries a sync and an async
+# implementation: `graph.invoke` uses the former and `graph.ainvoke` the latter,
+# so async callers never park a fan-out branch on an executor thread.
+builder.add_node("generate_query", _node("generate_query", generate_query, agenerate_query))
+builder.add_node("web_research", _node("web_research", web_research, aweb_research))
+builder.add_node("reflection", _node("reflection", reflection, areflection))
+builder.add_node(
+    "finalize_answer", _node("finalize_answer", finalize_answer, afinalize_answer)
+)
 
 # Set the entrypoint as `generate_query`
 # This means that this node is the first one called
@@ -311,4 +933,28 @@ builder.add_conditional_edges(
 # Finalize the answer
 builder.add_edge("finalize_answer", END)
 
-graph = builder.compile(name="deep-research-agent")
\ No newline at end of file
+
+def build_graph(checkpointer=None):
+    """Compile the agent graph, optionally with a checkpointer for resumable runs"""
+    check_api_key()
+    return builder.compile(checkpointer=checkpointer, name="deep-research-agent")
+
+
+_graph = None
+_graph_lock = threading.Lock()
+
+
+def get_graph():
+    """The process-wide graph without a checkpointer, compiled on first use"""
+    global _graph
+    with _graph_lock:
+        if _graph is None:
+            _graph = build_graph()
+        return _graph
+
+
+def __getattr__(name: str):
+    # `from src.agent.graph import graph` keeps working, compiling the graph then
+    if name == "graph":
+        return get_graph()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
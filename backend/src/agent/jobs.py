@@ -0,0 +1,344 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Set
+from uuid import uuid4
+
+_TERMINAL = ("completed", "failed")
+
+
+class QueueFull(Exception):
+    """Raised by `JobQueue.submit` when `max_queued` jobs are already waiting."""
+
+
+class JobStore:
+    """SQLite table of research jobs, so queued and running jobs survive restarts.
+
+    Several processes may share one database (e.g. uvicorn workers). Each
+    unfinished job is leased to the process that owns it; a worker only runs
+    a job it has claimed, and a job can only be claimed from another owner
+    once that owner has stopped renewing its lease.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id TEXT PRIMARY KEY,"
+            " request TEXT NOT NULL,"
+            " status TEXT NOT NULL,"
+            " result TEXT,"
+            " error TEXT,"
+            " created_at REAL NOT NULL,"
+            " started_at REAL,"
+            " finished_at REAL,"
+            " owner TEXT,"
+            " lease_until REAL)"
+        )
+        # Databases created before leases were added
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        for column, kind in (("owner", "TEXT"), ("lease_until", "REAL")):
+            if column not in columns:
+                self._conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {kind}")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)")
+        self._conn.commit()
+
+    def add(self, job_id: str, request: Dict[str, Any], owner: str, lease: float) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, request, status, created_at, owner, lease_until)"
+                " VALUES (?, ?, 'queued', ?, ?, ?)",
+                (job_id, json.dumps(request), now, owner, now + lease),
+            )
+            self._conn.commit()
+
+    def claim(self, job_id: str, owner: str, lease: float) -> bool:
+        """Mark a job running under `owner` unless another owner holds a live lease on it"""
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = 'running', owner = ?, lease_until = ?, started_at = ?"
+                " WHERE id = ? AND status IN ('queued', 'running')"
+                " AND (owner = ? OR COALESCE(lease_until, 0) < ?)",
+                (owner, now + lease, now, job_id, owner, now),
+            )
+            self._conn.commit()
+        return cursor.rowcount == 1
+
+    def renew(self, owner: str, lease: float) -> None:
+        """Extend the leases of every unfinished job `owner` holds"""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET lease_until = ?"
+                " WHERE owner = ? AND status IN ('queued', 'running')",
+                (time.time() + lease, owner),
+            )
+            self._conn.commit()
+
+    def release(self, owner: str) -> None:
+        """Let any process claim `owner`'s unfinished jobs straight away"""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET lease_until = 0"
+                " WHERE owner = ? AND status IN ('queued', 'running')",
+                (owner,),
+            )
+            self._conn.commit()
+
+    def update(self, job_id: str, **fields: Any) -> None:
+        if "result" in fields:
+            fields["result"] = json.dumps(fields["result"], default=str)
+        columns = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock:
+            self._conn.execute(
+                f"UPDATE jobs SET {columns} WHERE id = ?", (*fields.values(), job_id)
+            )
+            self._conn.commit()
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, request, status, result, error, created_at, started_at,"
+                " finished_at FROM jobs WHERE id = ?",
+                (job_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        job_id, request, status, result, error, created, started, finished = row
+        return {
+            "job_id": job_id,
+            "request": json.loads(request),
+            "status": status,
+            "result": json.loads(result) if result else None,
+            "error": error,
+            "created_at": created,
+            "started_at": started,
+            "finished_at": finished,
+        }
+
+    def adopt(self, owner: str, lease: float) -> List[str]:
+        """Lease unfinished jobs whose owner stopped renewing to `owner`; returns their ids"""
+        now = time.time()
+        adopted = []
+        with self._lock:
+            orphans = self._conn.execute(
+                "SELECT id FROM jobs WHERE status IN ('queued', 'running')"
+                " AND COALESCE(lease_until, 0) < ? ORDER BY created_at",
+                (now,),
+            ).fetchall()
+            # Each update re-checks the lease, in case another process adopted the job first
+            for (job_id,) in orphans:
+                cursor = self._conn.execute(
+                    "UPDATE jobs SET owner = ?, lease_until = ? WHERE id = ?"
+                    " AND status IN ('queued', 'running') AND COALESCE(lease_until, 0) < ?",
+                    (owner, now + lease, job_id, now),
+                )
+                if cursor.rowcount == 1:
+                    adopted.append(job_id)
+            self._conn.commit()
+        return adopted
+
+    def prune(self, max_age: float) -> int:
+        """Delete finished jobs older than `max_age` seconds; returns how many"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM jobs WHERE status IN ('completed', 'failed') AND finished_at < ?",
+                (time.time() - max_age,),
+            )
+            self._conn.commit()
+        return cursor.rowcount
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status")
+            return dict(rows.fetchall())
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def _percentiles(samples) -> Dict[str, float]:
+    if not samples:
+        return {"p50": 0.0, "p95": 0.0, "max": 0.0}
+    ordered = sorted(samples)
+    return {
+        "p50": ordered[len(ordered) // 2],
+        "p95": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+        "max": ordered[-1],
+    }
+
+
+class JobQueue:
+    """Bounded pool of asyncio workers running research jobs from a `JobStore`.
+
+    `submit` records a job and returns at once; `workers` jobs run at a time
+    and at most `max_queued` may wait, beyond which `submit` raises
+    `QueueFull`. The queue renews the leases of its jobs every `lease / 3`
+    seconds and takes over jobs whose lease has run out: those left by a
+    crashed process, or released by one that stopped. `run` gets the job
+    id, so it can resume a checkpointed run under it.
+    """
+
+    def __init__(
+        self,
+        store: JobStore,
+        run: Callable[[str, Dict[str, Any]], Awaitable[Dict[str, Any]]],
+        workers: int = 4,
+        max_queued: int = 100,
+        window: int = 1000,
+        lease: float = 30.0,
+    ):
+        self.store = store
+        self.owner = str(uuid4())
+        self.lease = lease
+        self.run = run
+        self.workers = workers
+        self.max_queued = max_queued
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._tasks: List[asyncio.Task] = []
+        self._changed: Dict[str, Set[asyncio.Event]] = {}
+        self._adding = 0
+        self.running = 0
+        self.rejected = 0
+        self.recovered = 0
+        # Seconds jobs waited before a worker picked them up, and ran for
+        self._queue_seconds: Deque[float] = deque(maxlen=window)
+        self._run_seconds: Deque[float] = deque(maxlen=window)
+
+    async def start(self) -> None:
+        self._tasks = [asyncio.ensure_future(self._worker()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.ensure_future(self._heartbeat()))
+
+    async def stop(self) -> None:
+        """Stop the workers and release their jobs, which stay `running` until taken over"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        await asyncio.to_thread(self.store.release, self.owner)
+
+    async def _heartbeat(self) -> None:
+        """Renew this queue's leases and queue jobs whose owner has gone away"""
+        while True:
+            await asyncio.to_thread(self.store.renew, self.owner, self.lease)
+            for job_id in await asyncio.to_thread(self.store.adopt, self.owner, self.lease):
+                self._queue.put_nowait(job_id)
+                self.recovered += 1
+            await asyncio.sleep(self.lease / 3)
+
+    async def submit(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        # Jobs still being written to the store count against the limit too
+        if self._queue.qsize() + self._adding >= self.max_queued:
+            self.rejected += 1
+            raise QueueFull(f"{self._queue.qsize()} jobs are already queued")
+        job_id = str(uuid4())
+        self._adding += 1
+        try:
+            await asyncio.to_thread(self.store.add, job_id, request, self.owner, self.lease)
+        finally:
+            self._adding -= 1
+        self._queue.put_nowait(job_id)
+        return {"job_id": job_id, "status": "queued", "queue_position": self._queue.qsize()}
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return await asyncio.to_thread(self.store.get, job_id)
+
+    def changed(self, job_id: str) -> asyncio.Event:
+        """Event set on the job's next status change; take it before reading the job.
+
+        Pass it to `forget` once done waiting, since a job that has already
+        finished never changes again.
+        """
+        event = asyncio.Event()
+        self._changed.setdefault(job_id, set()).add(event)
+        return event
+
+    def forget(self, job_id: str, event: asyncio.Event) -> None:
+        listeners = self._changed.get(job_id)
+        if listeners is not None:
+            listeners.discard(event)
+            if not listeners:
+                del self._changed[job_id]
+
+    async def _set(self, job_id: str, **fields: Any) -> None:
+        await asyncio.to_thread(self.store.update, job_id, **fields)
+        self._notify(job_id)
+
+    def _notify(self, job_id: str) -> None:
+        for event in self._changed.pop(job_id, ()):
+            event.set()
+
+    def retry_after(self) -> int:
+        """Seconds until a queue slot is likely to free up, for 429 responses"""
+        if not self._run_seconds:
+            return 1
+        mean = sum(self._run_seconds) / len(self._run_seconds)
+        return max(1, round(mean / max(self.workers, 1)))
+
+    async def _worker(self) -> None:
+        while True:
+            job_id = await self._queue.get()
+            job = await self.get(job_id)
+            if job is None or job["status"] in _TERMINAL:
+                continue
+            # Another process may have claimed it first
+            if not await asyncio.to_thread(self.store.claim, job_id, self.owner, self.lease):
+                continue
+            started = time.time()
+            self._queue_seconds.append(started - job["created_at"])
+            self.running += 1
+            self._notify(job_id)
+            try:
+                result = await self.run(job_id, job["request"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                await self._set(
+                    job_id, status="failed", error=f"{type(e).__name__}: {e}",
+                    finished_at=time.time(),
+                )
+            else:
+                await self._set(
+                    job_id, status="completed", result=result, finished_at=time.time()
+                )
+            finally:
+                self.running -= 1
+                self._run_seconds.append(time.time() - started)
+
+    async def stats(self) -> Dict[str, Any]:
+        by_status = await asyncio.to_thread(self.store.counts)
+        return {
+            "workers": self.workers,
+            "queued": self._queue.qsize(),
+            "running": self.running,
+            "max_queued": self.max_queued,
+            "rejected": self.rejected,
+            "recovered": self.recovered,
+            "by_status": by_status,
+            "queue_seconds": _percentiles(self._queue_seconds),
+            "run_seconds": _percentiles(self._run_seconds),
+        }
+
+
+def job_queue_from_env(
+    run: Callable[[str, Dict[str, Any]], Awaitable[Dict[str, Any]]]
+) -> JobQueue:
+    """Build the job queue configured by JOB_* variables"""
+    store = JobStore(os.getenv("JOBS_DB", "jobs.sqlite3"))
+    store.prune(float(os.getenv("JOB_RETENTION_SECONDS", 7 * 24 * 3600)))
+    return JobQueue(
+        store,
+        run,
+        workers=int(os.getenv("JOB_WORKERS", 4)),
+        max_queued=int(os.getenv("JOB_QUEUE_MAX", 100)),
+        lease=float(os.getenv("JOB_LEASE_SECONDS", 30)),
+    )
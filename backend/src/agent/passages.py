@@ -0,0 +1,172 @@
+import math
+from collections import Counter
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.agent.digest import split_sentences, tokenize
+
+
+def chunk_passages(text: str, max_words: int = 120) -> List[str]:
+    """Split text into passages of whole sentences, about `max_words` words each"""
+    passages, current, words = [], [], 0
+    for sentence in split_sentences(text):
+        length = len(sentence.split())
+        if current and words + length > max_words:
+            passages.append(" ".join(current))
+            current, words = [], 0
+        current.append(sentence)
+        words += length
+    if current:
+        passages.append(" ".join(current))
+    return passages
+
+
+class PassageIndex:
+    """In-process BM25 index over passages, with an optional cosine re-scorer.
+
+    Postings are kept per term and converted to NumPy arrays on the first
+    search after new passages were added, so a query costs one vectorized
+    update per query term plus a partial sort. With `vector_dims` set, each
+    passage also gets a hashed, L2-normalized TF vector; `search` can then blend
+    BM25 with cosine similarity computed as one matrix-vector product.
+    """
+
+    def __init__(
+        self,
+        k1: float = 1.5,
+        b: float = 0.75,
+        max_words: int = 120,
+        vector_dims: Optional[int] = None,
+    ):
+        self.k1 = k1
+        self.b = b
+        self.max_words = max_words
+        self.vector_dims = vector_dims
+        self.passages: List[str] = []
+        self.metadata: List[Dict[str, Any]] = []
+        self._postings: Dict[str, Tuple[List[int], List[int]]] = {}
+        self._lengths: List[int] = []
+        self._arrays: Optional[Dict[str, Tuple[np.ndarray, np.ndarray]]] = None
+        self._vectors: Optional[np.ndarray] = None
+
+    def __len__(self) -> int:
+        return len(self.passages)
+
+    def add(self, text: str, **metadata: Any) -> int:
+        """Chunk `text` into passages and index them; returns the number added"""
+        chunks = chunk_passages(text, self.max_words)
+        for chunk in chunks:
+            self.add_passage(chunk, **metadata)
+        return len(chunks)
+
+    def add_passage(self, passage: str, **metadata: Any) -> None:
+        doc_id = len(self.passages)
+        terms = Counter(tokenize(passage))
+        for term, tf in terms.items():
+            ids, tfs = self._postings.setdefault(term, ([], []))
+            ids.append(doc_id)
+            tfs.append(tf)
+        self.passages.append(passage)
+        self.metadata.append(metadata)
+        self._lengths.append(sum(terms.values()))
+        self._arrays = None
+        self._vectors = None
+
+    def _postings_arrays(self) -> Dict[str, Tuple[np.ndarray, np.ndarray]]:
+        if self._arrays is None:
+            self._arrays = {
+                term: (np.asarray(ids, dtype=np.int32), np.asarray(tfs, dtype=np.float32))
+                for term, (ids, tfs) in self._postings.items()
+            }
+            self._doc_lengths = np.asarray(self._lengths, dtype=np.float32)
+            self._avg_length = float(self._doc_lengths.mean()) if self._lengths else 0.0
+        return self._arrays
+
+    def bm25(self, query: str) -> np.ndarray:
+        """BM25 score of every passage for `query`"""
+        postings = self._postings_arrays()
+        scores = np.zeros(len(self.passages), dtype=np.float32)
+        if not self.passages:
+            return scores
+        n = len(self.passages)
+        norm = self.k1 * (1 - self.b + self.b * self._doc_lengths / max(self._avg_length, 1e-9))
+        for term in set(tokenize(query)):
+            if term not in postings:
+                continue
+            ids, tfs = postings[term]
+            idf = math.log(1 + (n - len(ids) + 0.5) / (len(ids) + 0.5))
+            scores[ids] += idf * tfs * (self.k1 + 1) / (tfs + norm[ids])
+        return scores
+
+    def _vector(self, terms: Counter, idf: bool = False) -> np.ndarray:
+        vector = np.zeros(self.vector_dims, dtype=np.float32)
+        for term, tf in terms.items():
+            weight = 1 + math.log(tf)
+            if idf:
+                df = len(self._postings.get(term, ((), ()))[0])
+                weight *= math.log(1 + (len(self.passages) + 1) / (df + 1))
+            vector[hash(term) % self.vector_dims] += weight
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def cosine(self, query: str) -> np.ndarray:
+        """Cosine similarity of every passage's hashed TF vector with the query"""
+        if not self.vector_dims:
+            raise ValueError("PassageIndex was built without vector_dims")
+        if self._vectors is None:
+            self._vectors = np.stack(
+                [self._vector(Counter(tokenize(p))) for p in self.passages]
+            ) if self.passages else np.zeros((0, self.vector_dims), dtype=np.float32)
+        return self._vectors @ self._vector(Counter(tokenize(query)), idf=True)
+
+    def search(
+        self, query: str, k: int = 10, vector_weight: float = 0.0
+    ) -> List[Tuple[int, float]]:
+        """Top-k (passage id, score) pairs, best first.
+
+        `vector_weight` blends max-normalized BM25 with cosine similarity;
+        0 uses BM25 alone.
+        """
+        scores = self.bm25(query)
+        if vector_weight > 0 and self.vector_dims:
+            top = scores.max() if len(scores) else 0.0
+            if top > 0:
+                scores = scores / top
+            scores = (1 - vector_weight) * scores + vector_weight * self.cosine(query)
+        k = min(k, len(scores))
+        if k <= 0:
+            return []
+        top_ids = np.argpartition(-scores, k - 1)[:k]
+        top_ids = top_ids[np.argsort(-scores[top_ids])]
+        return [(int(i), float(scores[i])) for i in top_ids if scores[i] > 0]
+
+
+def select_evidence(
+    texts: Sequence[str],
+    query: str,
+    k: int,
+    vector_weight: float = 0.0,
+    max_words: int = 120,
+) -> Optional[List[str]]:
+    """Top-k passages of `texts` relevant to `query`, in their original order.
+
+    Returns None when the texts split into no more than `k` passages, i.e. when
+    selecting evidence would not shorten the prompt, and when no passage
+    matches `query` at all. When fewer than `k` passages match, the remaining
+    slots go to the earliest passages that did not.
+    """
+    index = PassageIndex(max_words=max_words, vector_dims=256 if vector_weight > 0 else None)
+    for text in texts:
+        index.add(text)
+    if len(index) <= k:
+        return None
+    hits = index.search(query, k, vector_weight)
+    if not hits:
+        return None
+    chosen = {i for i, _ in hits}
+    for i in range(len(index)):
+        if len(chosen) >= k:
+            break
+        chosen.add(i)
+    return [index.passages[i] for i in sorted(chosen)]
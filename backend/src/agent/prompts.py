@@ -53,6 +53,24 @@ Focus on:
 
 Provide a detailed research summary based on the search results."""
 
+follow_up_prediction_instructions = """You are a research assistant anticipating the next round of web searches.
+
+Today's date: {current_date}
+
+Research Topic: {research_topic}
+
+Queries already run:
+{queries}
+
+Knowledge gap identified so far: {knowledge_gap}
+
+Your task is to predict the {number_queries} follow-up search queries a research analyst is most likely to run next to fill the remaining gaps in this research.
+
+Each query should:
+1. Target an aspect of the topic the queries above do not cover yet
+2. Be specific and self-contained
+3. Not repeat or rephrase a query that was already run"""
+
 reflection_instructions = """You are a research analyst evaluating the comprehensiveness and quality of research findings.
 
 Today's date: {current_date}
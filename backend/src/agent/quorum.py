@@ -0,0 +1,138 @@
+import asyncio
+import math
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class FanIn:
+    """Releases the web_research branches of one loop at a quorum or deadline.
+
+    Every branch registers its running search with `wait`. Once `quorum`
+    branches have finished, or the deadline has passed and at least one has,
+    the branches still waiting return early so reflection can start; their
+    searches keep running and are folded in later.
+    """
+
+    def __init__(self, size: int, quorum: int, deadline: Optional[float] = None):
+        self.size = size
+        self.quorum = quorum
+        self.deadline = time.monotonic() + deadline if deadline else None
+        self.finished = 0
+        self.returned = 0
+        self._released = asyncio.Event()
+
+    def _remaining(self) -> Optional[float]:
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.monotonic())
+
+    async def wait(self, task: asyncio.Task) -> bool:
+        """Wait for `task` or the release of the loop; True when `task` finished"""
+        released = asyncio.ensure_future(self._released.wait())
+        try:
+            while not task.done() and not released.done():
+                remaining = self._remaining()
+                # Past the deadline with nothing finished, the first search to
+                # finish releases the rest
+                timeout = remaining if remaining else None
+                await asyncio.wait(
+                    {task, released}, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+                )
+                if not task.done() and self._remaining() == 0 and self.finished:
+                    self._released.set()
+        finally:
+            released.cancel()
+            self.returned += 1
+        if not task.done():
+            return False
+        self.finished += 1
+        if self.finished >= self.quorum or self._remaining() == 0:
+            self._released.set()
+        return True
+
+
+_fan_ins: Dict[str, FanIn] = {}
+# Searches of released branches, by the key recorded in `late_searches`
+_late: Dict[str, asyncio.Task] = {}
+# A run that fails or is abandoned before `finalize_answer` never collects
+# its parked searches, and a branch that never starts never returns to its
+# fan-in; both are dropped this long after they were registered
+EXPIRE_SECONDS = 600.0
+
+
+def _expire(registry: Dict[str, Any], key: str, value: Any) -> None:
+    """Drop `key` if it still maps to `value`, cancelling a parked search"""
+    if registry.get(key) is value:
+        del registry[key]
+        if isinstance(value, asyncio.Task):
+            value.cancel()
+
+
+def quorum_size(size: int, fraction: float) -> int:
+    """Number of branches out of `size` that release a loop"""
+    return min(size, max(1, math.ceil(size * fraction)))
+
+
+def new_fan_out(size: int) -> Dict[str, Any]:
+    """Send payload entry that ties the branches of one loop together"""
+    return {"key": uuid.uuid4().hex, "size": size}
+
+
+async def join(
+    fan_out: Dict[str, Any],
+    task: asyncio.Task,
+    quorum_fraction: float,
+    deadline_seconds: float,
+) -> Optional[str]:
+    """Wait for `task` under the loop's quorum and deadline.
+
+    Returns None when the task finished in time, otherwise the key under which
+    the still running task was parked for `collect`.
+    """
+    key = fan_out["key"]
+    fan_in = _fan_ins.get(key)
+    if fan_in is None:
+        fan_in = _fan_ins[key] = FanIn(
+            fan_out["size"],
+            quorum_size(fan_out["size"], quorum_fraction),
+            deadline_seconds,
+        )
+        asyncio.get_running_loop().call_later(
+            EXPIRE_SECONDS + deadline_seconds, _expire, _fan_ins, key, fan_in
+        )
+    try:
+        if await fan_in.wait(task):
+            return None
+    finally:
+        if fan_in.returned >= fan_in.size:
+            _fan_ins.pop(key, None)
+    late_key = f"{key}:{id(task)}"
+    _late[late_key] = task
+    loop = asyncio.get_running_loop()
+    loop.call_later(EXPIRE_SECONDS, _expire, _late, late_key, task)
+    return late_key
+
+
+def collect(keys: List[str], cancel: bool = False) -> Tuple[List[Any], List[str], int]:
+    """Results of parked searches that have finished since they were released.
+
+    Returns:
+        Tuple of (results of finished searches, keys settled, searches still
+        running). With `cancel`, searches still running are cancelled and
+        settled too. Keys whose task is gone (e.g. after a restart, or
+        expired after `EXPIRE_SECONDS`) are settled without a result.
+    """
+    results, settled, running = [], [], 0
+    for key in keys:
+        task = _late.get(key)
+        if task is not None and not task.done():
+            if not cancel:
+                running += 1
+                continue
+            task.cancel()
+        _late.pop(key, None)
+        settled.append(key)
+        if task is not None and task.done() and not task.cancelled():
+            results.append(task.result())
+    return results, settled, running
@@ -0,0 +1,71 @@
+"""Process setup that used to happen as a side effect of importing the graph.
+
+Loading `.env`, checking the API key, importing LangGraph and the model SDKs,
+compiling the graph and creating the model clients take a couple of seconds
+and are not needed to import the API, so each now happens once on first use.
+`warm_up` does all of it ahead of the first request; the API runs it on a
+worker thread at startup and reports readiness when it has finished.
+"""
+
+import os
+import threading
+import time
+from typing import Dict
+
+_env_lock = threading.Lock()
+_env_loaded = False
+
+
+def load_env() -> None:
+    """Load `.env` into the environment once; variables already set take precedence"""
+    global _env_loaded
+    with _env_lock:
+        if not _env_loaded:
+            from dotenv import load_dotenv
+
+            load_dotenv()
+            _env_loaded = True
+
+
+def check_api_key() -> None:
+    """Raise if the configured model transport needs GEMINI_API_KEY and it is not set"""
+    load_env()
+    # Replayed and synthetic model transports never reach the API
+    if os.getenv("GEMINI_API_KEY") is None and \
+            os.getenv("MODEL_TRANSPORT", "live").lower() in ("live", "record"):
+        raise ValueError("GEMINI_API_KEY is not set")
+
+
+def warm_clients() -> None:
+    """Create the pooled models and structured-output runnables the graph nodes use by default"""
+    from src.agent.clients import get_registry
+    from src.agent.configuration import Configuration
+    from src.agent.tools_and_schemas import Reflection, SearchQueryList
+
+    configurable = Configuration()
+    registry = get_registry()
+    registry.runnable(configurable.query_generator_model, 1.0, SearchQueryList)
+    registry.runnable(configurable.reflection_model, 1.0, Reflection)
+    registry.runnable(configurable.answer_model, 0)
+    registry.genai_client
+
+
+def _compile_graph() -> None:
+    from src.agent.graph import get_graph
+
+    get_graph()
+
+
+def warm_up() -> Dict[str, float]:
+    """Check the environment, compile the graph and create the model clients.
+
+    Returns the seconds each step took. Raises what the first failing step
+    raised, e.g. a missing API key.
+    """
+    seconds = {}
+    steps = (("environment", check_api_key), ("graph", _compile_graph), ("clients", warm_clients))
+    for name, step in steps:
+        started = time.perf_counter()
+        step()
+        seconds[name] = round(time.perf_counter() - started, 3)
+    return seconds
@@ -0,0 +1,338 @@
+import asyncio
+import os
+import random
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Deque, Dict, Optional, Tuple
+
+from src.agent import tracing
+
+if TYPE_CHECKING:
+    from langchain_core.runnables import RunnableConfig
+
+DEFAULT_REQUEST_KEY = "default"
+
+
+def request_key_from_config(config: Optional["RunnableConfig"]) -> str:
+    """Key used for fair queuing: the research run (thread) a model call belongs to"""
+    configurable = (config or {}).get("configurable", {})
+    return str(configurable.get("thread_id") or DEFAULT_REQUEST_KEY)
+
+
+def is_rate_limit_error(error: BaseException) -> bool:
+    """Whether an exception (or one it wraps) is a provider 429 / quota error"""
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        if getattr(error, "code", None) == 429 or getattr(error, "status_code", None) == 429:
+            return True
+        message = str(error)
+        if "RESOURCE_EXHAUSTED" in message or message.startswith("429"):
+            return True
+        error = error.__cause__ or error.__context__
+    return False
+
+
+class TokenBucket:
+    """Token bucket refilled at `rate_per_minute`, holding at most `burst` tokens"""
+
+    def __init__(self, rate_per_minute: float, burst: float):
+        self.rate_per_minute = rate_per_minute
+        self.burst = max(burst, 1.0)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+
+    def take(self, scale: float = 1.0) -> float:
+        """Take a token; return 0.0 on success or the seconds until one is available"""
+        if self.rate_per_minute <= 0:
+            return 0.0
+        now = time.monotonic()
+        rate = self.rate_per_minute * scale / 60.0
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * rate)
+        self.updated = now
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return 0.0
+        return (1.0 - self.tokens) / rate
+
+
+class _Waiter:
+    """A queued model call, woken from any thread once it is granted a slot"""
+
+    def __init__(self, loop: Optional[asyncio.AbstractEventLoop] = None):
+        self.enqueued = time.monotonic()
+        self.granted = False
+        self._loop = loop
+        self._future = loop.create_future() if loop else None
+        self._event = None if loop else threading.Event()
+
+    def grant(self) -> None:
+        self.granted = True
+        if self._future is not None:
+            self._loop.call_soon_threadsafe(self._resolve)
+        else:
+            self._event.set()
+
+    def _resolve(self) -> None:
+        if not self._future.done():
+            self._future.set_result(None)
+
+    def wait(self) -> None:
+        self._event.wait()
+
+    async def await_grant(self) -> None:
+        await self._future
+
+
+class _Lane:
+    """Scheduling state for one model"""
+
+    def __init__(self, rate_per_minute: float, max_in_flight: int):
+        self.max_in_flight = max_in_flight
+        self.bucket = TokenBucket(rate_per_minute, max_in_flight)
+        self.queues: "OrderedDict[str, Deque[_Waiter]]" = OrderedDict()
+        self.in_flight = 0
+        self.rate_scale = 1.0
+        self.paused_until = 0.0
+        self.timer: Optional[threading.Timer] = None
+        self.granted = 0
+        self.rate_limited = 0
+        self.wait_seconds: Deque[float] = deque(maxlen=1024)
+
+    @property
+    def queued(self) -> int:
+        return sum(len(queue) for queue in self.queues.values())
+
+
+class ModelScheduler:
+    """Shared scheduler that every model call is routed through.
+
+    Per model it enforces a token-bucket request rate and an in-flight
+    concurrency limit. Waiting calls are queued per research run and served
+    round-robin, so one large fan-out cannot starve other runs. On a 429 the
+    model's rate is halved, dispatch pauses for an exponential backoff with
+    jitter and the call is retried; successes restore the rate additively.
+    The scheduler is thread-safe and serves both sync and async callers.
+    """
+
+    def __init__(
+        self,
+        default_rate_per_minute: float = 0,
+        default_max_in_flight: int = 64,
+        limits: Optional[Dict[str, Tuple[float, int]]] = None,
+        max_attempts: int = 4,
+        base_backoff: float = 1.0,
+        max_backoff: float = 30.0,
+    ):
+        self.default_rate_per_minute = default_rate_per_minute
+        self.default_max_in_flight = default_max_in_flight
+        self.limits = dict(limits or {})
+        self.max_attempts = max_attempts
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self._lock = threading.Lock()
+        self._lanes: Dict[str, _Lane] = {}
+
+    def _lane(self, model: str) -> _Lane:
+        lane = self._lanes.get(model)
+        if lane is None:
+            rate, max_in_flight = self.limits.get(
+                model, (self.default_rate_per_minute, self.default_max_in_flight)
+            )
+            lane = self._lanes[model] = _Lane(rate, max_in_flight)
+        return lane
+
+    def _enqueue(self, model: str, request_key: str, waiter: _Waiter) -> None:
+        with self._lock:
+            lane = self._lane(model)
+            lane.queues.setdefault(request_key, deque()).append(waiter)
+            self._dispatch(model, lane)
+
+    def _dispatch(self, model: str, lane: _Lane) -> None:
+        """Grant queued calls round-robin across runs while limits allow (lock held)"""
+        while lane.queues and lane.in_flight < lane.max_in_flight:
+            delay = lane.paused_until - time.monotonic()
+            if delay <= 0:
+                delay = lane.bucket.take(lane.rate_scale)
+            if delay > 0:
+                self._schedule(model, lane, delay)
+                return
+            request_key, queue = next(iter(lane.queues.items()))
+            waiter = queue.popleft()
+            if queue:
+                lane.queues.move_to_end(request_key)
+            else:
+                del lane.queues[request_key]
+            lane.in_flight += 1
+            lane.granted += 1
+            lane.wait_seconds.append(time.monotonic() - waiter.enqueued)
+            waiter.grant()
+
+    def _schedule(self, model: str, lane: _Lane, delay: float) -> None:
+        if lane.timer is not None:
+            return
+
+        def wake():
+            with self._lock:
+                lane.timer = None
+                self._dispatch(model, lane)
+
+        lane.timer = threading.Timer(delay, wake)
+        lane.timer.daemon = True
+        lane.timer.start()
+
+    def _release(self, model: str, rate_limited: bool = False) -> None:
+        with self._lock:
+            lane = self._lane(model)
+            lane.in_flight -= 1
+            if rate_limited:
+                lane.rate_limited += 1
+                lane.rate_scale = max(lane.rate_scale / 2, 0.05)
+            else:
+                lane.rate_scale = min(lane.rate_scale + 0.05, 1.0)
+            self._dispatch(model, lane)
+
+    def _withdraw(self, model: str, request_key: str, waiter: _Waiter) -> None:
+        """Remove a cancelled waiter, releasing its slot if it was already granted"""
+        with self._lock:
+            lane = self._lane(model)
+            queue = lane.queues.get(request_key)
+            if queue and waiter in queue:
+                queue.remove(waiter)
+                if not queue:
+                    del lane.queues[request_key]
+                return
+        if waiter.granted:
+            self._release(model)
+
+    def _backoff(self, model: str, attempt: int) -> float:
+        delay = min(self.base_backoff * 2 ** attempt, self.max_backoff)
+        delay *= random.uniform(0.5, 1.0)
+        with self._lock:
+            lane = self._lane(model)
+            lane.paused_until = max(lane.paused_until, time.monotonic() + delay)
+        return delay
+
+    @contextmanager
+    def slot(self, model: str, request_key: str = DEFAULT_REQUEST_KEY):
+        """Hold one rate-limited, concurrency-limited slot for a blocking call"""
+        waiter = _Waiter()
+        self._enqueue(model, request_key, waiter)
+        waiter.wait()
+        rate_limited = False
+        try:
+            yield
+        except Exception as e:
+            rate_limited = is_rate_limit_error(e)
+            raise
+        finally:
+            self._release(model, rate_limited)
+
+    @asynccontextmanager
+    async def aslot(self, model: str, request_key: str = DEFAULT_REQUEST_KEY):
+        """Async counterpart of `slot`"""
+        waiter = _Waiter(asyncio.get_running_loop())
+        self._enqueue(model, request_key, waiter)
+        try:
+            await waiter.await_grant()
+        except BaseException:
+            self._withdraw(model, request_key, waiter)
+            raise
+        rate_limited = False
+        try:
+            yield
+        except Exception as e:
+            rate_limited = is_rate_limit_error(e)
+            raise
+        finally:
+            self._release(model, rate_limited)
+
+    def run(
+        self, model: str, request_key: str, call: Callable[[], Any]
+    ) -> Any:
+        """Run a blocking model call in a slot, retrying with backoff on 429"""
+        for attempt in range(self.max_attempts):
+            try:
+                with self.slot(model, request_key):
+                    return call()
+            except Exception as e:
+                if not is_rate_limit_error(e) or attempt == self.max_attempts - 1:
+                    raise
+                tracing.note_retry(model)
+                time.sleep(self._backoff(model, attempt))
+
+    async def arun(
+        self, model: str, request_key: str, call: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """Async counterpart of `run`"""
+        for attempt in range(self.max_attempts):
+            try:
+                async with self.aslot(model, request_key):
+                    return await call()
+            except Exception as e:
+                if not is_rate_limit_error(e) or attempt == self.max_attempts - 1:
+                    raise
+                tracing.note_retry(model)
+                await asyncio.sleep(self._backoff(model, attempt))
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth, in-flight calls, throttling and wait-time metrics per model"""
+        with self._lock:
+            stats = {}
+            for model, lane in self._lanes.items():
+                waits = sorted(lane.wait_seconds)
+                stats[model] = {
+                    "queued": lane.queued,
+                    "queued_runs": len(lane.queues),
+                    "in_flight": lane.in_flight,
+                    "max_in_flight": lane.max_in_flight,
+                    "rate_per_minute": lane.bucket.rate_per_minute * lane.rate_scale,
+                    "granted": lane.granted,
+                    "rate_limited": lane.rate_limited,
+                    "wait_p50_seconds": waits[len(waits) // 2] if waits else 0.0,
+                    "wait_p95_seconds": waits[int(len(waits) * 0.95)] if waits else 0.0,
+                    "wait_max_seconds": waits[-1] if waits else 0.0,
+                }
+            return stats
+
+
+def _limits_from_env(value: str) -> Dict[str, Tuple[float, int]]:
+    """Parse MODEL_RATE_LIMITS, e.g. "gemini-2.0-flash-exp=60:8,other=10:2" (rpm:in-flight)"""
+    limits = {}
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        model, _, spec = item.partition("=")
+        rate, _, max_in_flight = spec.partition(":")
+        limits[model.strip()] = (float(rate or 0), int(max_in_flight or 64))
+    return limits
+
+
+def _scheduler_from_env() -> ModelScheduler:
+    return ModelScheduler(
+        default_rate_per_minute=float(os.getenv("MODEL_DEFAULT_RPM", 0)),
+        default_max_in_flight=int(os.getenv("MODEL_DEFAULT_MAX_IN_FLIGHT", 64)),
+        limits=_limits_from_env(os.getenv("MODEL_RATE_LIMITS", "")),
+        max_attempts=int(os.getenv("MODEL_MAX_ATTEMPTS", 4)),
+    )
+
+
+_scheduler: Optional[ModelScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> ModelScheduler:
+    """Return the process-wide model scheduler, configured from the environment"""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = _scheduler_from_env()
+        return _scheduler
+
+
+def set_scheduler(scheduler: ModelScheduler) -> ModelScheduler:
+    """Install a custom scheduler (e.g. with different limits in benchmarks)"""
+    global _scheduler
+    with _scheduler_lock:
+        _scheduler = scheduler
+    return scheduler
@@ -0,0 +1,127 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+
+class _LeaderCancelled(Exception):
+    """The call being waited on was cancelled; followers run it themselves."""
+
+
+class SingleFlight:
+    """Coalesce concurrent calls that share a key into one in-flight call.
+
+    The first caller for a key (the leader) runs the call; callers arriving
+    while it is in flight (followers) wait for its result or exception
+    instead of issuing their own. Results are not kept once the call finishes;
+    that is the search cache's job. Works across threads and event loops, so
+    sync and async graph runs in one process share in-flight calls.
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._calls: Dict[str, Future] = {}
+        self.issued = 0
+        self.coalesced = 0
+
+    def _join(self, key: str) -> Tuple[Future, bool]:
+        """Return the in-flight future for `key` and whether the caller leads it"""
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                self.coalesced += 1
+                return future, False
+            future = self._calls[key] = Future()
+            self.issued += 1
+            return future, True
+
+    def _finish(self, key: str, future: Future) -> None:
+        with self._lock:
+            if self._calls.get(key) is future:
+                del self._calls[key]
+
+    def do(self, key: str, call: Callable[[], Any]) -> Tuple[Any, bool]:
+        """Run `call` once per in-flight key; returns (result, whether it was shared)"""
+        if not self.enabled:
+            with self._lock:
+                self.issued += 1
+            return call(), False
+        while True:
+            future, leader = self._join(key)
+            if not leader:
+                try:
+                    return future.result(), True
+                except _LeaderCancelled:
+                    continue
+            try:
+                result = call()
+            except BaseException as e:
+                future.set_exception(e if isinstance(e, Exception) else _LeaderCancelled())
+                raise
+            else:
+                future.set_result(result)
+                return result, False
+            finally:
+                self._finish(key, future)
+
+    async def ado(self, key: str, call: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """Async counterpart of `do`"""
+        if not self.enabled:
+            with self._lock:
+                self.issued += 1
+            return await call(), False
+        while True:
+            future, leader = self._join(key)
+            if not leader:
+                try:
+                    return await asyncio.shield(asyncio.wrap_future(future)), True
+                except _LeaderCancelled:
+                    continue
+            try:
+                result = await call()
+            except asyncio.CancelledError:
+                future.set_exception(_LeaderCancelled())
+                raise
+            except BaseException as e:
+                future.set_exception(e)
+                raise
+            else:
+                future.set_result(result)
+                return result, False
+            finally:
+                self._finish(key, future)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.issued + self.coalesced
+            return {
+                "issued": self.issued,
+                "coalesced": self.coalesced,
+                "in_flight": len(self._calls),
+                "coalesced_rate": self.coalesced / total if total else 0.0,
+            }
+
+
+_single_flight: Optional[SingleFlight] = None
+_single_flight_lock = threading.Lock()
+
+
+def get_single_flight() -> SingleFlight:
+    """Return the process-wide single-flight group for grounded searches"""
+    global _single_flight
+    with _single_flight_lock:
+        if _single_flight is None:
+            _single_flight = SingleFlight(
+                enabled=os.getenv("SEARCH_SINGLE_FLIGHT", "true").lower() == "true"
+            )
+        return _single_flight
+
+
+def set_single_flight(single_flight: SingleFlight) -> SingleFlight:
+    """Install a custom group (e.g. `SingleFlight(enabled=False)` in benchmarks)"""
+    global _single_flight
+    with _single_flight_lock:
+        _single_flight = single_flight
+    return single_flight
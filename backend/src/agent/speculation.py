@@ -0,0 +1,107 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Set, Tuple
+
+from src.agent.dedup import tfidf_vectors
+
+# Matched speculative searches keep running after `resolve` returns; holding a
+# reference stops them from being garbage collected before they finish
+_background: Set[asyncio.Task] = set()
+
+
+def _forget(task: asyncio.Task) -> None:
+    _background.discard(task)
+    if not task.cancelled():
+        # The branch that joined this search reports any failure itself
+        task.exception()
+
+
+class Speculation:
+    """Follow-up searches started in the background while reflection runs.
+
+    `start` first asks `predict` for likely follow-up queries and then starts a
+    search for each. Searches go through the normal cache and single-flight
+    path, so once reflection returns, a `web_research` branch for a matching
+    follow-up is served from the cache or joins the speculative call still in
+    flight. `resolve` rewrites matching follow-ups to the speculative query
+    text, cancels the rest, and reports the hit rate and the head start gained.
+    """
+
+    def __init__(self):
+        self.started: Dict[str, float] = {}
+        self.finished: Dict[str, float] = {}
+        self.tasks: Dict[str, asyncio.Task] = {}
+        self._predictor: asyncio.Task = None
+
+    @classmethod
+    def start(
+        cls,
+        predict: Callable[[], Awaitable[List[str]]],
+        search: Callable[[str], Awaitable[Any]],
+    ) -> "Speculation":
+        speculation = cls()
+        speculation._predictor = asyncio.ensure_future(speculation._run(predict, search))
+        return speculation
+
+    async def _run(self, predict, search) -> None:
+        for query in dict.fromkeys(await predict()):
+            self.started[query] = time.perf_counter()
+            task = asyncio.ensure_future(search(query))
+            task.add_done_callback(
+                lambda _, query=query: self.finished.setdefault(query, time.perf_counter())
+            )
+            self.tasks[query] = task
+
+    def _match(self, follow_ups: List[str], threshold: float) -> Dict[int, str]:
+        """Map follow-up positions to the speculative query each one reuses"""
+        candidates = [
+            query for query, task in self.tasks.items()
+            if not (task.done() and (task.cancelled() or task.exception()))
+        ]
+        if not follow_ups or not candidates:
+            return {}
+        vectors = tfidf_vectors(follow_ups + candidates)
+        similarity = vectors[:len(follow_ups)] @ vectors[len(follow_ups):].T
+        matches: Dict[int, str] = {}
+        for i in range(len(follow_ups)):
+            j = int(similarity[i].argmax())
+            if similarity[i, j] >= threshold and candidates[j] not in matches.values():
+                matches[i] = candidates[j]
+        return matches
+
+    async def resolve(
+        self, follow_ups: List[str], threshold: float
+    ) -> Tuple[List[str], Dict[str, Any]]:
+        """Reuse speculative searches matching `follow_ups` and cancel the rest.
+
+        Returns:
+            Tuple of (follow-ups with matches rewritten to the speculative query,
+            speculation statistics for this loop)
+        """
+        now = time.perf_counter()
+        if not self._predictor.done():
+            self._predictor.cancel()
+        matches = self._match(follow_ups, threshold)
+        reused = set(matches.values())
+
+        saved = 0.0
+        cancelled = []
+        for query, task in self.tasks.items():
+            if query in reused:
+                # Branches run in parallel, so the loop gains the longest head start
+                saved = max(saved, self.finished.get(query, now) - self.started[query])
+                if not task.done():
+                    _background.add(task)
+                    task.add_done_callback(_forget)
+            else:
+                task.cancel()
+                cancelled.append(task)
+        await asyncio.gather(self._predictor, *cancelled, return_exceptions=True)
+
+        rewritten = [matches.get(i, query) for i, query in enumerate(follow_ups)]
+        return rewritten, {
+            "predicted": len(self.tasks),
+            "matched": len(matches),
+            "hit_rate": len(matches) / len(follow_ups) if follow_ups else 0.0,
+            "saved_seconds": saved,
+        }
@@ -1,8 +1,10 @@
 from typing import Annotated, TypedDict, List, Dict, Any, Optional, Union
 from langgraph.graph.message import add_messages
-from langchain_core.messages import BaseMessage
+from langchain_core.messages import BaseMessage, HumanMessage
 import operator
 
+from src.agent.budget import new_budget
+
 
 def add_sources(existing: List[Dict[str, Any]], new: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     """Safely combine source lists from parallel operations"""
@@ -31,13 +33,36 @@ def add_results(existing: List[str], new: List[str]) -> List[str]:
     return existing + new
 
 
+def merge_stats(existing: Dict[str, Any], new: Dict[str, Any]) -> Dict[str, Any]:
+    """Merge per-node run statistics: numbers are summed, lists are concatenated"""
+    if not existing:
+        return dict(new or {})
+    if not new:
+        return existing
+    merged = dict(existing)
+    for key, value in new.items():
+        current = merged.get(key)
+        if isinstance(value, (int, float)) and isinstance(current, (int, float)) \
+                and not isinstance(value, bool):
+            merged[key] = current + value
+        elif isinstance(value, list) and isinstance(current, list):
+            merged[key] = current + value
+        else:
+            merged[key] = value
+    return merged
+
+
 class QueryGenerationState(TypedDict):
     search_query: List[str]
+    # Routing functions only see the keys of their state type
+    budget: Optional[Dict[str, Any]]
 
 
 class WebSearchState(TypedDict):
     search_query: str
     id: int
+    fan_out: Optional[Dict[str, Any]]
+    budget: Optional[Dict[str, Any]]
 
 
 class ReflectionState(TypedDict):
@@ -46,6 +71,9 @@ class ReflectionState(TypedDict):
     follow_up_queries: List[str]
     research_loop_count: int
     number_of_ran_queries: int
+    stop_reason: Optional[str]
+    budget: Optional[Dict[str, Any]]
+    run_stats: Annotated[Dict[str, Any], merge_stats]
 
 
 class OverallState(TypedDict):
@@ -56,4 +84,34 @@ class OverallState(TypedDict):
     research_loop_count: int
     initial_search_query_count: Optional[int]
     max_research_loops: Optional[int]
-    reasoning_model: Optional[str]
\ No newline at end of file
+    reasoning_model: Optional[str]
+    run_stats: Annotated[Dict[str, Any], merge_stats]
+    research_digest: str
+    digested_result_count: int
+    reflected_result_count: int
+    reflected_source_count: int
+    late_searches: Annotated[List[str], operator.add]
+    folded_late_searches: Annotated[List[str], operator.add]
+    budget: Optional[Dict[str, Any]]
+    budget_usage: Optional[Dict[str, Any]]
+
+
+def initial_state(
+    query: str,
+    max_research_loops: Optional[int],
+    initial_search_query_count: Optional[int],
+    deadline_ms: Optional[int] = None,
+    max_tokens: Optional[int] = None,
+) -> Dict[str, Any]:
+    """Initial graph state for one research question, with its budget if it has one"""
+    return {
+        "messages": [HumanMessage(content=query)],
+        "search_query": [],
+        "sources_gathered": [],
+        "web_research_result": [],
+        "research_loop_count": 0,
+        "initial_search_query_count": initial_search_query_count,
+        "max_research_loops": max_research_loops,
+        "run_stats": {},
+        "budget": new_budget(deadline_ms, max_tokens),
+    }
@@ -0,0 +1,549 @@
+"""Spans for graph nodes, model calls and page fetches, plus Prometheus metrics.
+
+Every span records its duration into a histogram, so `/metrics` always covers
+all traffic. Spans themselves are only handed to the configured hooks (e.g.
+OpenTelemetry) for a sampled fraction of traces. The sampling decision is
+made once at the root span, a research run or a node run outside one, and is
+inherited by every span below it.
+"""
+
+import asyncio
+import contextvars
+import functools
+import inspect
+import json
+import logging
+import os
+import random
+import threading
+import time
+from bisect import bisect_left
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+try:
+    from opentelemetry import context as otel_context
+    from opentelemetry import trace as otel_trace
+except ImportError:
+    otel_context = otel_trace = None
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _label_text(names: Sequence[str], values: Sequence[Any], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    """Monotonic counter with a fixed set of label names"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple, float] = {}
+
+    def inc(self, labels: Tuple = (), amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def value(self, labels: Tuple = ()) -> float:
+        with self._lock:
+            return self._values.get(labels, 0.0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}{_label_text(self.labelnames, k)} {v:g}" for k, v in values]
+
+
+class Histogram:
+    """Cumulative-bucket histogram with a fixed set of label names"""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        # Per label set: [per-bucket counts (last one is +Inf), sum, count]
+        self._series: Dict[Tuple, list] = {}
+
+    def observe(self, labels: Tuple, value: float) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def count(self, labels: Tuple = ()) -> int:
+        with self._lock:
+            series = self._series.get(labels)
+            return series[2] if series else 0
+
+    def render(self) -> List[str]:
+        with self._lock:
+            series = sorted((k, ([*v[0]], v[1], v[2])) for k, v in self._series.items())
+        lines = []
+        for labels, (counts, total, count) in series:
+            cumulative = 0
+            for bound, n in zip((*self.buckets, "+Inf"), counts):
+                cumulative += n
+                le = f'le="{bound if bound == "+Inf" else f"{bound:g}"}"'
+                lines.append(
+                    f"{self.name}_bucket{_label_text(self.labelnames, labels, le)} {cumulative}"
+                )
+            lines.append(f"{self.name}_sum{_label_text(self.labelnames, labels)} {total:g}")
+            lines.append(f"{self.name}_count{_label_text(self.labelnames, labels)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Named counters and histograms rendered in the Prometheus text format"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics: Dict[str, Any] = {}
+
+    def _add(self, metric):
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._add(Counter(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._add(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+METRICS = MetricsRegistry()
+
+RUN_SECONDS = METRICS.histogram(
+    "research_run_duration_seconds", "Wall time of research runs", ("endpoint",),
+    buckets=(1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0, 300.0),
+)
+NODE_SECONDS = METRICS.histogram(
+    "research_node_duration_seconds", "Wall time of graph node runs", ("node",)
+)
+MODEL_SECONDS = METRICS.histogram(
+    "research_model_call_duration_seconds",
+    "Wall time of model calls, including scheduler queueing and retries",
+    ("model", "kind"),
+)
+MODEL_TOKENS = METRICS.counter(
+    "research_model_tokens_total",
+    "Tokens reported in model response metadata",
+    ("model", "direction"),
+)
+MODEL_CHARS = METRICS.counter(
+    "research_model_chars_total",
+    "Characters sent to and received from models",
+    ("model", "direction"),
+)
+MODEL_RETRIES = METRICS.counter(
+    "research_model_retries_total", "Model calls retried after a rate limit", ("model",)
+)
+SEARCH_CACHE = METRICS.counter(
+    "research_search_cache_total", "Grounded search lookups by outcome", ("result",)
+)
+WEB_SEARCH_SECONDS = METRICS.histogram(
+    "research_web_search_duration_seconds",
+    "Wall time of Custom Search calls, page fetches included",
+)
+PAGE_FETCH_SECONDS = METRICS.histogram(
+    "research_page_fetch_duration_seconds",
+    "Wall time of page fetches by where the text came from",
+    ("source",),
+)
+SPAN_ERRORS = METRICS.counter(
+    "research_span_errors_total", "Spans that ended with an exception", ("span",)
+)
+
+
+def render_metrics() -> str:
+    """All metrics in the Prometheus text exposition format"""
+    return METRICS.render()
+
+
+class Span:
+    """One timed operation, used as a context manager.
+
+    `attributes` also supply the labels of the span's histogram. The span is
+    the current one, and the parent of spans opened inside it, while entered.
+    """
+
+    __slots__ = (
+        "name", "attributes", "sampled", "parent", "start", "end", "error",
+        "hook_state", "_tracer", "_histogram", "_token",
+    )
+
+    def __init__(
+        self,
+        tracer: "Tracer",
+        name: str,
+        histogram: Optional["Histogram"],
+        attributes: Dict[str, Any],
+    ):
+        self.name = name
+        self.attributes = attributes
+        self.sampled = False
+        self.parent: Optional[Span] = None
+        self.start = 0.0
+        self.end: Optional[float] = None
+        self.error: Optional[str] = None
+        self.hook_state: Dict[int, Any] = {}
+        self._tracer = tracer
+        self._histogram = histogram
+        self._token = None
+
+    def __enter__(self) -> "Span":
+        tracer = self._tracer
+        parent = self.parent = _current.get()
+        if parent is not None:
+            self.sampled = parent.sampled
+        else:
+            self.sampled = tracer.sample_rate > 0 and random.random() < tracer.sample_rate
+            tracer.started += 1
+            tracer.sampled += self.sampled
+        self._token = _current.set(self)
+        if self.sampled:
+            for hook in tracer.hooks:
+                hook.on_start(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.end = time.perf_counter()
+        if exc_type is not None:
+            if issubclass(exc_type, (asyncio.CancelledError, GeneratorExit)):
+                self.attributes["cancelled"] = True
+            else:
+                self.error = exc_type.__name__
+                SPAN_ERRORS.inc((self.name,))
+        try:
+            _current.reset(self._token)
+        except ValueError:
+            # Closed from another context, e.g. an abandoned async generator
+            pass
+        histogram = self._histogram
+        if histogram is not None:
+            histogram.observe(
+                tuple(str(self.attributes.get(label, "")) for label in histogram.labelnames),
+                self.end - self.start,
+            )
+        if self.sampled:
+            for hook in reversed(self._tracer.hooks):
+                try:
+                    hook.on_end(self)
+                except Exception as e:
+                    logger.warning(f"Span hook {type(hook).__name__} failed: {e}")
+
+    @property
+    def duration(self) -> float:
+        return (self.end or time.perf_counter()) - self.start
+
+    def set(self, **attributes: Any) -> None:
+        self.attributes.update(attributes)
+
+    def add(self, key: str, amount: float = 1) -> None:
+        self.attributes[key] = self.attributes.get(key, 0) + amount
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "parent": self.parent.name if self.parent is not None else None,
+            "duration_ms": round(self.duration * 1000, 3),
+            "error": self.error,
+            "attributes": self.attributes,
+        }
+
+
+class _NoopSpan:
+    """Stands in for a span while tracing is disabled"""
+
+    sampled = False
+    attributes: Dict[str, Any] = {}
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        pass
+
+    def set(self, **attributes: Any) -> None:
+        pass
+
+    def add(self, key: str, amount: float = 1) -> None:
+        pass
+
+
+_NOOP = _NoopSpan()
+_current: contextvars.ContextVar = contextvars.ContextVar("research_span", default=None)
+
+
+class SpanHook:
+    """Receives sampled spans as they start and end"""
+
+    def on_start(self, span: Span) -> None:
+        pass
+
+    def on_end(self, span: Span) -> None:
+        pass
+
+
+class LogHook(SpanHook):
+    """Logs every finished sampled span as one JSON line"""
+
+    def on_end(self, span: Span) -> None:
+        logger.info("span %s", json.dumps(span.to_dict(), default=str))
+
+
+class OpenTelemetryHook(SpanHook):
+    """Mirrors spans onto an OpenTelemetry tracer, nesting them under the active OTel span.
+
+    Only `opentelemetry-api` is needed; spans go wherever the SDK configured by
+    the application exports them, and are dropped by the API's no-op tracer
+    when no SDK is installed.
+    """
+
+    def __init__(self, tracer=None):
+        if otel_trace is None:
+            raise ImportError("opentelemetry-api is not installed")
+        self.tracer = tracer or otel_trace.get_tracer("deep-research-agent")
+
+    def on_start(self, span: Span) -> None:
+        otel_span = self.tracer.start_span(span.name)
+        token = otel_context.attach(otel_trace.set_span_in_context(otel_span))
+        span.hook_state[id(self)] = (otel_span, token)
+
+    def on_end(self, span: Span) -> None:
+        otel_span, token = span.hook_state.pop(id(self))
+        for key, value in span.attributes.items():
+            if isinstance(value, (str, bool, int, float)):
+                otel_span.set_attribute(key, value)
+        if span.error:
+            otel_span.set_status(otel_trace.Status(otel_trace.StatusCode.ERROR, span.error))
+        otel_span.end()
+        try:
+            otel_context.detach(token)
+        except Exception:
+            pass
+
+
+class Tracer:
+    """Creates spans, samples whole traces and feeds span durations into histograms"""
+
+    def __init__(self, sample_rate: float = 0.05, hooks: Sequence[SpanHook] = (), enabled: bool = True):
+        self.sample_rate = sample_rate
+        self.hooks = list(hooks)
+        self.enabled = enabled
+        self.started = 0
+        self.sampled = 0
+
+    def span(self, name: str, histogram: Optional[Histogram] = None, **attributes: Any):
+        """A span to enter around a block; `histogram` gets its duration, labelled from `attributes`"""
+        if not self.enabled:
+            return _NOOP
+        return Span(self, name, histogram, attributes)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "sample_rate": self.sample_rate,
+            "hooks": [type(hook).__name__ for hook in self.hooks],
+            "traces_started": self.started,
+            "traces_sampled": self.sampled,
+        }
+
+
+def _hooks_from_env(value: str) -> List[SpanHook]:
+    hooks = []
+    for name in filter(None, (part.strip().lower() for part in value.split(","))):
+        if name == "log":
+            hooks.append(LogHook())
+        elif name == "otel":
+            try:
+                hooks.append(OpenTelemetryHook())
+            except ImportError as e:
+                logger.warning(f"TRACE_EXPORTERS=otel ignored: {e}")
+        else:
+            raise ValueError(f"Unknown trace exporter {name!r}; expected otel or log")
+    return hooks
+
+
+def tracer_from_env() -> Tracer:
+    """Build the tracer configured by TRACING_ENABLED, TRACE_SAMPLE_RATE and TRACE_EXPORTERS"""
+    return Tracer(
+        sample_rate=float(os.getenv("TRACE_SAMPLE_RATE", 0.05)),
+        hooks=_hooks_from_env(os.getenv("TRACE_EXPORTERS", "")),
+        enabled=os.getenv("TRACING_ENABLED", "true").lower() == "true",
+    )
+
+
+_tracer: Optional[Tracer] = None
+_tracer_lock = threading.Lock()
+
+
+def get_tracer() -> Tracer:
+    """Return the process-wide tracer, configured from the environment"""
+    global _tracer
+    # Called for every span, so skip the lock once the tracer exists
+    tracer = _tracer
+    if tracer is not None:
+        return tracer
+    with _tracer_lock:
+        if _tracer is None:
+            _tracer = tracer_from_env()
+        return _tracer
+
+
+def set_tracer(tracer: Tracer) -> Tracer:
+    """Replace the process-wide tracer (e.g. to add a hook in tests or benchmarks)"""
+    global _tracer
+    with _tracer_lock:
+        _tracer = tracer
+    return tracer
+
+
+def span(name: str, histogram: Optional[Histogram] = None, **attributes: Any):
+    """Span on the process-wide tracer; see `Tracer.span`"""
+    return get_tracer().span(name, histogram, **attributes)
+
+
+def current_span():
+    """The innermost open span, or a no-op span outside of one"""
+    return _current.get() or _NOOP
+
+
+def node(name: str, func: Callable) -> Callable:
+    """Wrap a sync or async graph node so each run is a span timed per node.
+
+    The wrapper keeps the node's signature, so LangGraph still passes `config`.
+    """
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def traced(*args, **kwargs):
+            with span(name, NODE_SECONDS, node=name):
+                return await func(*args, **kwargs)
+    else:
+        @functools.wraps(func)
+        def traced(*args, **kwargs):
+            with span(name, NODE_SECONDS, node=name):
+                return func(*args, **kwargs)
+    return traced
+
+
+def text_size(value: Any) -> int:
+    """Characters in a prompt or response: text, messages, chunks or a parsed schema"""
+    if value is None:
+        return 0
+    if isinstance(value, str):
+        return len(value)
+    if isinstance(value, (list, tuple)):
+        return sum(text_size(item) for item in value)
+    content = getattr(value, "content", None)
+    if content is not None:
+        return text_size(content) if not isinstance(content, list) else sum(
+            len(part.get("text", "")) if isinstance(part, dict) else text_size(part)
+            for part in content
+        )
+    text = getattr(value, "text", None)
+    if isinstance(text, str):
+        return len(text)
+    if hasattr(value, "model_dump_json"):
+        return len(value.model_dump_json())
+    return 0
+
+
+def token_usage(response: Any) -> Tuple[int, int]:
+    """(input, output) tokens from LangChain or google-genai response metadata"""
+    if isinstance(response, (list, tuple)):
+        # Streamed chunks each report their share of the usage
+        usages = [token_usage(chunk) for chunk in response]
+        return sum(u[0] for u in usages), sum(u[1] for u in usages)
+    usage = getattr(response, "usage_metadata", None)
+    if not usage:
+        return 0, 0
+    if isinstance(usage, dict):
+        return usage.get("input_tokens") or 0, usage.get("output_tokens") or 0
+    return (
+        getattr(usage, "prompt_token_count", 0) or 0,
+        getattr(usage, "candidates_token_count", 0) or 0,
+    )
+
+
+def model_span(model: str, kind: str, prompt: Any):
+    """Span around one model call; finish it with `record_response`"""
+    tracer = get_tracer()
+    if not tracer.enabled:
+        return tracer.span("model_call")
+    prompt_chars = text_size(prompt)
+    MODEL_CHARS.inc((model, "prompt"), prompt_chars)
+    return span("model_call", MODEL_SECONDS, model=model, kind=kind, prompt_chars=prompt_chars)
+
+
+def record_response(call_span: Any, model: str, response: Any) -> None:
+    """Add the response size and token usage of a model call to its span and counters"""
+    if call_span is _NOOP:
+        return
+    response_chars = text_size(response)
+    input_tokens, output_tokens = token_usage(response)
+    MODEL_CHARS.inc((model, "response"), response_chars)
+    if input_tokens or output_tokens:
+        MODEL_TOKENS.inc((model, "input"), input_tokens)
+        MODEL_TOKENS.inc((model, "output"), output_tokens)
+        call_span.add("input_tokens", input_tokens)
+        call_span.add("output_tokens", output_tokens)
+    call_span.add("response_chars", response_chars)
+
+
+def note_retry(model: str) -> None:
+    """Count a rate-limit retry against the current model call"""
+    MODEL_RETRIES.inc((model,))
+    current_span().add("retries")
+
+
+def note_search_cache(result: str) -> None:
+    """Count a grounded search lookup served as `hit`, `coalesced` or `miss`"""
+    SEARCH_CACHE.inc((result,))
+    current_span().set(search_cache=result)
@@ -0,0 +1,606 @@
+"""Pluggable model transports: live, record, replay and synthetic.
+
+The client registry builds its chat models and its genai client through a
+pair of factories; a transport swaps those factories. The modes are:
+
+- live: the real Gemini clients
+- record: the real clients, with every call written to a cassette
+- replay: responses served from a cassette, with the recorded latency
+  scaled by a factor
+- synthetic: generated grounded responses of a configurable size, with
+  latencies drawn from a distribution
+
+A cassette is gzip-compressed JSON Lines. Each line holds one call: its
+kind, model, schema, prompt hash, latency and response. Grounded searches
+are stored in the reduced form produced by `extract_grounding`, so a
+cassette stays small and never holds API keys or headers. Replay serves the
+entry with the same prompt hash when there is one. Otherwise it cycles
+through the recorded responses of the same kind and schema, so a cassette
+recorded on one set of questions can drive load for any other.
+"""
+
+import asyncio
+import atexit
+import gzip
+import hashlib
+import json
+import math
+import os
+import random
+import re
+import threading
+import time
+import zlib
+from collections import Counter, defaultdict
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from src.agent.tools_and_schemas import Reflection, SearchQueryList
+from src.agent.utils import extract_grounding
+
+MODES = ("live", "record", "replay", "synthetic")
+
+
+def _prompt_text(prompt: Any) -> str:
+    if isinstance(prompt, str):
+        return prompt
+    if isinstance(prompt, list):
+        return "\n".join(_prompt_text(item) for item in prompt)
+    return str(getattr(prompt, "content", prompt))
+
+
+def prompt_key(kind: str, model: str, prompt: Any, schema: Optional[str] = None) -> str:
+    text = f"{kind}\0{model}\0{schema or ''}\0{_prompt_text(prompt)}"
+    return hashlib.sha256(text.encode()).hexdigest()[:16]
+
+
+def _search_response(grounding: Dict[str, Any]):
+    """Rebuild a response object that `extract_grounding` reads like a real one"""
+    # Chunk positions matter: supports point at them by index
+    chunks = [None] * (max((chunk["index"] for chunk in grounding["chunks"]), default=-1) + 1)
+    for chunk in grounding["chunks"]:
+        chunks[chunk["index"]] = SimpleNamespace(
+            web=SimpleNamespace(uri=chunk["uri"], title=chunk["title"])
+        )
+    supports = [
+        SimpleNamespace(
+            segment=SimpleNamespace(
+                start_index=support["start_index"], end_index=support["end_index"]
+            ),
+            grounding_chunk_indices=support["chunk_indices"],
+        )
+        for support in grounding.get("supports", [])
+    ]
+    metadata = (
+        SimpleNamespace(grounding_chunks=chunks, grounding_supports=supports)
+        if grounding["grounded"] else None
+    )
+    return SimpleNamespace(
+        text=grounding["text"],
+        candidates=[SimpleNamespace(grounding_metadata=metadata)],
+    )
+
+
+def _sentence_spans(text: str) -> List[Tuple[int, int]]:
+    """UTF-8 byte (start, end) offsets of each sentence in `text`"""
+    return [
+        (match.start(), match.end())
+        for match in re.finditer(rb"[^\s.!?][^.!?]*[.!?]", text.encode("utf-8"))
+    ]
+
+
+def _read_lines(path: str) -> Tuple[List[str], bool]:
+    """Complete lines of a cassette file, and whether it was cut short.
+
+    A process killed while recording leaves a final gzip member without its
+    end-of-stream marker; the lines written before it are still readable.
+    """
+    lines = []
+    try:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                if line.endswith("\n"):
+                    lines.append(line)
+    except (EOFError, zlib.error):
+        return lines, True
+    return lines, False
+
+
+class Cassette:
+    """Recorded model calls, appended to and loaded from a gzip JSON Lines file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = None
+        self._entries: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        self._by_kind: Dict[Tuple[str, Optional[str]], List[Dict[str, Any]]] = defaultdict(list)
+        self._cursor: Counter = Counter()
+        self.exact = 0
+        self.fallback = 0
+        self.recorded = 0
+
+    @classmethod
+    def load(cls, path: str) -> "Cassette":
+        cassette = cls(path)
+        lines, _ = _read_lines(path)
+        for line in lines:
+            if line.strip():
+                cassette._index(json.loads(line))
+        if not cassette._by_kind:
+            raise ValueError(f"Cassette {path} is empty")
+        return cassette
+
+    def __len__(self) -> int:
+        return sum(len(entries) for entries in self._by_kind.values())
+
+    def _index(self, entry: Dict[str, Any]) -> None:
+        self._entries[entry["key"]].append(entry)
+        self._by_kind[(entry["kind"], entry.get("schema"))].append(entry)
+
+    def record(self, kind: str, model: str, prompt: Any, latency: float, response: Any,
+               schema: Optional[str] = None, **extra: Any) -> None:
+        entry = {
+            "kind": kind,
+            "model": model,
+            "schema": schema,
+            "key": prompt_key(kind, model, prompt, schema),
+            "latency": round(latency, 4),
+            "response": response,
+            **extra,
+        }
+        line = json.dumps(entry, separators=(",", ":")) + "\n"
+        with self._lock:
+            if self._file is None:
+                self._repair()
+                # Appending adds a gzip member; readers see one continuous stream
+                self._file = gzip.open(self.path, "at", encoding="utf-8")
+                atexit.register(self.close)
+            self._file.write(line)
+            self._file.flush()
+            self._index(entry)
+            self.recorded += 1
+
+    def lookup(self, kind: str, model: str, prompt: Any, schema: Optional[str] = None):
+        """The recorded entry for this call, or the next one of the same kind"""
+        key = prompt_key(kind, model, prompt, schema)
+        with self._lock:
+            entries = self._entries.get(key)
+            if not entries:
+                entries = self._by_kind.get((kind, schema))
+                if not entries:
+                    raise LookupError(f"Cassette {self.path} has no {kind} calls for {schema}")
+                key = (kind, schema)
+                self.fallback += 1
+            else:
+                self.exact += 1
+            entry = entries[self._cursor[key] % len(entries)]
+            self._cursor[key] += 1
+            return entry
+
+    def _repair(self) -> None:
+        """Rewrite a cassette cut short by a killed recorder, so appends stay readable"""
+        if not os.path.exists(self.path):
+            return
+        lines, truncated = _read_lines(self.path)
+        if truncated:
+            with gzip.open(self.path + ".tmp", "wt", encoding="utf-8") as f:
+                f.writelines(lines)
+            os.replace(self.path + ".tmp", self.path)
+
+    def close(self) -> None:
+        """Write the gzip end-of-stream marker; also runs at interpreter exit"""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+                atexit.unregister(self.close)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self),
+                "recorded": self.recorded,
+                "replayed_exact": self.exact,
+                "replayed_fallback": self.fallback,
+            }
+
+
+def parse_latency(spec: str, rng: random.Random) -> Callable[[], float]:
+    """Latency sampler from "fixed:S", "uniform:A:B", "lognormal:MEDIAN:SIGMA" or "pareto:SCALE:ALPHA"."""
+    name, *args = spec.split(":")
+    values = [float(a) for a in args]
+    if name == "fixed":
+        return lambda: values[0]
+    if name == "uniform":
+        return lambda: rng.uniform(values[0], values[1])
+    if name == "lognormal":
+        return lambda: rng.lognormvariate(math.log(values[0]), values[1])
+    if name == "pareto":
+        return lambda: values[0] * rng.paretovariate(values[1])
+    raise ValueError(f"Unknown latency distribution {spec!r}")
+
+
+_WORDS = (
+    "analysis adoption benchmark capacity cost data deployment efficiency energy "
+    "evidence growth impact industry market method model network outcome policy "
+    "research result risk scale security standard study survey system trend usage"
+).split()
+
+
+class Synthetic:
+    """Fake grounded responses of a configurable size and latency distribution."""
+
+    def __init__(
+        self,
+        latency: str = "lognormal:0.8:0.5",
+        search_latency: Optional[str] = None,
+        search_chars: int = 3000,
+        sources: int = 5,
+        answer_chars: int = 1500,
+        follow_ups: int = 2,
+        seed: int = 0,
+    ):
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._latency = parse_latency(latency, self._rng)
+        self._search_latency = parse_latency(search_latency or latency, self._rng)
+        self.search_chars = search_chars
+        self.sources = sources
+        self.answer_chars = answer_chars
+        self.follow_ups = follow_ups
+
+    def latency(self, kind: str) -> float:
+        with self._lock:
+            return max(0.0, (self._search_latency if kind == "search" else self._latency)())
+
+    def _text(self, seed: str, chars: int) -> str:
+        rng = random.Random(seed)
+        sentences, size = [], 0
+        while size < chars:
+            sentence = " ".join(rng.choice(_WORDS) for _ in range(12)).capitalize() + "."
+            sentences.append(sentence)
+            size += len(sentence) + 1
+        return " ".join(sentences)
+
+    def search(self, prompt: Any) -> Dict[str, Any]:
+        text = _prompt_text(prompt)
+        query = text.split("Research Query:", 1)[-1].strip().splitlines()[0] if text else ""
+        slug = re.sub(r"[^a-z0-9]+", "-", query.lower()).strip("-")[:40] or "query"
+        body = self._text(text, self.search_chars)
+        return {
+            "text": body,
+            "grounded": True,
+            "chunks": [
+                {
+                    "index": i,
+                    "uri": f"https://synthetic.example/{slug}/{i}",
+                    "title": f"{query} ({i})",
+                }
+                for i in range(self.sources)
+            ],
+            # Each sentence is supported by one source, round-robin, the way
+            # Gemini reports supports: UTF-8 byte offsets of the cited span
+            "supports": [
+                {"start_index": start, "end_index": end, "chunk_indices": [k % self.sources]}
+                for k, (start, end) in enumerate(_sentence_spans(body))
+            ] if self.sources else [],
+        }
+
+    def structured(self, schema, prompt: Any) -> Dict[str, Any]:
+        text = _prompt_text(prompt)
+        topic = re.search(r"Research (?:Topic|Question): (.*)", text)
+        topic = topic.group(1).strip() if topic else "the topic"
+        if schema is SearchQueryList:
+            count = re.search(r"(?:generate|predict the) (\d+)", text)
+            count = int(count.group(1)) if count else 3
+            return {"query": [f"{self._text(f'{text}{i}', 1)[:40]} {topic}" for i in range(count)]}
+        if schema is Reflection:
+            return {
+                "is_sufficient": False,
+                "knowledge_gap": "Synthetic knowledge gap.",
+                "follow_up_queries": [
+                    f"{self._text(f'{text}{i}', 1)[:40]} {topic}" for i in range(self.follow_ups)
+                ],
+            }
+        raise TypeError(f"Synthetic transport cannot produce {schema!r}")
+
+    def answer(self, prompt: Any) -> str:
+        text = _prompt_text(prompt)
+        citations = " ".join(re.findall(r"\[\d+-\d+\]", text)[:5])
+        return f"{self._text(text, self.answer_chars)} {citations}".strip()
+
+
+def truncate_output(text: str, kwargs: Dict[str, Any]) -> str:
+    """Cut a stand-in response to a `generation_config.max_output_tokens` cap (4 chars a token)"""
+    limit = (kwargs.get("generation_config") or {}).get("max_output_tokens")
+    return text[: limit * 4] if limit else text
+
+
+def _chunks(text: str) -> List[str]:
+    return re.findall(r"\S+\s*", text) or [text]
+
+
+class TransportChatModel(BaseChatModel):
+    """Chat model answered from a cassette (replay) or generated (synthetic).
+
+    It is a real chat model, so callbacks and `astream_events` see the same
+    start/stream/end events as they would for Gemini.
+    """
+
+    model: str
+    temperature: float = 0.0
+    cassette: Optional[Any] = None
+    synthetic: Optional[Any] = None
+    latency_scale: float = 1.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "replay" if self.cassette is not None else "synthetic"
+
+    def respond(self, kind: str, prompt: Any, schema=None) -> Tuple[Any, float]:
+        """Response and latency for one call"""
+        name = schema.__name__ if schema else None
+        if self.cassette is not None:
+            entry = self.cassette.lookup(kind, self.model, prompt, name)
+            return entry["response"], entry["latency"] * self.latency_scale
+        latency = self.synthetic.latency(kind)
+        if kind == "structured":
+            return self.synthetic.structured(schema, prompt), latency
+        return self.synthetic.answer(prompt), latency
+
+    def with_structured_output(self, schema, **kwargs):
+        return _TransportStructured(self, schema)
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        content, latency = self.respond("chat", messages)
+        content = truncate_output(content, kwargs)
+        time.sleep(latency)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=content))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        content, latency = self.respond("chat", messages)
+        content = truncate_output(content, kwargs)
+        await asyncio.sleep(latency)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=content))])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        content, latency = self.respond("chat", messages)
+        content = truncate_output(content, kwargs)
+        time.sleep(latency)
+        for token in _chunks(content):
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        content, latency = self.respond("chat", messages)
+        content = truncate_output(content, kwargs)
+        await asyncio.sleep(latency)
+        for token in _chunks(content):
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                await run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+
+
+class _TransportStructured:
+    def __init__(self, llm: TransportChatModel, schema):
+        self.llm = llm
+        self.schema = schema
+
+    def invoke(self, prompt, config=None, **kwargs):
+        response, latency = self.llm.respond("structured", prompt, self.schema)
+        time.sleep(latency)
+        return self.schema.model_validate(response)
+
+    async def ainvoke(self, prompt, config=None, **kwargs):
+        response, latency = self.llm.respond("structured", prompt, self.schema)
+        await asyncio.sleep(latency)
+        return self.schema.model_validate(response)
+
+
+class RecordingChatModel(BaseChatModel):
+    """Wraps a live chat model and writes every call to a cassette."""
+
+    inner: Any
+    model: str
+    cassette: Any
+
+    @property
+    def _llm_type(self) -> str:
+        return f"recording-{self.inner._llm_type}"
+
+    def with_structured_output(self, schema, **kwargs):
+        return _RecordingStructured(self, self.inner.with_structured_output(schema, **kwargs), schema)
+
+    def _record(self, messages, started: float, content: str) -> None:
+        self.cassette.record("chat", self.model, messages, time.perf_counter() - started, content)
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        started = time.perf_counter()
+        result = self.inner._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+        self._record(messages, started, result.generations[0].message.content)
+        return result
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        started = time.perf_counter()
+        result = await self.inner._agenerate(messages, stop=stop, run_manager=run_manager, **kwargs)
+        self._record(messages, started, result.generations[0].message.content)
+        return result
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        started, parts = time.perf_counter(), []
+        for chunk in self.inner._stream(messages, stop=stop, run_manager=run_manager, **kwargs):
+            parts.append(chunk.message.content)
+            yield chunk
+        self._record(messages, started, _joined(parts))
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        started, parts = time.perf_counter(), []
+        async for chunk in self.inner._astream(messages, stop=stop, run_manager=run_manager, **kwargs):
+            parts.append(chunk.message.content)
+            yield chunk
+        self._record(messages, started, _joined(parts))
+
+
+def _joined(parts) -> str:
+    return "".join(part if isinstance(part, str) else json.dumps(part) for part in parts)
+
+
+class _RecordingStructured:
+    def __init__(self, llm: RecordingChatModel, inner, schema):
+        self.llm = llm
+        self.inner = inner
+        self.schema = schema
+
+    def _record(self, prompt, started: float, result) -> None:
+        self.llm.cassette.record(
+            "structured", self.llm.model, prompt, time.perf_counter() - started,
+            result.model_dump(), schema=self.schema.__name__,
+        )
+
+    def invoke(self, prompt, config=None, **kwargs):
+        started = time.perf_counter()
+        result = self.inner.invoke(prompt, config, **kwargs)
+        self._record(prompt, started, result)
+        return result
+
+    async def ainvoke(self, prompt, config=None, **kwargs):
+        started = time.perf_counter()
+        result = await self.inner.ainvoke(prompt, config, **kwargs)
+        self._record(prompt, started, result)
+        return result
+
+
+class _SearchModels:
+    """`client.models` / `client.aio.models` for a transport genai client"""
+
+    def __init__(self, respond, record=None, inner=None):
+        self._respond = respond
+        self._record = record
+        self._inner = inner
+
+    def generate_content(self, model, contents, config=None):
+        if self._inner is None:
+            grounding, latency = self._respond(model, contents)
+            time.sleep(latency)
+            return _search_response(grounding)
+        started = time.perf_counter()
+        response = self._inner.generate_content(model=model, contents=contents, config=config)
+        self._record(model, contents, started, response)
+        return response
+
+
+class _AsyncSearchModels(_SearchModels):
+    async def generate_content(self, model, contents, config=None):
+        if self._inner is None:
+            grounding, latency = self._respond(model, contents)
+            await asyncio.sleep(latency)
+            return _search_response(grounding)
+        started = time.perf_counter()
+        response = await self._inner.generate_content(model=model, contents=contents, config=config)
+        self._record(model, contents, started, response)
+        return response
+
+
+class TransportGenaiClient:
+    """Stand-in for `google.genai.Client` serving grounded searches from a
+    cassette or synthesizing them, or recording the calls of a live client."""
+
+    def __init__(self, cassette=None, synthetic=None, latency_scale: float = 1.0, inner=None):
+        self.cassette = cassette
+        self.synthetic = synthetic
+        self.latency_scale = latency_scale
+        record = self._record if inner is not None else None
+        self.models = _SearchModels(self._respond, record, inner.models if inner else None)
+        self.aio = SimpleNamespace(
+            models=_AsyncSearchModels(self._respond, record, inner.aio.models if inner else None)
+        )
+
+    def _respond(self, model: str, contents: Any) -> Tuple[Dict[str, Any], float]:
+        if self.cassette is not None:
+            entry = self.cassette.lookup("search", model, contents)
+            return entry["response"], entry["latency"] * self.latency_scale
+        return self.synthetic.search(contents), self.synthetic.latency("search")
+
+    def _record(self, model: str, contents: Any, started: float, response) -> None:
+        self.cassette.record(
+            "search", model, contents, time.perf_counter() - started, extract_grounding(response)
+        )
+
+
+def transport_factories(
+    mode: str,
+    cassette_path: Optional[str] = None,
+    latency_scale: float = 1.0,
+    synthetic: Optional[Synthetic] = None,
+    chat_model_factory: Optional[Callable[[str, float], Any]] = None,
+    genai_client_factory: Optional[Callable[[], Any]] = None,
+) -> Tuple[Optional[Callable], Optional[Callable]]:
+    """(chat_model_factory, genai_client_factory) for a `ClientRegistry` in `mode`.
+
+    In record mode the given factories (by default the live Gemini ones) are
+    wrapped; live mode returns them unchanged.
+    """
+    if mode not in MODES:
+        raise ValueError(f"Unknown model transport {mode!r}, expected one of {MODES}")
+    if mode == "live":
+        return chat_model_factory, genai_client_factory
+    if mode == "synthetic":
+        synthetic = synthetic or Synthetic()
+        return (
+            lambda model, temperature: TransportChatModel(
+                model=model, temperature=temperature, synthetic=synthetic
+            ),
+            lambda: TransportGenaiClient(synthetic=synthetic),
+        )
+    if not cassette_path:
+        raise ValueError(f"Model transport {mode!r} needs a cassette path")
+    if mode == "replay":
+        cassette = Cassette.load(cassette_path)
+        return (
+            lambda model, temperature: TransportChatModel(
+                model=model, temperature=temperature,
+                cassette=cassette, latency_scale=latency_scale,
+            ),
+            lambda: TransportGenaiClient(cassette=cassette, latency_scale=latency_scale),
+        )
+
+    from src.agent.clients import _default_chat_model_factory, _default_genai_client_factory
+
+    cassette = Cassette(cassette_path)
+    chat_model_factory = chat_model_factory or _default_chat_model_factory
+    genai_client_factory = genai_client_factory or _default_genai_client_factory
+    return (
+        lambda model, temperature: RecordingChatModel(
+            inner=chat_model_factory(model, temperature), model=model, cassette=cassette
+        ),
+        lambda: TransportGenaiClient(cassette=cassette, inner=genai_client_factory()),
+    )
+
+
+def transport_factories_from_env() -> Tuple[Optional[Callable], Optional[Callable]]:
+    """Factories for the transport configured by MODEL_TRANSPORT and related variables"""
+    mode = os.getenv("MODEL_TRANSPORT", "live").lower()
+    synthetic = None
+    if mode == "synthetic":
+        synthetic = Synthetic(
+            latency=os.getenv("SYNTHETIC_LATENCY", "lognormal:0.8:0.5"),
+            search_latency=os.getenv("SYNTHETIC_SEARCH_LATENCY") or None,
+            search_chars=int(os.getenv("SYNTHETIC_SEARCH_CHARS", 3000)),
+            sources=int(os.getenv("SYNTHETIC_SOURCES", 5)),
+            answer_chars=int(os.getenv("SYNTHETIC_ANSWER_CHARS", 1500)),
+            seed=int(os.getenv("SYNTHETIC_SEED", 0)),
+        )
+    return transport_factories(
+        mode,
+        cassette_path=os.getenv("MODEL_CASSETTE", "model_cassette.jsonl.gz"),
+        latency_scale=float(os.getenv("MODEL_REPLAY_LATENCY_SCALE", 1.0)),
+        synthetic=synthetic,
+    )
@@ -1,7 +1,5 @@
 import re
-from typing import List, Dict, Any
-from urllib.parse import urlparse
-import hashlib
+from typing import List, Dict, Any, Tuple
 
 
 def get_research_topic(messages: List[Any]) -> str:
@@ -16,82 +14,208 @@ def get_research_topic(messages: List[Any]) -> str:
     return ""
 
 
-def get_citations(response, resolved_urls: Dict[str, str]) -> List[Dict[str, Any]]:
-    """Extract citations from Gemini response with grounding metadata"""
+def extract_grounding(response) -> Dict[str, Any]:
+    """Reduce a grounded Gemini response to plain, cacheable data.
+
+    `chunks` are the web sources the answer was grounded on. `supports` are the
+    spans of the answer text that cite them: Gemini reports each span's UTF-8
+    byte offsets on `grounding_supports[].segment`, with
+    `grounding_chunk_indices` pointing into `grounding_chunks`. The result does
+    not depend on the query id, so it can be shared between branches and
+    re-labelled with `citations_from_grounding`.
+    """
+    chunks = []
+    supports = []
+    grounded = False
+    if (response.candidates and
+        hasattr(response.candidates[0], 'grounding_metadata') and
+        response.candidates[0].grounding_metadata and
+        hasattr(response.candidates[0].grounding_metadata, 'grounding_chunks')):
+        grounded = True
+        metadata = response.candidates[0].grounding_metadata
+        for i, chunk in enumerate(metadata.grounding_chunks or []):
+            if hasattr(chunk, 'web') and chunk.web:
+                chunks.append({
+                    "index": i,
+                    "uri": chunk.web.uri,
+                    "title": getattr(chunk.web, 'title', chunk.web.uri),
+                })
+        for support in getattr(metadata, 'grounding_supports', None) or []:
+            segment = getattr(support, 'segment', None)
+            indices = getattr(support, 'grounding_chunk_indices', None)
+            if segment is None or not indices:
+                continue
+            supports.append({
+                "start_index": getattr(segment, 'start_index', None) or 0,
+                "end_index": getattr(segment, 'end_index', None) or 0,
+                "chunk_indices": list(indices),
+            })
+
+    return {
+        "text": response.text or "",
+        "grounded": grounded,
+        "chunks": chunks,
+        "supports": supports,
+    }
+
+
+def citations_from_grounding(grounding: Dict[str, Any], query_id: int) -> List[Dict[str, Any]]:
+    """Build one citation per grounding support, with `[query_id-n]` short urls for its sources"""
+    sources = {chunk["index"]: chunk for chunk in grounding["chunks"]}
+    resolved_urls = {
+        chunk["uri"]: f"[{query_id}-{chunk['index']}]" for chunk in grounding["chunks"]
+    }
     citations = []
-    
-    # Check if response has grounding metadata
-    if hasattr(response, 'candidates') and response.candidates:
-        candidate = response.candidates[0]
-        if hasattr(candidate, 'grounding_metadata') and candidate.grounding_metadata:
-            grounding_chunks = candidate.grounding_metadata.grounding_chunks
-            
-            for chunk in grounding_chunks:
-                if hasattr(chunk, 'web') and chunk.web:
-                    url = chunk.web.uri
-                    title = getattr(chunk.web, 'title', url)
-                    
-                    # Create short URL for citation
-                    short_url = resolved_urls.get(url, create_short_url(url))
-                    
-                    citations.append({
-                        "segments": [{
-                            "value": url,
-                            "short_url": short_url,
-                            "title": title
-                        }],
-                        "start_index": getattr(chunk, 'start_index', 0),
-                        "end_index": getattr(chunk, 'end_index', 0)
-                    })
-    
+    for support in grounding.get("supports", []):
+        segments = [
+            {
+                "value": sources[index]["uri"],
+                "short_url": resolved_urls[sources[index]["uri"]],
+                "title": sources[index]["title"],
+            }
+            for index in support["chunk_indices"]
+            if index in sources
+        ]
+        if segments:
+            citations.append({
+                "segments": segments,
+                "start_index": support["start_index"],
+                "end_index": support["end_index"],
+            })
     return citations
 
 
-def create_short_url(url: str) -> str:
-    """Create a short URL identifier for citations"""
-    parsed = urlparse(url)
-    domain = parsed.netloc.replace('www.', '')
-    
-    # Create a short hash
-    url_hash = hashlib.md5(url.encode()).hexdigest()[:6]
-    
-    return f"[{domain}-{url_hash}]"
+def byte_to_char_offsets(text: str, offsets: List[int]) -> Dict[int, int]:
+    """Map UTF-8 byte offsets (as reported by Gemini) to character offsets in `text`.
 
+    Offsets that fall inside a multi-byte character snap to its start.
+    """
+    if text.isascii():
+        return {offset: offset for offset in offsets}
 
-def resolve_urls(grounding_chunks, query_id: int) -> Dict[str, str]:
-    """Resolve URLs to short identifiers for token efficiency"""
-    resolved = {}
-    
-    for i, chunk in enumerate(grounding_chunks):
-        if hasattr(chunk, 'web') and chunk.web:
-            url = chunk.web.uri
-            short_id = f"[{query_id}-{i}]"
-            resolved[url] = short_id
-    
-    return resolved
+    encoded = text.encode("utf-8")
+    mapping = {}
+    byte_pos = char_pos = 0
+    for offset in sorted(set(offsets)):
+        target = min(max(offset, 0), len(encoded))
+        # Snap back to the first byte of the character containing the offset
+        while 0 < target < len(encoded) and (encoded[target] & 0xC0) == 0x80:
+            target -= 1
+        if target > byte_pos:
+            char_pos += len(encoded[byte_pos:target].decode("utf-8"))
+            byte_pos = target
+        mapping[offset] = char_pos if offset <= len(encoded) else len(text)
+    return mapping
 
 
-def insert_citation_markers(text: str, citations: List[Dict[str, Any]]) -> str:
-    """Insert citation markers into text"""
+def insert_citation_markers(
+    text: str, citations: List[Dict[str, Any]], offsets_in_bytes: bool = True
+) -> str:
+    """Insert citation markers into text in a single pass.
+
+    Each citation's short urls go right after the span it supports, at its
+    `end_index`. Offsets are sorted once and the text is rebuilt by joining
+    segments, so the cost is linear in the text length. Citations sharing an
+    offset are grouped into one marker. Gemini reports offsets in UTF-8 bytes,
+    which are converted to character offsets unless `offsets_in_bytes` is False.
+    """
     if not citations:
         return text
-    
-    # Sort citations by start index in reverse order to maintain positions
-    sorted_citations = sorted(citations, key=lambda x: x.get('start_index', 0), reverse=True)
-    
-    modified_text = text
-    for citation in sorted_citations:
-        if citation.get('segments'):
-            segment = citation['segments'][0]
-            short_url = segment.get('short_url', '')
-            start_idx = citation.get('start_index', 0)
-            
-            # Insert citation marker
-            if short_url and start_idx < len(modified_text):
-                modified_text = (
-                    modified_text[:start_idx] + 
-                    f" {short_url}" + 
-                    modified_text[start_idx:]
-                )
-    
-    return modified_text
\ No newline at end of file
+
+    # Group the short urls of all citations by their insertion offset
+    markers: Dict[int, List[str]] = {}
+    for citation in citations:
+        short_urls = [
+            segment['short_url']
+            for segment in citation.get('segments') or []
+            if segment.get('short_url')
+        ]
+        if short_urls:
+            markers.setdefault(citation.get('end_index', 0), []).extend(short_urls)
+    if not markers:
+        return text
+
+    if offsets_in_bytes:
+        char_offsets = byte_to_char_offsets(text, list(markers))
+        grouped: Dict[int, List[str]] = {}
+        for offset, short_urls in markers.items():
+            grouped.setdefault(char_offsets[offset], []).extend(short_urls)
+        markers = grouped
+
+    parts = []
+    previous = 0
+    for offset in sorted(markers):
+        if offset > len(text):
+            break
+        parts.append(text[previous:offset])
+        parts.append(" " + " ".join(dict.fromkeys(markers[offset])))
+        previous = offset
+    parts.append(text[previous:])
+    return "".join(parts)
+
+
+class ShortUrlRewriter:
+    """Rewrite short url markers to real urls incrementally as answer chunks arrive.
+
+    All markers are replaced in a single regex pass backed by a dictionary of
+    short url -> source. A chunk tail that could be the start of a marker is held
+    back until the next chunk, so markers split across chunk boundaries are still
+    rewritten. Sources are recorded as used in the same pass.
+    """
+
+    def __init__(self, sources: List[Dict[str, Any]]):
+        self._sources: Dict[str, Dict[str, Any]] = {}
+        for source in sources:
+            self._sources.setdefault(source["short_url"], source)
+        self._order = list(self._sources)
+        markers = sorted(self._sources, key=len, reverse=True)
+        self._pattern = re.compile("|".join(map(re.escape, markers))) if markers else None
+        self._prefixes = {marker[:i] for marker in markers for i in range(1, len(marker))}
+        self._max_prefix = max((len(marker) - 1 for marker in markers), default=0)
+        self._pending = ""
+        self._used = set()
+
+    def _replace(self, match) -> str:
+        marker = match.group(0)
+        self._used.add(marker)
+        return self._sources[marker]["value"]
+
+    def _rewrite(self, text: str) -> str:
+        return self._pattern.sub(self._replace, text) if self._pattern else text
+
+    def feed(self, chunk: str) -> str:
+        """Add a chunk and return the rewritten text that is safe to emit"""
+        text = self._pending + chunk
+        hold = 0
+        for length in range(min(self._max_prefix, len(text)), 0, -1):
+            if text[-length:] in self._prefixes:
+                hold = length
+                break
+        emit_upto = len(text) - hold
+        # Never cut through a complete marker that ends inside the held tail
+        if self._pattern and hold:
+            for match in self._pattern.finditer(text, max(0, emit_upto - self._max_prefix)):
+                if match.start() < emit_upto < match.end():
+                    emit_upto = match.start()
+                    break
+        self._pending = text[emit_upto:]
+        return self._rewrite(text[:emit_upto])
+
+    def flush(self) -> str:
+        """Return whatever is still held back once the stream has ended"""
+        text, self._pending = self._pending, ""
+        return self._rewrite(text)
+
+    @property
+    def used_sources(self) -> List[Dict[str, Any]]:
+        """Sources whose short url appeared in the text, in their original order"""
+        return [self._sources[marker] for marker in self._order if marker in self._used]
+
+
+def rewrite_short_urls(
+    text: str, sources: List[Dict[str, Any]]
+) -> Tuple[str, List[Dict[str, Any]]]:
+    """Replace short urls in a complete text, returning the text and the used sources"""
+    rewriter = ShortUrlRewriter(sources)
+    text = rewriter.feed(text) + rewriter.flush()
+    return text, rewriter.used_sources
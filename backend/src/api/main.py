@@ -1,15 +1,89 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
-from pydantic import BaseModel
-from typing import List, Dict, Any, Optional
+from pydantic import BaseModel, Field, ValidationError
+from typing import List, Dict, Any, Optional, AsyncIterator, Union
+from contextlib import AsyncExitStack, asynccontextmanager
+from uuid import uuid4
+import asyncio
+import json
 import os
 from pathlib import Path
-from langchain_core.messages import HumanMessage
 
-from src.agent.graph import graph
+from src.agent.batch import (
+    DEFAULT_CONCURRENCY,
+    parse_item,
+    parse_jsonl,
+    run_batch,
+)
+from src.agent.cache import get_search_cache
+from src.agent.checkpoint import (
+    checkpoint_retention_seconds,
+    list_runs,
+    open_checkpointer,
+    prune_runs,
+    run_status,
+    thread_config,
+)
+from src.agent.clients import get_registry
+from src.agent.jobs import QueueFull, job_queue_from_env
+from src.agent.runtime import load_env, warm_up
+from src.agent.scheduler import get_scheduler
+from src.agent.singleflight import get_single_flight
+from src.agent import tracing
+
+
+async def _warm_up(resources: AsyncExitStack):
+    """Build the graph and model clients off the event loop, then the checkpointed graph.
+
+    Returns the graph requests use and the seconds each warm-up step took.
+    """
+    seconds = await asyncio.to_thread(warm_up)
+    if os.getenv("CHECKPOINT_ENABLED", "true").lower() != "true":
+        from src.agent.graph import get_graph
+
+        return get_graph(), seconds
+    from src.agent.graph import build_graph
+
+    # Compile a checkpointed graph so interrupted runs can be resumed
+    checkpointer = await resources.enter_async_context(open_checkpointer())
+    pruning = asyncio.create_task(_prune_checkpoints(checkpointer))
+    resources.callback(pruning.cancel)
+    return build_graph(checkpointer), seconds
 
-app = FastAPI(title="Deep Research Agent", version="1.0.0")
+
+async def _prune_checkpoints(checkpointer, interval: float = 3600):
+    """Delete runs idle for longer than CHECKPOINT_RETENTION_SECONDS, at startup and hourly"""
+    while True:
+        await prune_runs(checkpointer, checkpoint_retention_seconds())
+        await asyncio.sleep(interval)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start warming up the graph in the background, and start the job workers.
+
+    Startup does not wait for the warm-up, so the server answers `/health` at
+    once; `/ready` reports when it can serve research requests, which wait
+    for the warm-up until then.
+    """
+    load_env()
+    async with AsyncExitStack() as resources:
+        app.state.warm_up = asyncio.create_task(_warm_up(resources))
+        try:
+            async with AsyncExitStack() as workers:
+                if os.getenv("JOBS_ENABLED", "true").lower() == "true":
+                    app.state.jobs = job_queue_from_env(_run_job)
+                    await app.state.jobs.start()
+                    workers.push_async_callback(app.state.jobs.stop)
+                yield
+        finally:
+            app.state.warm_up.cancel()
+            await asyncio.gather(app.state.warm_up, return_exceptions=True)
+
+
+app = FastAPI(title="Deep Research Agent", version="1.0.0", lifespan=lifespan)
 
 # Enable CORS
 app.add_middleware(
@@ -25,6 +99,13 @@ class ResearchRequest(BaseModel):
     query: str
     max_research_loops: Optional[int] = 2
     initial_search_query_count: Optional[int] = 3
+    # Reusing the thread_id of an interrupted run resumes it from its last
+    # completed step; reusing a completed one returns its stored result
+    thread_id: Optional[str] = None
+    # Budgets for the whole run: fan-out narrows as they run down, and research
+    # stops early so the answer is written within them
+    deadline_ms: Optional[int] = Field(default=None, gt=0)
+    max_tokens: Optional[int] = Field(default=None, gt=0)
 
 
 class ResearchResponse(BaseModel):
@@ -32,6 +113,34 @@ class ResearchResponse(BaseModel):
     sources: List[Dict[str, Any]]
     iterations: int
     status: str = "completed"
+    stats: Dict[str, Any] = {}
+    thread_id: Optional[str] = None
+    # Share of deadline_ms and max_tokens used, when the request set them
+    budget: Optional[Dict[str, Any]] = None
+
+
+async def _graph():
+    """The graph built by the startup warm-up, waiting for it if needed.
+
+    Without the app lifespan (e.g. an ASGI client that skips it) the plain
+    graph is compiled on first use instead.
+    """
+    warming = getattr(app.state, "warm_up", None)
+    if warming is None:
+        from src.agent.graph import get_graph
+
+        return await asyncio.to_thread(get_graph)
+    graph, _ = await asyncio.shield(warming)
+    return graph
+
+
+def _run_stats(final_state: Dict[str, Any]) -> Dict[str, Any]:
+    """Per-run statistics from the final graph state, with derived rates"""
+    stats = dict(final_state.get("run_stats") or {})
+    lookups = stats.get("search_cache_hits", 0) + stats.get("search_cache_misses", 0)
+    if lookups:
+        stats["search_cache_hit_rate"] = stats.get("search_cache_hits", 0) / lookups
+    return stats
 
 
 @app.get("/")
@@ -41,55 +150,415 @@ async def root():
 
 @app.get("/health")
 async def health_check():
+    """Liveness: the process is up and serving, whether or not it has warmed up"""
     return {"status": "healthy"}
 
 
+@app.get("/ready")
+async def readiness_check():
+    """Readiness: 200 once the graph and model clients are built, 503 until then or on failure"""
+    warming = getattr(app.state, "warm_up", None)
+    if warming is None:
+        return JSONResponse(status_code=503, content={"status": "not_started"})
+    if not warming.done():
+        return JSONResponse(status_code=503, content={"status": "starting"})
+    if warming.cancelled() or warming.exception() is not None:
+        error = "cancelled" if warming.cancelled() else repr(warming.exception())
+        return JSONResponse(status_code=503, content={"status": "failed", "error": error})
+    _, seconds = warming.result()
+    return {"status": "ready", "warm_up_seconds": seconds}
+
+
+def _initial_state(request: ResearchRequest) -> Dict[str, Any]:
+    """Build the initial graph state for a research request"""
+    from src.agent.state import initial_state
+
+    return initial_state(
+        request.query,
+        request.max_research_loops,
+        request.initial_search_query_count,
+        request.deadline_ms,
+        request.max_tokens,
+    )
+
+
+def _research_config(
+    request: ResearchRequest, thread_id: Optional[str] = None
+) -> Dict[str, Any]:
+    """Configure the research parameters for a research request"""
+    return {
+        "configurable": {
+            "max_research_loops": request.max_research_loops,
+            "number_of_initial_queries": request.initial_search_query_count,
+            "thread_id": thread_id or request.thread_id or str(uuid4()),
+        }
+    }
+
+
+async def _research_input(graph, request: ResearchRequest, config: Dict[str, Any]):
+    """Graph input for a request: a fresh state, or None to resume a checkpointed run.
+
+    Returns a (input, completed_state) pair; completed_state is set when the
+    thread already finished and its stored result should be returned as is.
+    """
+    if graph.checkpointer is not None:
+        snapshot = await graph.aget_state(config)
+        if snapshot.values:
+            return None, (None if snapshot.next else snapshot.values)
+    return _initial_state(request), None
+
+
+def _research_response(
+    final_state: Dict[str, Any], thread_id: Optional[str] = None
+) -> ResearchResponse:
+    """Convert the final graph state into the API response"""
+    # Extract the final answer from messages
+    answer = ""
+    if final_state.get("messages"):
+        last_message = final_state["messages"][-1]
+        if hasattr(last_message, 'content'):
+            answer = last_message.content
+
+    return ResearchResponse(
+        answer=answer,
+        sources=final_state.get("sources_gathered", []),
+        iterations=final_state.get("research_loop_count", 0),
+        status="completed",
+        stats=_run_stats(final_state),
+        thread_id=thread_id,
+        budget=final_state.get("budget_usage"),
+    )
+
+
+async def _run_research(
+    request: ResearchRequest, thread_id: Optional[str] = None, endpoint: str = "research"
+) -> ResearchResponse:
+    """Run (or resume, or look up) the research for a request, traced as one span"""
+    graph = await _graph()
+    config = _research_config(request, thread_id)
+    with tracing.span(
+        "research",
+        tracing.RUN_SECONDS,
+        endpoint=endpoint,
+        thread_id=config["configurable"]["thread_id"],
+    ):
+        graph_input, final_state = await _research_input(graph, request, config)
+        if final_state is None:
+            # Run the research agent (or resume it from its last checkpoint)
+            final_state = await graph.ainvoke(graph_input, config)
+    return _research_response(final_state, config["configurable"]["thread_id"])
+
+
 @app.post("/research", response_model=ResearchResponse)
 async def conduct_research(request: ResearchRequest):
     """
     Conduct comprehensive research on a given query using the LangGraph agent
     """
     try:
-        # Prepare the initial state
-        initial_state = {
-            "messages": [HumanMessage(content=request.query)],
-            "search_query": [],
-            "sources_gathered": [],
-            "web_research_result": [],
-            "research_loop_count": 0,
-            "initial_search_query_count": request.initial_search_query_count,
-            "max_research_loops": request.max_research_loops,
-        }
-        
-        # Configure the research parameters
-        config = {
-            "configurable": {
-                "max_research_loops": request.max_research_loops,
-                "number_of_initial_queries": request.initial_search_query_count,
-            }
+        return await _run_research(request)
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Research failed: {str(e)}")
+
+
+class BatchItem(ResearchRequest):
+    # Echoed in the item's result line, and its thread_id unless one is given,
+    # so the item can be resumed by sending it again
+    id: Optional[str] = None
+
+
+class BatchResearchRequest(BaseModel):
+    # Plain strings use the batch-level research parameters below
+    queries: List[Union[str, BatchItem]]
+    concurrency: Optional[int] = None
+    max_research_loops: Optional[int] = 2
+    initial_search_query_count: Optional[int] = 3
+    deadline_ms: Optional[int] = Field(default=None, gt=0)
+    max_tokens: Optional[int] = Field(default=None, gt=0)
+
+
+def _batch_items(batch: BatchResearchRequest) -> List[Dict[str, Any]]:
+    return [
+        {
+            "query": item,
+            "max_research_loops": batch.max_research_loops,
+            "initial_search_query_count": batch.initial_search_query_count,
+            "deadline_ms": batch.deadline_ms,
+            "max_tokens": batch.max_tokens,
         }
-        
-        # Run the research agent
-        final_state = await graph.ainvoke(initial_state, config)
-        
-        # Extract the final answer from messages
-        answer = ""
-        if final_state.get("messages"):
-            last_message = final_state["messages"][-1]
-            if hasattr(last_message, 'content'):
-                answer = last_message.content
-        
-        # Format sources
-        sources = final_state.get("sources_gathered", [])
-        iterations = final_state.get("research_loop_count", 0)
-        
-        return ResearchResponse(
-            answer=answer,
-            sources=sources,
-            iterations=iterations,
-            status="completed"
+        if isinstance(item, str)
+        else item.model_dump(exclude_none=True)
+        for item in batch.queries
+    ]
+
+
+async def _research_item(item: Dict[str, Any]) -> Dict[str, Any]:
+    """Run one batch item like `/research` does, returning the response fields"""
+    request = BatchItem(**parse_item(item))
+    response = await _run_research(request, request.thread_id or request.id, "batch")
+    return response.model_dump()
+
+
+async def _batch_lines(items: List[Dict[str, Any]], concurrency: int) -> AsyncIterator[str]:
+    async for record in run_batch(items, _research_item, concurrency):
+        yield json.dumps(record, default=str) + "\n"
+
+
+@app.post("/research/batch")
+async def research_batch(request: Request, concurrency: Optional[int] = None):
+    """
+    Research many queries in one call, streaming one NDJSON result per query as each completes
+
+    The body is either a JSON `BatchResearchRequest` or NDJSON with one query
+    string or `BatchItem` object per line. A failed query is reported in its
+    own result line and does not stop the rest of the batch.
+    """
+    body = (await request.body()).decode()
+    try:
+        if "ndjson" in request.headers.get("content-type", "") or \
+                "jsonl" in request.headers.get("content-type", ""):
+            items = parse_jsonl(body.splitlines())
+        else:
+            batch = BatchResearchRequest.model_validate_json(body)
+            items = _batch_items(batch)
+            concurrency = concurrency or batch.concurrency
+    except (ValueError, ValidationError) as e:
+        raise HTTPException(status_code=422, detail=f"Invalid batch: {e}")
+    if not items:
+        raise HTTPException(status_code=422, detail="Invalid batch: no queries")
+
+    return StreamingResponse(
+        _batch_lines(items, concurrency or DEFAULT_CONCURRENCY),
+        media_type="application/x-ndjson",
+    )
+
+
+def _jobs():
+    jobs = getattr(app.state, "jobs", None)
+    if jobs is None:
+        raise HTTPException(status_code=503, detail="Job queue is not running")
+    return jobs
+
+
+async def _run_job(job_id: str, request: Dict[str, Any]) -> Dict[str, Any]:
+    """Run a queued job; the job id doubles as the checkpoint thread id, so a
+    job interrupted by a restart resumes from its last completed step"""
+    research_request = ResearchRequest(**request)
+    response = await _run_research(
+        research_request, research_request.thread_id or job_id, endpoint="job"
+    )
+    return response.model_dump()
+
+
+def _job_status(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Public view of a job: its status and timings, with the result once completed"""
+    return {
+        "job_id": job["job_id"],
+        "query": job["request"].get("query"),
+        "status": job["status"],
+        "created_at": job["created_at"],
+        "started_at": job["started_at"],
+        "finished_at": job["finished_at"],
+        "result": job["result"],
+        "error": job["error"],
+    }
+
+
+@app.post("/jobs", status_code=202)
+async def submit_job(request: ResearchRequest):
+    """
+    Queue a research run and return its job id right away; poll `/jobs/{job_id}`
+    or follow `/jobs/{job_id}/events` for the result
+    """
+    jobs = _jobs()
+    try:
+        return await jobs.submit(request.model_dump(exclude_none=True))
+    except QueueFull as e:
+        return JSONResponse(
+            status_code=429,
+            content={"detail": f"Job queue is full: {e}"},
+            headers={"Retry-After": str(jobs.retry_after())},
         )
-        
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Get the status of a queued research job, with its result once completed"""
+    job = await _jobs().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return _job_status(job)
+
+
+async def _job_events(jobs, job_id: str) -> AsyncIterator[str]:
+    status = None
+    while True:
+        changed = jobs.changed(job_id)
+        try:
+            job = await jobs.get(job_id)
+            if job is None:
+                # Pruned while the stream was open
+                yield _sse("error", {"status_code": 404, "detail": f"Job {job_id} not found"})
+                return
+            if job["status"] != status:
+                status = job["status"]
+                yield _sse("status", {"job_id": job_id, "status": status})
+            if status == "completed":
+                yield _sse("complete", job["result"])
+                return
+            if status == "failed":
+                yield _sse("error", {"detail": f"Research failed: {job['error']}"})
+                return
+            try:
+                await asyncio.wait_for(changed.wait(), timeout=15)
+            except asyncio.TimeoutError:
+                # Keep proxies from closing an idle connection
+                yield ": keepalive\n\n"
+        finally:
+            jobs.forget(job_id, changed)
+
+
+@app.get("/jobs/{job_id}/events")
+async def stream_job(job_id: str):
+    """
+    Follow a research job as Server-Sent Events: `status` on every change, then
+    `complete` with the `/research` payload or `error` (with a `status_code` of
+    404 if the job is pruned while the stream is open)
+    """
+    jobs = _jobs()
+    if await jobs.get(job_id) is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return StreamingResponse(
+        _job_events(jobs, job_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+_GRAPH_NODES = {"generate_query", "web_research", "reflection", "finalize_answer"}
+
+
+def _sse(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+def _node_event(event: Dict[str, Any]) -> Optional[str]:
+    """Name of the graph node an event belongs to, if it is the node run itself"""
+    node = event.get("metadata", {}).get("langgraph_node")
+    if node not in _GRAPH_NODES or event["name"] != node:
+        return None
+    if not any(tag.startswith("graph:step:") for tag in event.get("tags", [])):
+        return None
+    return node
+
+
+async def _research_events(request: ResearchRequest) -> AsyncIterator[str]:
+    """Run the graph and translate its event stream into Server-Sent Events"""
+    config = _research_config(request)
+    thread_id = config["configurable"]["thread_id"]
+    yield _sse("start", {"query": request.query, "thread_id": thread_id})
+    with tracing.span("research", tracing.RUN_SECONDS, endpoint="stream", thread_id=thread_id):
+        try:
+            graph = await _graph()
+            graph_input, final_state = await _research_input(graph, request, config)
+            if final_state is not None:
+                yield _sse("complete", _research_response(final_state, thread_id).model_dump())
+                return
+
+            async for event in graph.astream_events(graph_input, config, version="v2"):
+                kind = event["event"]
+                node = _node_event(event)
+
+                if kind == "on_chain_start" and node:
+                    data = {"node": node}
+                    if node == "web_research":
+                        data["query"] = event["data"]["input"].get("search_query")
+                    yield _sse("node_start", data)
+
+                elif kind == "on_chain_end" and node:
+                    output = event["data"].get("output") or {}
+                    yield _sse("node_end", {"node": node})
+                    if node == "generate_query":
+                        yield _sse("queries", {"queries": output.get("search_query", [])})
+                    elif node == "web_research":
+                        yield _sse("search_result", {
+                            "query": output.get("search_query", [None])[0],
+                            "result": output.get("web_research_result", [""])[0],
+                            "sources": output.get("sources_gathered", []),
+                            # Released by quorum mode; folded into a later step
+                            "late": bool(output.get("late_searches")),
+                        })
+                    elif node == "reflection":
+                        yield _sse("reflection", {
+                            "is_sufficient": output.get("is_sufficient"),
+                            "knowledge_gap": output.get("knowledge_gap"),
+                            "follow_up_queries": output.get("follow_up_queries", []),
+                            "stop_reason": output.get("stop_reason"),
+                            "information_gain": output.get("run_stats", {}).get(
+                                "information_gain", []
+                            ),
+                        })
+
+                elif kind == "on_custom_event" and event["name"] == "answer_chunk":
+                    # Answer text with short urls already rewritten to real urls
+                    yield _sse("answer_token", {"token": event["data"]["text"]})
+
+                elif kind == "on_chain_end" and not event.get("parent_ids"):
+                    response = _research_response(event["data"]["output"], thread_id)
+                    yield _sse("complete", response.model_dump())
+
+        except Exception as e:
+            yield _sse("error", {"detail": f"Research failed: {str(e)}"})
+
+
+@app.post("/research/stream")
+async def stream_research(request: ResearchRequest):
+    """
+    Conduct research and stream per-node progress and answer tokens as Server-Sent Events
+    """
+    return StreamingResponse(
+        _research_events(request),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.get("/runs")
+async def get_runs(limit: int = 50):
+    """List checkpointed research runs, newest first"""
+    graph = await _graph()
+    if graph.checkpointer is None:
+        raise HTTPException(status_code=404, detail="Checkpointing is disabled")
+    return {"runs": await list_runs(graph, limit)}
+
+
+@app.get("/runs/{thread_id}")
+async def get_run(thread_id: str):
+    """Get the status of a research run, including its result once completed"""
+    graph = await _graph()
+    status = await run_status(graph, thread_id) if graph.checkpointer else None
+    if status is None:
+        raise HTTPException(status_code=404, detail=f"Run {thread_id} not found")
+    if status["status"] == "completed":
+        snapshot = await graph.aget_state(thread_config(thread_id))
+        status["result"] = _research_response(snapshot.values, thread_id)
+    return status
+
+
+@app.post("/runs/{thread_id}/resume", response_model=ResearchResponse)
+async def resume_run(thread_id: str):
+    """Resume an interrupted research run from its last completed step"""
+    graph = await _graph()
+    status = await run_status(graph, thread_id) if graph.checkpointer else None
+    if status is None:
+        raise HTTPException(status_code=404, detail=f"Run {thread_id} not found")
+    try:
+        config = thread_config(thread_id)
+        if status["status"] == "interrupted":
+            final_state = await graph.ainvoke(None, config)
+        else:
+            final_state = (await graph.aget_state(config)).values
+        return _research_response(final_state, thread_id)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Research failed: {str(e)}")
 
@@ -110,6 +579,25 @@ async def get_config():
     }
 
 
+@app.get("/stats")
+async def get_stats():
+    """Get runtime statistics for shared resources"""
+    return {
+        "clients": get_registry().stats(),
+        "search_cache": get_search_cache().stats(),
+        "scheduler": get_scheduler().stats(),
+        "single_flight": get_single_flight().stats(),
+        "jobs": await app.state.jobs.stats() if getattr(app.state, "jobs", None) else None,
+        "tracing": tracing.get_tracer().stats(),
+    }
+
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics: run, node and model call latency histograms and counters"""
+    return PlainTextResponse(tracing.render_metrics(), media_type=tracing.CONTENT_TYPE)
+
+
 @app.post("/test")
 async def test_agent():
     """Test basic agent functionality with a simple query"""
@@ -122,26 +610,13 @@ async def test_agent():
         )
         
         # Use the same logic as the main research endpoint
-        initial_state = {
-            "messages": [HumanMessage(content=test_request.query)],
-            "search_query": [],
-            "sources_gathered": [],
-            "web_research_result": [],
-            "research_loop_count": 0,
-            "initial_search_query_count": test_request.initial_search_query_count,
-            "max_research_loops": test_request.max_research_loops,
-        }
-        
-        config = {
-            "configurable": {
-                "max_research_loops": test_request.max_research_loops,
-                "number_of_initial_queries": test_request.initial_search_query_count,
-            }
-        }
+        initial_state = _initial_state(test_request)
+        config = _research_config(test_request)
         
-        # Run just the query generation step
-        from src.agent.graph import generate_query
-        result = generate_query(initial_state, config)
+        # Run just the query generation step; the sync node would block the
+        # event loop while waiting for a model slot held by async calls
+        from src.agent.graph import agenerate_query
+        result = await agenerate_query(initial_state, config)
         
         return {
             "status": "success",
@@ -166,5 +641,6 @@ if frontend_dist.exists():
 
 if __name__ == "__main__":
     import uvicorn
+    load_env()
     port = int(os.getenv("PORT", 8000))
     uvicorn.run(app, host="0.0.0.0", port=port)
\ No newline at end of file
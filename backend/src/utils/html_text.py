@@ -0,0 +1,155 @@
+from html.parser import HTMLParser
+from typing import List, Optional
+
+try:
+    from lxml import etree
+except ImportError:
+    etree = None
+
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:
+    LexborHTMLParser = None
+
+# Subtrees whose text never belongs in a page summary
+SKIP_TAGS = frozenset(
+    ["script", "style", "nav", "header", "footer", "noscript", "template", "svg"]
+)
+
+
+class _TextCollector:
+    """Whitespace-normalized text with a character cap, fed by any parser"""
+
+    def __init__(self, max_chars: int):
+        self.max_chars = max_chars
+        self.parts: List[str] = []
+        self.length = 0
+        self.skip_depth = 0
+
+    @property
+    def full(self) -> bool:
+        return self.length >= self.max_chars
+
+    def start(self, tag: str) -> None:
+        if tag in SKIP_TAGS:
+            self.skip_depth += 1
+
+    def end(self, tag: str) -> None:
+        if tag in SKIP_TAGS and self.skip_depth:
+            self.skip_depth -= 1
+
+    def data(self, data: str) -> None:
+        if self.skip_depth or self.full:
+            return
+        words = data.split()
+        if words:
+            text = " ".join(words)
+            self.parts.append(text)
+            self.length += len(text) + 1
+
+    def text(self) -> str:
+        return " ".join(self.parts)[:self.max_chars]
+
+
+class _PythonParser(HTMLParser):
+    def __init__(self, collector: _TextCollector):
+        super().__init__(convert_charrefs=True)
+        self.collector = collector
+
+    def handle_starttag(self, tag, attrs):
+        self.collector.start(tag)
+
+    def handle_endtag(self, tag):
+        self.collector.end(tag)
+
+    def handle_data(self, data):
+        self.collector.data(data)
+
+
+class _LxmlTarget:
+    """lxml parser target: receives SAX-style callbacks, so no tree is built"""
+
+    def __init__(self, collector: _TextCollector):
+        self.collector = collector
+
+    def start(self, tag, attrib):
+        self.collector.start(tag)
+
+    def end(self, tag):
+        self.collector.end(tag)
+
+    def data(self, data):
+        self.collector.data(data)
+
+    def close(self):
+        return None
+
+
+class HtmlTextExtractor:
+    """Incremental HTML-to-text extractor that stops once `max_chars` are collected.
+
+    Feed the body chunk by chunk as it arrives; `feed` returns True once enough
+    text has been gathered so the caller can stop reading the network stream.
+    script/style/nav/header/footer subtrees are skipped without building a DOM.
+    lxml's callback (target) parser is used when installed; selectolax, which cannot parse
+    incrementally, buffers up to `max_buffer` characters and parses once;
+    otherwise the standard library's incremental `HTMLParser` is used.
+    """
+
+    def __init__(
+        self,
+        max_chars: int = 5000,
+        backend: Optional[str] = None,
+        max_buffer: int = 2 * 1024 * 1024,
+    ):
+        self.backend = backend or default_backend()
+        self.max_buffer = max_buffer
+        self._collector = _TextCollector(max_chars)
+        self._buffer: List[str] = []
+        self._buffered = 0
+        if self.backend == "lxml":
+            self._parser = etree.HTMLParser(target=_LxmlTarget(self._collector))
+        elif self.backend == "python":
+            self._parser = _PythonParser(self._collector)
+        elif self.backend != "selectolax":
+            raise ValueError(f"Unknown HTML extractor backend {self.backend!r}")
+
+    def feed(self, chunk: str) -> bool:
+        """Parse the next chunk of markup; return True once no more input is needed"""
+        if self.backend == "selectolax":
+            self._buffer.append(chunk)
+            self._buffered += len(chunk)
+            return self._buffered >= self.max_buffer
+        self._parser.feed(chunk)
+        return self._collector.full
+
+    def close(self) -> str:
+        """Finish parsing and return the extracted text"""
+        if self.backend == "selectolax":
+            tree = LexborHTMLParser("".join(self._buffer))
+            tree.strip_tags(list(SKIP_TAGS))
+            if tree.root is not None:
+                self._collector.data(tree.root.text(separator=" "))
+        elif not self._collector.full:
+            try:
+                self._parser.close()
+            except Exception:
+                pass
+        return self._collector.text()
+
+
+def default_backend() -> str:
+    if etree is not None:
+        return "lxml"
+    if LexborHTMLParser is not None:
+        return "selectolax"
+    return "python"
+
+
+def extract_text(html: str, max_chars: int = 5000, backend: Optional[str] = None) -> str:
+    """Extract up to `max_chars` of visible text from a complete HTML document"""
+    extractor = HtmlTextExtractor(max_chars, backend)
+    for start in range(0, len(html), 64 * 1024):
+        if extractor.feed(html[start:start + 64 * 1024]):
+            break
+    return extractor.close()
@@ -0,0 +1,177 @@
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+
+def url_key(url: str) -> str:
+    return hashlib.sha256(url.encode()).hexdigest()
+
+
+class PageStore:
+    """On-disk store of extracted page text, keyed by URL hash.
+
+    Each entry keeps the extracted text with the ETag / Last-Modified headers
+    it was fetched with. Entries younger than `max_age` are served without any
+    network traffic; older ones are revalidated with a conditional GET, and a
+    304 serves the stored text without downloading or parsing the page again.
+    The store is capped at `max_bytes` of text, evicting least recently used
+    entries first.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_bytes: int = 256 * 1024 * 1024,
+        max_age: float = 24 * 3600,
+    ):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS pages ("
+            " key TEXT PRIMARY KEY,"
+            " url TEXT NOT NULL,"
+            " text TEXT NOT NULL,"
+            " etag TEXT,"
+            " last_modified TEXT,"
+            " body_bytes INTEGER NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " fetched_at REAL NOT NULL,"
+            " accessed_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self.bytes_saved = 0
+        self.evictions = 0
+
+    def get(self, url: str) -> Optional[Dict[str, Any]]:
+        """Return the stored entry for a URL, fresh or not, without counting a lookup"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT text, etag, last_modified, body_bytes, fetched_at"
+                " FROM pages WHERE key = ?",
+                (url_key(url),),
+            ).fetchone()
+        if row is None:
+            return None
+        text, etag, last_modified, body_bytes, fetched_at = row
+        return {
+            "text": text,
+            "etag": etag,
+            "last_modified": last_modified,
+            "body_bytes": body_bytes,
+            "fresh": time.time() - fetched_at < self.max_age,
+        }
+
+    def hit(self, url: str, entry: Dict[str, Any], revalidated: bool = False) -> str:
+        """Record that an entry was served (after a 304 when `revalidated`)"""
+        now = time.time()
+        with self._lock:
+            if revalidated:
+                self._conn.execute(
+                    "UPDATE pages SET fetched_at = ?, accessed_at = ? WHERE key = ?",
+                    (now, now, url_key(url)),
+                )
+                self.revalidated += 1
+            else:
+                self._conn.execute(
+                    "UPDATE pages SET accessed_at = ? WHERE key = ?", (now, url_key(url))
+                )
+            self._conn.commit()
+            self.hits += 1
+            self.bytes_saved += entry["body_bytes"]
+        return entry["text"]
+
+    def put(
+        self,
+        url: str,
+        text: str,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+        body_bytes: int = 0,
+    ) -> None:
+        """Store freshly fetched text; counts as a miss"""
+        now = time.time()
+        size = len(text.encode())
+        with self._lock:
+            self.misses += 1
+            self._conn.execute(
+                "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (url_key(url), url, text, etag, last_modified, body_bytes, size, now, now),
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self) -> None:
+        (total,) = self._conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM pages"
+        ).fetchone()
+        if total <= self.max_bytes:
+            return
+        rows = self._conn.execute(
+            "SELECT key, size FROM pages ORDER BY accessed_at"
+        ).fetchall()
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM pages WHERE key = ?", (key,))
+            total -= size
+            self.evictions += 1
+
+    async def aget(self, url: str) -> Optional[Dict[str, Any]]:
+        return await asyncio.to_thread(self.get, url)
+
+    async def ahit(self, url: str, entry: Dict[str, Any], revalidated: bool = False) -> str:
+        return await asyncio.to_thread(self.hit, url, entry, revalidated)
+
+    async def aput(
+        self,
+        url: str,
+        text: str,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+        body_bytes: int = 0,
+    ) -> None:
+        await asyncio.to_thread(self.put, url, text, etag, last_modified, body_bytes)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM pages")
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM pages"
+            ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "entries": entries,
+            "bytes": size,
+            "hits": self.hits,
+            "revalidated": self.revalidated,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "bytes_saved": self.bytes_saved,
+            "evictions": self.evictions,
+        }
+
+
+def page_store_from_env() -> Optional[PageStore]:
+    """Build the page store configured by PAGE_STORE_* variables, if enabled"""
+    if os.getenv("PAGE_STORE_ENABLED", "true").lower() != "true":
+        return None
+    return PageStore(
+        os.getenv("PAGE_STORE_DB", "page_store.sqlite3"),
+        max_bytes=int(os.getenv("PAGE_STORE_MAX_BYTES", 256 * 1024 * 1024)),
+        max_age=float(os.getenv("PAGE_STORE_MAX_AGE_SECONDS", 24 * 3600)),
+    )
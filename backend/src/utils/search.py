@@ -1,88 +1,205 @@
 import asyncio
 import httpx
-from typing import List, Dict, Any, Optional
-from bs4 import BeautifulSoup
+from typing import List, Dict, Any, Optional, Tuple
+from urllib.parse import urlsplit
 import os
+from src.agent import tracing
 from models.state import Source
+from utils.html_text import HtmlTextExtractor
+from utils.page_store import PageStore, page_store_from_env
 import logging
 
 logger = logging.getLogger(__name__)
 
+# h2 comes with the `httpx[http2]` dependency; fall back to HTTP/1.1 without it
+try:
+    import h2  # noqa: F401  (enables HTTP/2 in httpx)
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
 
 class WebSearchTool:
-    def __init__(self):
+    """Google Custom Search plus page fetching over one long-lived connection pool.
+
+    Result pages are fetched concurrently, at most `max_per_host` at a time per
+    host, and the whole fetch phase is bounded by `fetch_budget` seconds: pages
+    still loading when the budget runs out are cancelled and their sources are
+    returned with empty content, like pages that failed to load. Extracted
+    text is kept in a `PageStore` so popular pages are not downloaded and
+    parsed again by every research job. Searches and page fetches are traced
+    as `web_search` and `page_fetch` spans.
+    """
+
+    search_url = "https://www.googleapis.com/customsearch/v1"
+
+    def __init__(
+        self,
+        client: Optional[httpx.AsyncClient] = None,
+        page_store: Optional[PageStore] = None,
+    ):
         self.google_api_key = os.getenv("GOOGLE_SEARCH_API_KEY")
         self.google_cse_id = os.getenv("GOOGLE_CSE_ID")
         self.max_sources = int(os.getenv("MAX_SOURCES_PER_QUERY", "5"))
-        
+        self.max_per_host = int(os.getenv("FETCH_MAX_PER_HOST", "4"))
+        self.fetch_budget = float(os.getenv("FETCH_BUDGET_SECONDS", "15"))
+        self.fetch_timeout = float(os.getenv("FETCH_TIMEOUT_SECONDS", "10"))
+        self.page_store = page_store if page_store is not None else page_store_from_env()
+        self._client = client
+        # Per-host semaphore and how many fetches hold or wait on it; dropped
+        # when that reaches zero, so hosts seen once are not kept forever
+        self._host_limits: Dict[str, Tuple[asyncio.Semaphore, int]] = {}
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """The shared client, created on first use so it binds to the running loop"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                http2=HTTP2_AVAILABLE,
+                limits=httpx.Limits(
+                    max_connections=100,
+                    max_keepalive_connections=20,
+                    keepalive_expiry=30.0,
+                ),
+                timeout=self.fetch_timeout,
+                follow_redirects=True,
+                headers={"User-Agent": "DeepResearchAgent/1.0"},
+            )
+        return self._client
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def __aenter__(self) -> "WebSearchTool":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+
     async def search(self, query: str, num_results: int = None) -> List[Source]:
+        with tracing.span("web_search", tracing.WEB_SEARCH_SECONDS, query=query) as span:
+            sources = await self._search(query, num_results)
+            span.set(results=len(sources), content_chars=sum(len(s.content) for s in sources))
+            return sources
+
+    async def _search(self, query: str, num_results: int = None) -> List[Source]:
         if not self.google_api_key or not self.google_cse_id:
             logger.warning("Google Search API credentials not configured")
             return []
-            
+
         num_results = num_results or self.max_sources
-        
+
         try:
-            async with httpx.AsyncClient() as client:
-                params = {
-                    "key": self.google_api_key,
-                    "cx": self.google_cse_id,
-                    "q": query,
-                    "num": num_results,
-                }
-                
-                response = await client.get(
-                    "https://www.googleapis.com/customsearch/v1",
-                    params=params,
-                    timeout=30.0
+            params = {
+                "key": self.google_api_key,
+                "cx": self.google_cse_id,
+                "q": query,
+                "num": num_results,
+            }
+
+            response = await self.client.get(self.search_url, params=params, timeout=30.0)
+            response.raise_for_status()
+            data = response.json()
+
+            items = data.get("items", [])
+            contents = await self._fetch_all([item["link"] for item in items])
+            return [
+                Source(
+                    url=item["link"],
+                    title=item["title"],
+                    content=content,
+                    snippet=item.get("snippet", ""),
+                    timestamp=item.get("cacheId", "")
                 )
-                response.raise_for_status()
-                data = response.json()
-                
-                sources = []
-                for item in data.get("items", []):
-                    try:
-                        content = await self._fetch_content(item["link"])
-                        source = Source(
-                            url=item["link"],
-                            title=item["title"],
-                            content=content,
-                            snippet=item.get("snippet", ""),
-                            timestamp=item.get("cacheId", "")
-                        )
-                        sources.append(source)
-                    except Exception as e:
-                        logger.warning(f"Failed to fetch content for {item['link']}: {e}")
-                        continue
-                        
-                return sources
-                
+                for item, content in zip(items, contents)
+            ]
+
         except Exception as e:
             logger.error(f"Search failed: {e}")
             return []
-    
+
+    async def _fetch_all(self, urls: List[str]) -> List[str]:
+        """Fetch all pages concurrently within the fetch budget, in input order"""
+        tasks = [asyncio.ensure_future(self._fetch_limited(url)) for url in urls]
+        if not tasks:
+            return []
+        done, pending = await asyncio.wait(tasks, timeout=self.fetch_budget)
+        for task in pending:
+            task.cancel()
+        if pending:
+            logger.warning(
+                f"Fetch budget of {self.fetch_budget}s used up; "
+                f"returning {len(done)} of {len(tasks)} pages"
+            )
+            await asyncio.gather(*pending, return_exceptions=True)
+        return [task.result() if task in done else "" for task in tasks]
+
+    async def _fetch_limited(self, url: str) -> str:
+        host = urlsplit(url).netloc
+        limit, users = self._host_limits.get(host) or (asyncio.Semaphore(self.max_per_host), 0)
+        self._host_limits[host] = (limit, users + 1)
+        try:
+            async with limit:
+                return await self._fetch_content(url)
+        finally:
+            limit, users = self._host_limits[host]
+            if users == 1:
+                del self._host_limits[host]
+            else:
+                self._host_limits[host] = (limit, users - 1)
+
     async def _fetch_content(self, url: str, max_chars: int = 5000) -> str:
+        # Only a fetch cancelled by the fetch budget ends without setting its source
+        with tracing.span(
+            "page_fetch", tracing.PAGE_FETCH_SECONDS, url=url, source="cancelled"
+        ) as span:
+            text = await self._fetch_text(url, max_chars, span)
+            span.set(chars=len(text))
+            return text
+
+    async def _fetch_text(self, url: str, max_chars: int, span) -> str:
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    url, 
-                    timeout=10.0,
-                    headers={"User-Agent": "DeepResearchAgent/1.0"}
-                )
+            store = self.page_store
+            entry = await store.aget(url) if store is not None else None
+            if entry is not None and entry["fresh"]:
+                span.set(source="store")
+                return await store.ahit(url, entry)
+
+            # Revalidate a stale entry instead of downloading the page again
+            headers = {}
+            if entry is not None:
+                if entry["etag"]:
+                    headers["If-None-Match"] = entry["etag"]
+                if entry["last_modified"]:
+                    headers["If-Modified-Since"] = entry["last_modified"]
+
+            # Parse the body as it streams in and stop reading once enough
+            # text has been collected
+            extractor = HtmlTextExtractor(max_chars)
+            async with self.client.stream("GET", url, headers=headers) as response:
+                if response.status_code == 304 and entry is not None:
+                    span.set(source="revalidated")
+                    return await store.ahit(url, entry, revalidated=True)
                 response.raise_for_status()
-                
-                soup = BeautifulSoup(response.text, 'html.parser')
-                
-                for script in soup(["script", "style", "nav", "header", "footer"]):
-                    script.decompose()
-                
-                text = soup.get_text()
-                lines = (line.strip() for line in text.splitlines())
-                chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-                text = ' '.join(chunk for chunk in chunks if chunk)
-                
-                return text[:max_chars] if len(text) > max_chars else text
-                
+                async for chunk in response.aiter_text():
+                    if extractor.feed(chunk):
+                        break
+            text = extractor.close()
+            span.set(source="network", bytes=response.num_bytes_downloaded)
+
+            if store is not None and text:
+                await store.aput(
+                    url,
+                    text,
+                    etag=response.headers.get("etag"),
+                    last_modified=response.headers.get("last-modified"),
+                    body_bytes=response.num_bytes_downloaded,
+                )
+            return text
+
         except Exception as e:
             logger.warning(f"Failed to fetch content from {url}: {e}")
-            return ""
\ No newline at end of file
+            span.set(source="error", error=type(e).__name__)
+            return ""
@@ -0,0 +1,37 @@
+import asyncio
+from datetime import datetime
+
+from langgraph.checkpoint.base import empty_checkpoint
+
+from src.agent.checkpoint import latest_checkpoints, open_checkpointer, prune_runs
+
+
+async def _put(saver, thread_id):
+    checkpoint = empty_checkpoint()
+    config = {"configurable": {"thread_id": thread_id, "checkpoint_ns": ""}}
+    await saver.aput(config, checkpoint, {}, {})
+    return datetime.fromisoformat(checkpoint["ts"]).timestamp()
+
+
+async def test_latest_checkpoint_per_thread_newest_first(tmp_path):
+    async with open_checkpointer(str(tmp_path / "checkpoints.sqlite3")) as saver:
+        await _put(saver, "a")
+        await _put(saver, "b")
+        written = await _put(saver, "a")
+
+        latest = await latest_checkpoints(saver)
+        assert [thread_id for thread_id, _ in latest] == ["a", "b"]
+        # The time comes from the checkpoint id and matches the stored `ts`
+        assert abs(latest[0][1] - written) < 0.001
+        assert await latest_checkpoints(saver, limit=1) == latest[:1]
+
+
+async def test_prune_runs_deletes_only_stale_threads(tmp_path):
+    async with open_checkpointer(str(tmp_path / "checkpoints.sqlite3")) as saver:
+        await _put(saver, "old")
+        await asyncio.sleep(0.2)
+        await _put(saver, "new")
+
+        assert await prune_runs(saver, 3600) == 0
+        assert await prune_runs(saver, 0.1) == 1
+        assert [thread_id for thread_id, _ in await latest_checkpoints(saver)] == ["new"]
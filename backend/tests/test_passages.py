@@ -0,0 +1,46 @@
+from src.agent.passages import PassageIndex, select_evidence
+
+
+def _findings(n):
+    return [
+        f"Finding {i} reports that battery plant {i} doubled output. "
+        f"Grid operator {i} added storage capacity in region {i}."
+        for i in range(n)
+    ]
+
+
+def test_query_matching_no_passage_keeps_all_texts():
+    # Regression: this used to return [], leaving the prompt without findings
+    assert select_evidence(_findings(12), "What is AI?", k=4, max_words=10) is None
+
+
+def test_few_passages_are_kept_as_they_are():
+    assert select_evidence(_findings(2), "battery", k=8, max_words=10) is None
+
+
+def test_matches_first_then_earliest_passages_in_original_order():
+    texts = _findings(6)
+    texts[4] = "Solar tariffs fell sharply. Solar imports rose."
+    evidence = select_evidence(texts, "solar tariffs", k=3, max_words=10)
+    # Only texts[4] matches; the other slots go to the earliest passages
+    assert evidence == [
+        "Finding 0 reports that battery plant 0 doubled output.",
+        "Grid operator 0 added storage capacity in region 0.",
+        "Solar tariffs fell sharply. Solar imports rose.",
+    ]
+
+
+def test_selection_is_capped_at_k():
+    evidence = select_evidence(_findings(12), "battery plant output", k=5, max_words=10)
+    assert len(evidence) == 5
+    assert all("battery plant" in passage for passage in evidence)
+
+
+def test_search_ranks_best_match_first():
+    index = PassageIndex()
+    index.add_passage("wind turbines and wind farms")
+    index.add_passage("solar panels")
+    index.add_passage("wind")
+    hits = index.search("wind farms", k=3)
+    assert [i for i, _ in hits] == [0, 2]
+    assert index.search("nuclear", k=3) == []
@@ -0,0 +1,119 @@
+import asyncio
+
+import pytest
+
+from src.agent import quorum
+from src.agent.quorum import FanIn, collect, join, new_fan_out, quorum_size
+
+
+def _search(seconds, result=None):
+    return asyncio.ensure_future(asyncio.sleep(seconds, result))
+
+
+@pytest.mark.parametrize(
+    "size, fraction, expected", [(5, 0.6, 3), (4, 0.5, 2), (3, 0.01, 1), (2, 1.5, 2)]
+)
+def test_quorum_size(size, fraction, expected):
+    assert quorum_size(size, fraction) == expected
+
+
+async def test_quorum_releases_the_slow_branches():
+    fan_in = FanIn(size=3, quorum=2)
+    tasks = [_search(0.01), _search(0.02), _search(5)]
+    finished = await asyncio.wait_for(
+        asyncio.gather(*(fan_in.wait(task) for task in tasks)), 1
+    )
+    assert finished == [True, True, False]
+    assert (fan_in.finished, fan_in.returned) == (2, 3)
+    # Released branches return early; their search keeps running
+    assert not tasks[2].done()
+    tasks[2].cancel()
+
+
+async def test_deadline_releases_after_the_first_finished_branch():
+    fan_in = FanIn(size=3, quorum=3, deadline=0.05)
+    tasks = [_search(0.01), _search(5), _search(5)]
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    finished = await asyncio.wait_for(
+        asyncio.gather(*(fan_in.wait(task) for task in tasks)), 1
+    )
+    assert finished == [True, False, False]
+    assert 0.04 < loop.time() - started < 0.5
+    for task in tasks[1:]:
+        task.cancel()
+
+
+async def test_past_deadline_the_first_finished_branch_releases_the_rest():
+    fan_in = FanIn(size=3, quorum=3, deadline=0.01)
+    tasks = [_search(0.1), _search(5), _search(5)]
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    finished = await asyncio.wait_for(
+        asyncio.gather(*(fan_in.wait(task) for task in tasks)), 1
+    )
+    # Nothing had finished at the deadline, so the loop waited for one search
+    assert finished == [True, False, False]
+    assert loop.time() - started >= 0.09
+    for task in tasks[1:]:
+        task.cancel()
+
+
+async def test_no_release_when_every_branch_finishes_in_time():
+    fan_in = FanIn(size=2, quorum=2, deadline=1)
+    tasks = [_search(0.01), _search(0.02)]
+    assert await asyncio.gather(*(fan_in.wait(task) for task in tasks)) == [True, True]
+
+
+async def test_join_parks_released_searches_for_collect():
+    fan_out = new_fan_out(3)
+    tasks = [_search(0.01, "a"), _search(0.02, "b"), _search(0.1, "c")]
+    keys = await asyncio.gather(*(join(fan_out, task, 0.5, 10) for task in tasks))
+
+    assert keys[:2] == [None, None]
+    late = [keys[2]]
+    # The fan-in is dropped once every branch has returned
+    assert fan_out["key"] not in quorum._fan_ins
+
+    assert collect(late) == ([], [], 1)
+    await tasks[2]
+    assert collect(late) == (["c"], late, 0)
+    assert late[0] not in quorum._late
+
+
+async def test_collect_cancels_and_settles_running_searches():
+    fan_out = new_fan_out(2)
+    tasks = [_search(0.01), _search(5)]
+    keys = await asyncio.gather(*(join(fan_out, task, 0.5, 10) for task in tasks))
+    late = [key for key in keys if key]
+
+    assert collect(late + ["gone:1"], cancel=True) == ([], late + ["gone:1"], 0)
+    await asyncio.sleep(0)
+    assert tasks[1].cancelled()
+
+
+async def test_uncollected_searches_expire(monkeypatch):
+    monkeypatch.setattr(quorum, "EXPIRE_SECONDS", 0.05)
+    fan_out = new_fan_out(3)
+    tasks = [_search(0.01), _search(0.02), _search(5)]
+    keys = await asyncio.gather(*(join(fan_out, task, 0.5, 0) for task in tasks))
+    assert keys[2] in quorum._late
+
+    # The run never collects its parked search, e.g. because it failed
+    await asyncio.sleep(0.1)
+    assert keys[2] not in quorum._late
+    assert tasks[2].cancelled()
+    assert collect([keys[2]]) == ([], [keys[2]], 0)
+
+
+async def test_fan_in_of_a_branch_that_never_joins_expires(monkeypatch):
+    monkeypatch.setattr(quorum, "EXPIRE_SECONDS", 0.05)
+    fan_out = new_fan_out(3)
+    keys = await asyncio.gather(
+        *(join(fan_out, _search(0.01), 0.5, 0) for _ in range(2))
+    )
+    assert keys == [None, None]
+    assert fan_out["key"] in quorum._fan_ins
+
+    await asyncio.sleep(0.1)
+    assert fan_out["key"] not in quorum._fan_ins
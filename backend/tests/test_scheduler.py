@@ -0,0 +1,189 @@
+import asyncio
+import time
+
+import pytest
+
+from src.agent.scheduler import ModelScheduler, _limits_from_env, is_rate_limit_error
+
+MODEL = "gemini-test"
+
+
+class RateLimited(Exception):
+    code = 429
+
+
+async def _hold(scheduler, release, request_key="holder"):
+    async with scheduler.aslot(MODEL, request_key):
+        await release.wait()
+
+
+async def _settle():
+    """Let granted waiters resume; grants are delivered with call_soon_threadsafe"""
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_is_rate_limit_error():
+    assert is_rate_limit_error(RateLimited())
+    assert is_rate_limit_error(RuntimeError("429 Too Many Requests"))
+    assert is_rate_limit_error(ValueError("RESOURCE_EXHAUSTED: quota"))
+    try:
+        try:
+            raise RateLimited()
+        except RateLimited as e:
+            raise RuntimeError("model call failed") from e
+    except RuntimeError as wrapped:
+        assert is_rate_limit_error(wrapped)
+    assert not is_rate_limit_error(ValueError("bad request"))
+
+
+def test_limits_from_env():
+    assert _limits_from_env("a=60:8, b=10,c=:2,") == {
+        "a": (60.0, 8), "b": (10.0, 64), "c": (0.0, 2)
+    }
+
+
+async def test_waiting_runs_are_served_round_robin():
+    scheduler = ModelScheduler(default_max_in_flight=1)
+    release = asyncio.Event()
+    holder = asyncio.ensure_future(_hold(scheduler, release))
+    await _settle()
+
+    order = []
+
+    async def call(run, n):
+        async with scheduler.aslot(MODEL, run):
+            order.append(f"{run}{n}")
+
+    # Run "a" fans out three calls before run "b" queues its one
+    calls = [asyncio.ensure_future(call("a", n)) for n in range(3)]
+    await _settle()
+    calls.append(asyncio.ensure_future(call("b", 0)))
+    await _settle()
+    assert scheduler.stats()[MODEL]["queued_runs"] == 2
+
+    release.set()
+    await asyncio.gather(holder, *calls)
+    assert order == ["a0", "b0", "a1", "a2"]
+    assert scheduler.stats()[MODEL]["in_flight"] == 0
+
+
+async def test_cancelled_waiter_is_withdrawn_from_the_queue():
+    scheduler = ModelScheduler(default_max_in_flight=1)
+    release = asyncio.Event()
+    holder = asyncio.ensure_future(_hold(scheduler, release))
+    await _settle()
+
+    waiter = asyncio.ensure_future(_hold(scheduler, asyncio.Event(), "run"))
+    await _settle()
+    assert scheduler.stats()[MODEL]["queued"] == 1
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+    assert scheduler.stats()[MODEL]["queued"] == 0
+
+    release.set()
+    await holder
+    assert scheduler.stats()[MODEL]["in_flight"] == 0
+    assert scheduler.stats()[MODEL]["granted"] == 1
+
+
+async def test_waiter_cancelled_after_its_grant_releases_the_slot():
+    scheduler = ModelScheduler(default_max_in_flight=1)
+    release = asyncio.Event()
+    holder = asyncio.ensure_future(_hold(scheduler, release))
+    await _settle()
+    entered = []
+
+    async def call():
+        async with scheduler.aslot(MODEL, "run"):
+            entered.append(True)
+
+    waiter = asyncio.ensure_future(call())
+    await _settle()
+    # Releasing the holder grants the waiter; cancel it before it wakes up
+    release.set()
+    await holder
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+
+    assert not entered
+    assert scheduler.stats()[MODEL]["in_flight"] == 0
+    async with scheduler.aslot(MODEL, "next"):
+        pass
+
+
+async def test_rate_limited_call_is_retried_with_a_lower_rate():
+    scheduler = ModelScheduler(
+        limits={MODEL: (6000, 4)}, base_backoff=0.01, max_backoff=0.05
+    )
+    attempts = 0
+
+    async def call():
+        nonlocal attempts
+        attempts += 1
+        if attempts == 1:
+            raise RateLimited()
+        return "answer"
+
+    started = time.monotonic()
+    assert await scheduler.arun(MODEL, "run", call) == "answer"
+    assert attempts == 2
+    # Backoff of base * 2**0 with jitter in [0.5, 1.0]
+    assert time.monotonic() - started >= 0.005
+    stats = scheduler.stats()[MODEL]
+    assert stats["rate_limited"] == 1
+    # Halved by the 429, then raised by 5% of the base rate by the success
+    assert stats["rate_per_minute"] == pytest.approx(6000 * 0.55)
+
+
+async def test_backoff_pauses_dispatch_for_the_model():
+    scheduler = ModelScheduler(base_backoff=0.1, max_backoff=0.1)
+    delay = scheduler._backoff(MODEL, 0)
+    assert 0.05 <= delay <= 0.1
+
+    started = time.monotonic()
+    async with scheduler.aslot(MODEL, "run"):
+        waited = time.monotonic() - started
+    assert waited >= delay - 0.01
+
+
+async def test_other_errors_and_last_attempt_are_not_retried():
+    scheduler = ModelScheduler(max_attempts=3, base_backoff=0.001)
+    attempts = 0
+
+    async def bad_request():
+        nonlocal attempts
+        attempts += 1
+        raise ValueError("bad request")
+
+    with pytest.raises(ValueError):
+        await scheduler.arun(MODEL, "run", bad_request)
+    assert attempts == 1
+
+    async def always_limited():
+        nonlocal attempts
+        attempts += 1
+        raise RateLimited()
+
+    attempts = 0
+    with pytest.raises(RateLimited):
+        await scheduler.arun(MODEL, "run", always_limited)
+    assert attempts == 3
+    assert scheduler.stats()[MODEL]["in_flight"] == 0
+
+
+def test_sync_run_retries_on_rate_limit():
+    scheduler = ModelScheduler(base_backoff=0.001)
+    attempts = []
+
+    def call():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise RateLimited()
+        return "answer"
+
+    assert scheduler.run(MODEL, "run", call) == "answer"
+    assert len(attempts) == 3
+    assert scheduler.stats()[MODEL]["in_flight"] == 0
@@ -0,0 +1,70 @@
+import pytest
+
+from src.agent.utils import ShortUrlRewriter, rewrite_short_urls
+
+SHORT = "https://vertexaisearch.cloud.google.com/id/"
+
+SOURCES = [
+    {"short_url": SHORT + "0-1", "value": "https://a.example/one"},
+    {"short_url": SHORT + "0-12", "value": "https://b.example/twelve"},
+    {"short_url": SHORT + "1-0", "value": "https://c.example/zero"},
+]
+
+TEXT = (
+    "Adoption grew [source](https://vertexaisearch.cloud.google.com/id/0-12). "
+    "Costs fell [source](https://vertexaisearch.cloud.google.com/id/0-1), "
+    "and again [source](https://vertexaisearch.cloud.google.com/id/0-12)."
+)
+
+
+def _stream(text, sizes):
+    """Split `text` into consecutive chunks of the given sizes, cycling through them"""
+    chunks, start, i = [], 0, 0
+    while start < len(text):
+        size = sizes[i % len(sizes)]
+        chunks.append(text[start:start + size])
+        start += size
+        i += 1
+    return chunks
+
+
+def _feed(chunks, sources=SOURCES):
+    rewriter = ShortUrlRewriter(sources)
+    out = "".join(rewriter.feed(chunk) for chunk in chunks) + rewriter.flush()
+    return out, rewriter.used_sources
+
+
+@pytest.mark.parametrize("sizes", [[1], [2], [3, 7], [5], [11, 1, 4], [64]])
+def test_markers_split_across_chunks(sizes):
+    expected, used = rewrite_short_urls(TEXT, SOURCES)
+    assert _feed(_stream(TEXT, sizes)) == (expected, used)
+
+
+def test_every_split_point_matches_single_pass():
+    expected, _ = rewrite_short_urls(TEXT, SOURCES)
+    for cut in range(1, len(TEXT)):
+        assert _feed([TEXT[:cut], TEXT[cut:]])[0] == expected, cut
+
+
+def test_longer_marker_is_not_cut_at_a_shorter_one():
+    # 0-1 is a prefix of 0-12; a chunk ending right after "0-1" must wait
+    out, _ = _feed(["see " + SHORT + "0-1", "2 now"])
+    assert out == "see https://b.example/twelve now"
+
+
+def test_held_prefix_that_is_not_a_marker_is_emitted_on_flush():
+    rewriter = ShortUrlRewriter(SOURCES)
+    assert rewriter.feed("trailing https://vertexaisearch") == "trailing "
+    assert rewriter.flush() == "https://vertexaisearch"
+
+
+def test_used_sources_keep_original_order():
+    _, used = _feed(_stream(TEXT, [3]))
+    assert [source["value"] for source in used] == [
+        "https://a.example/one",
+        "https://b.example/twelve",
+    ]
+
+
+def test_no_sources_passes_text_through():
+    assert _feed(["plain ", "text"], sources=[]) == ("plain text", [])
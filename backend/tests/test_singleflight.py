@@ -0,0 +1,137 @@
+import asyncio
+import threading
+
+import pytest
+
+from src.agent.singleflight import SingleFlight
+
+
+async def test_concurrent_callers_share_one_call():
+    group = SingleFlight()
+    calls = 0
+
+    async def search():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.02)
+        return "result"
+
+    results = await asyncio.gather(*(group.ado("q", search) for _ in range(5)))
+    assert calls == 1
+    assert sorted(shared for _, shared in results) == [False, True, True, True, True]
+    assert all(result == "result" for result, _ in results)
+    assert group.stats()["in_flight"] == 0
+
+
+async def test_leader_cancellation_hands_the_call_to_a_follower():
+    group = SingleFlight()
+    started = asyncio.Event()
+    calls = 0
+
+    async def search():
+        nonlocal calls
+        calls += 1
+        started.set()
+        await asyncio.sleep(0.05)
+        return calls
+
+    leader = asyncio.ensure_future(group.ado("q", search))
+    await started.wait()
+    follower = asyncio.ensure_future(group.ado("q", search))
+    await asyncio.sleep(0)
+    leader.cancel()
+
+    with pytest.raises(asyncio.CancelledError):
+        await leader
+    # The follower is not cancelled with the leader; it runs the call itself
+    assert await follower == (2, False)
+    assert group.stats() == {
+        "issued": 2, "coalesced": 1, "in_flight": 0, "coalesced_rate": 1 / 3
+    }
+
+
+async def test_cancelled_follower_leaves_the_leader_running():
+    group = SingleFlight()
+    started = asyncio.Event()
+
+    async def search():
+        started.set()
+        await asyncio.sleep(0.03)
+        return "result"
+
+    leader = asyncio.ensure_future(group.ado("q", search))
+    await started.wait()
+    follower = asyncio.ensure_future(group.ado("q", search))
+    await asyncio.sleep(0)
+    follower.cancel()
+
+    with pytest.raises(asyncio.CancelledError):
+        await follower
+    assert await leader == ("result", False)
+
+
+async def test_leader_error_reaches_followers_and_is_not_kept():
+    group = SingleFlight()
+    calls = 0
+
+    async def search():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        raise ValueError("quota")
+
+    results = await asyncio.gather(
+        *(group.ado("q", search) for _ in range(3)), return_exceptions=True
+    )
+    assert calls == 1
+    assert all(isinstance(result, ValueError) for result in results)
+
+    # The next call after the failure runs again
+    with pytest.raises(ValueError):
+        await group.ado("q", search)
+    assert calls == 2
+
+
+def test_sync_callers_on_threads_share_one_call():
+    group = SingleFlight()
+    barrier = threading.Barrier(4)
+    release = threading.Event()
+    calls = 0
+    results = []
+
+    def search():
+        nonlocal calls
+        calls += 1
+        release.wait(1)
+        return "result"
+
+    def caller():
+        barrier.wait()
+        results.append(group.do("q", search))
+
+    threads = [threading.Thread(target=caller) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    while group.stats()["coalesced"] < 3:
+        threading.Event().wait(0.001)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert calls == 1
+    assert sorted(results) == [("result", False)] + [("result", True)] * 3
+
+
+async def test_disabled_group_runs_every_call():
+    group = SingleFlight(enabled=False)
+    calls = 0
+
+    async def search():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return calls
+
+    await asyncio.gather(*(group.ado("q", search) for _ in range(3)))
+    assert calls == 3
+    assert group.stats()["coalesced"] == 0